@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Memory held per entity by a loaded IGES_Object, before and after slimming.
+
+    python benchmarks/memory.py [--max-ratio R] [file.igs ...]
+
+Without file arguments a synthetic model (see benchmarks/synthetic.py) is
+generated. "after" is the bytes still allocated once the model is loaded
+(tracemalloc, source text and one-off imports excluded), per entity. "before" is the same model
+rebuilt the way entities used to hold it: plain instance attributes, a dict
+of the 15 DE fields, and separate arrays, lists and floats per attribute
+(see plain_entity()). The exit status is 1 if after/before exceeds
+--max-ratio for any model, so the benchmark doubles as a regression check
+whatever the Python and NumPy versions. The ratio is meant for large models:
+in a file of a few dozen entities the per-model arrays dominate both figures.
+"""
+import argparse
+import io
+import sys
+import tracemalloc
+import numpy as np
+sys.path.insert(0, __file__.rsplit('benchmarks', 1)[0])
+from iges.read import IGES_Object
+import synthetic
+
+MAX_RATIO = 0.8
+
+DE_FIELDS = ('entity_type_number', 'parameter_pointer', 'structure', 'line_font_pattern', 'level',
+             'view', 'transform', 'label_assoc', 'status_number', 'line_weight_number',
+             'color_number', 'param_line_count', 'form_number', 'entity_label', 'entity_subs_num')
+
+
+class Plain(object):
+    """ An entity with its attributes in an instance __dict__ """
+
+
+def plain_entity(e):
+    """ Plain copy of e with the attributes the original entity classes kept """
+    p = Plain()
+    p.d = {name: str(e.d[name]) if name == 'entity_label' else int(e.d[name]) for name in DE_FIELDS}
+    p.sequence_number = int(e.sequence_number)
+    p.transformation = None
+    kind = p.d['entity_type_number']
+    if kind == 110:
+        p.p1, p.p2 = np.array(e.p1), np.array(e.p2)
+        p.e1, p.e2 = (p.p1, p.p2) if e.transformation is None else (np.array(e.e1), np.array(e.e2))
+    elif kind == 100:
+        for name in ('x', 'y', 'z', 'x1', 'y1', 'x2', 'y2'):
+            setattr(p, name, float(getattr(e, name)))
+        p.reversed = bool(e.reversed)
+        p.e1, p.e2 = np.array(e.e1), np.array(e.e2)
+    elif kind == 124:
+        p.R, p.T = np.array(e.R), np.array(e.T).reshape(3, 1)
+    elif kind == 126:
+        for name in ('K', 'M', 'prop1', 'prop2', 'prop3', 'prop4', 'N', 'A'):
+            setattr(p, name, int(getattr(e, name)))
+        p.T, p.W = [float(t) for t in e.T], [float(w) for w in e.W]
+        p.control_points = [tuple(float(c) for c in point) for point in np.reshape(e.control_points, (-1, 3))]
+        p.V0, p.V1 = float(e.V0), float(e.V1)
+        p.e1, p.e2 = np.array(e.e1), np.array(e.e2)
+    elif kind in (102, 402):
+        p.n_curves = len(getattr(e, 'pointers', ()))
+        p.pointers = [int(pointer) for pointer in getattr(e, 'pointers', ())]
+        p.children = []
+        p.e1 = p.e2 = None
+    return p
+
+
+def plain_model(igs):
+    """ (entity_list, pointer_dict, toplevel_entities) of igs as plain entities """
+    entity_list = [plain_entity(e) for e in igs.entity_list]
+    pointer_dict = {p.sequence_number: i for i, p in enumerate(entity_list)}
+    for e, p in zip(igs.entity_list, entity_list):
+        if e.transformation is not None:
+            p.transformation = entity_list[pointer_dict[e.transformation.sequence_number]]
+        if hasattr(p, 'children'):
+            p.children = [entity_list[pointer_dict[c.sequence_number]] for c in getattr(e, 'children', ())]
+            if p.children:
+                p.e1, p.e2 = np.array(e.e1), np.array(e.e2)
+    toplevel = [entity_list[pointer_dict[e.sequence_number]] for e in igs.toplevel_entities]
+    return entity_list, pointer_dict, toplevel
+
+
+def retained(build, *args):
+    """ (result of build(*args), bytes it still holds) """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = build(*args)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, after - before
+
+
+def measure(text):
+    """ (entities, bytes retained as plain entities, bytes retained by the loaded model) """
+    IGES_Object(io.StringIO(text))   # warm up: imports and caches are not per-model memory
+    igs, after = retained(IGES_Object, io.StringIO(text))
+    _, before = retained(plain_model, igs)
+    return len(igs.entity_list), before, after
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Memory retained per entity by a loaded IGES_Object, before and after')
+    parser.add_argument('files', nargs='*', help='IGES files (default: a synthetic model)')
+    parser.add_argument('--max-ratio', type=float, default=MAX_RATIO, help='fail if after/before exceeds this')
+    args = parser.parse_args(argv)
+
+    sources = [(name, open(name, encoding='latin-1').read()) for name in args.files] or [('synthetic', synthetic.text(22000, 10))]
+    status = 0
+    for name, text in sources:
+        n, before, after = measure(text)
+        ratio = after/max(before, 1)
+        print('{0}: {1} entities, before {2:.0f} bytes/entity, after {3:.0f} bytes/entity ({4:.2f})'.format(
+            name, n, before/max(n, 1), after/max(n, 1), ratio))
+        if ratio > args.max_ratio:
+            print('{0}: after/before over the limit of {1:.2f}'.format(name, args.max_ratio), file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""
+Scaling benchmarks on synthetic models (see benchmarks/synthetic.py).
+
+    python benchmarks/scaling.py [-o scaling.json] [--sizes 1e3 1e4 1e5]
+                                 [--group-size 10] [--repeat 3]
+                                 [--compare baseline.json]
+
+For every size a synthetic file is written to a temporary directory, then
+each phase is timed `repeat` times (once for 10^6 entities and up):
+
+    read        sort the file's lines into sections
+    parse       directory table and P section tokenizing
+    load        a whole IGES_Object
+    link        transform pointers and the reference graph
+    chain       add_children of every group
+    discretize  whole-model discretize, every dx and within a chord tolerance
+    index       spatial index over all leaf curves
+    nearest     nearest curve to QUERIES points
+
+Results are saved as JSON; with --compare, the best times are printed next
+to those of an earlier run.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+sys.path.insert(0, __file__.rsplit('benchmarks', 1)[0])
+import numpy as np
+from iges import __version__
+from iges.read import IGES_Object, read_sections, separators, link_transforms
+from iges.directory import parse_directory
+from iges.parameters import ParameterSection
+from iges.references import ReferenceGraph
+import synthetic
+
+QUERIES = 1000
+DX = 0.1
+CHORD_TOL = 1e-3
+
+
+def timed(fn, repeat):
+    """ Wall times of `repeat` calls of fn """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def phases(path):
+    """ (name, callable) of every benchmarked phase on the file at `path` """
+    def read():
+        with open(path, 'r', encoding='latin-1') as f:
+            return read_sections(f)
+
+    global_string, d_lines, p_lines = read()
+    param_sep, record_sep = separators(global_string)
+
+    def parse():
+        parse_directory(d_lines)
+        ParameterSection(p_lines, param_sep, record_sep)
+
+    def load():
+        with open(path, 'r', encoding='latin-1') as f:
+            return IGES_Object(f)
+
+    igs = load()
+    groups = [e for e in igs.entity_list if getattr(e, 'children', None)]
+
+    def link():
+        link_transforms(igs.entity_list, igs.pointer_dict)
+        ReferenceGraph.from_model(igs.entity_list, igs.directory)
+
+    def chain():
+        # Already chained: the order is kept, so every run does the same work
+        for e in groups:
+            e.add_children(list(e.children))
+
+    index = igs.curve_index()
+    lo, hi = index.boxes[:, :3].min(axis=0), index.boxes[:, 3:].max(axis=0)
+    queries = np.random.default_rng(0).uniform(lo - 1, hi + 1, (QUERIES, 3))
+
+    return [
+        ('read', read),
+        ('parse', parse),
+        ('load', load),
+        ('link', link),
+        ('chain', chain),
+        ('discretize dx', lambda: igs.discretize(dx=DX)),
+        ('discretize chord_tol', lambda: igs.discretize(chord_tol=CHORD_TOL)),
+        ('index', igs.curve_index),
+        ('nearest', lambda: index.nearest(queries)),
+    ]
+
+
+def run(sizes, group_size=10, repeat=3, seed=0, log=sys.stdout):
+    """ Benchmark every size; returns a list of result records """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, 'synthetic{0}.igs'.format(size))
+            with open(path, 'w', encoding='latin-1') as f:
+                n = synthetic.write(f, size, group_size, seed)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                for name, fn in phases(path):
+                    runs = timed(fn, repeat if size < 10**6 else 1)
+                    results.append({
+                        'entities': n,
+                        'group_size': group_size,
+                        'phase': name,
+                        'runs': runs,
+                        'best': min(runs),
+                        'median': statistics.median(runs),
+                    })
+                    log.write('{0:>9} {1:<22}{2:10.4f} s\n'.format(n, name, min(runs)))
+            os.remove(path)
+    return results
+
+
+def environment():
+    return {
+        'iges': __version__,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results, baseline, log=sys.stdout):
+    """ Print best times next to those of a baseline run with the same sizes and phases """
+    before = {(r['entities'], r['group_size'], r['phase']): r['best'] for r in baseline['results']}
+    log.write('{0:>9} {1:<22}{2:>12}{3:>12}  speedup\n'.format('entities', 'phase', 'baseline', 'now'))
+    for r in results:
+        old = before.get((r['entities'], r['group_size'], r['phase']))
+        if old is None:
+            continue
+        log.write('{0:>9} {1:<22}{2:10.4f} s {3:10.4f} s  x{4:.2f}\n'.format(
+            r['entities'], r['phase'], old, r['best'], old/max(r['best'], 1e-12)))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Scaling benchmarks on synthetic IGES models')
+    parser.add_argument('-o', '--output', default='scaling.json')
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e3, 1e4, 1e5],
+                        help='entity counts, up to {0:.0e}'.format(synthetic.SIZES[-1]))
+    parser.add_argument('--group-size', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', help='JSON of an earlier run')
+    args = parser.parse_args(argv)
+
+    results = run([int(s) for s in args.sizes], args.group_size, args.repeat, args.seed)
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Deterministic synthetic IGES files.
+
+    python benchmarks/synthetic.py out.igs [n_entities] [group_size]
+
+The model is a stack of closed loops, one per group. Each loop is a zig-zag
+of lines (110), one cubic rational B-spline (126) and a half circle (100)
+closing it, placed by its own transformation matrix (124). The members are
+listed by a composite curve (102) or, every other loop, an ordered group
+associativity (402, form 15). A group of `group_size` members takes
+group_size + 2 entities.
+
+The same arguments (including `seed`) always give the same file. Records are
+written to the file object as they are made, loop by loop, so the size of
+the model is not bounded by memory.
+"""
+import io
+import math
+import random
+import sys
+
+LINE = '{0:<64}{1:>8}P{2:>7}\n'
+DE = '{0:>8}{1:>8}{2:>8}{3:>8}{4:>8}{5:>8}{6:>8}{7:>8}{8:>8}D{9:>7}\n'
+SIZES = [10**k for k in range(3, 8)]
+
+
+def n_groups(n_entities, group_size):
+    """ Loops needed for at least n_entities entities """
+    return max(-(-n_entities // (group_size + 2)), 1)
+
+
+def group_records(g, group_size, seed=0):
+    """
+    Entities of loop g as (type number, form, parameters, index of the
+    transform within the loop or None); the 124 comes first, the group last.
+    """
+    rnd = random.Random(seed*1000003 + g)
+    n_lines = max(group_size - 2, 1)
+    y0 = 10.0*g
+    jitter = [0.25*(rnd.random() - 0.5) for _ in range(n_lines + 1)]
+    pts = [(float(k), y0 + k % 2 + jitter[k]) for k in range(n_lines + 1)]
+
+    records = []
+    # Lines along the zig-zag
+    for k in range(n_lines):
+        (xa, ya), (xb, yb) = pts[k], pts[k+1]
+        records.append((110, 0, [xa, ya, 0., xb, yb, 0.], None))
+
+    # Cubic spline, one Bezier span, from the last vertex two units on
+    xs, ys = pts[-1]
+    h = 0.5 + rnd.random()
+    ctrl = [xs, ys, 0., xs + 2/3., ys + h, 0., xs + 4/3., ys - h, 0., xs + 2., ys, 0.]
+    records.append((126, 0, [3, 3, 1, 0, 1, 0] + [0, 0, 0, 0, 1, 1, 1, 1] + [1, 1, 1, 1] +
+                    ctrl + [0., 1., 0., 0., 1.], None))
+
+    # Half circle from the spline's end back to the first vertex, drawn about
+    # the origin and moved into place by the loop's 124
+    xe, ye = xs + 2., ys
+    (x0, y0_), phi = pts[0], 0.1*g
+    cx, cy = (xe + x0)/2, (ye + y0_)/2
+    c, s = math.cos(phi), math.sin(phi)
+    # start vector in definition space: R^T (end of spline - center)
+    dx, dy = xe - cx, ye - cy
+    ux, uy = c*dx + s*dy, -s*dx + c*dy
+    transform = [c, -s, 0., cx, s, c, 0., cy, 0., 0., 1., 0.]
+    records.insert(0, (124, 0, transform, None))
+    records.append((100, 0, [0., 0., 0., ux, uy, -ux, -uy], 0))
+
+    members = list(range(1, len(records)))
+    records.append((402, 15, [len(members)] + members, None) if g % 2 else
+                   (102, 0, [len(members)] + members, None))
+    return records
+
+
+def _number(v):
+    if isinstance(v, int):
+        return str(v)
+    return repr(float(v))
+
+
+def _body(type_number, params, de_base, pointer_slots):
+    """ Parameter text of one record; pointer_slots index params holding member indices """
+    values = list(params)
+    for i in pointer_slots:
+        values[i] = 2*(de_base + values[i]) + 1
+    return '{0},{1};'.format(type_number, ','.join(_number(v) for v in values))
+
+
+def _pointer_slots(type_number, params):
+    if type_number in (102, 402):
+        return range(1, 1 + params[0])
+    return ()
+
+
+def _bodies(n, group_size, seed):
+    """ Yield (type number, form, parameter text, DE index, transform DE index) per entity """
+    index = 0
+    for g in range(n):
+        base = index
+        for type_number, form, params, t in group_records(g, group_size, seed):
+            body = _body(type_number, params, base, _pointer_slots(type_number, params))
+            yield type_number, form, body, index, None if t is None else base + t
+            index += 1
+
+
+def write(f, n_entities=1000, group_size=10, seed=0):
+    """
+    Write a synthetic IGES file of at least n_entities entities to the text
+    file object f. Returns the number of entities written.
+    """
+    n = n_groups(n_entities, group_size)
+    glob = '1H,,1H;,4Hsynt,{0}Hsynthetic{1}.igs;'.format(13 + len(str(n_entities)), n_entities)
+
+    f.write('{0:<72}S{1:>7}\n'.format('Synthetic IGES benchmark model', 1))
+    f.write('{0:<72}G{1:>7}\n'.format(glob, 1))
+
+    # Directory: the P line numbers come from the text lengths alone
+    n_p = 0
+    n_d = 0
+    buf = []
+    for type_number, form, body, i, t in _bodies(n, group_size, seed):
+        count = -(-len(body) // 64)
+        transform = 0 if t is None else 2*t + 1
+        buf.append(DE.format(type_number, n_p + 1, 0, 1, 0, 0, transform, 0, '00000000', 2*i + 1))
+        buf.append(DE.format(type_number, 0, 0, count, form, '', '', '', 0, 2*i + 2))
+        n_p += count
+        n_d += 2
+        if len(buf) >= 4096:
+            f.write(''.join(buf))
+            del buf[:]
+    f.write(''.join(buf))
+
+    # Parameters, made a second time in the same order
+    line = 0
+    buf = []
+    for _, _, body, i, _ in _bodies(n, group_size, seed):
+        for k in range(0, len(body), 64):
+            line += 1
+            buf.append(LINE.format(body[k:k+64], 2*i + 1, line))
+        if len(buf) >= 4096:
+            f.write(''.join(buf))
+            del buf[:]
+    f.write(''.join(buf))
+
+    f.write('{0:<72}T{1:>7}\n'.format('S{0:>7}G{1:>7}D{2:>7}P{3:>7}'.format(1, 1, n_d, n_p), 1))
+    return n_d // 2
+
+
+def text(n_entities=1000, group_size=10, seed=0):
+    """ The synthetic file as one string """
+    buf = io.StringIO()
+    write(buf, n_entities, group_size, seed)
+    return buf.getvalue()
+
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 1
+    n_entities = int(float(argv[1])) if len(argv) > 1 else 1000
+    group_size = int(argv[2]) if len(argv) > 2 else 10
+    with open(argv[0], 'w', encoding='latin-1') as f:
+        n = write(f, n_entities, group_size)
+    print('{0}: {1} entities'.format(argv[0], n))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,2 +1,3 @@
 #!/usr/bin/env python
 
+__version__ = "0.0.2"
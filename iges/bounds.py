@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Axis-aligned bounding boxes of every entity of a model, computed in bulk.
+
+Boxes are (N, 6) [min xyz, max xyz] in model space, one row per entity in
+entity_list order:
+
+- lines: their model space endpoints, one pass over the LineTable;
+- arcs: exact, in closed form. Along model axis k an arc of radius r about
+  c in a plane rotated by R is c_k + r*(R[k,0] cos t + R[k,1] sin t), which
+  peaks at t = atan2(R[k,1], R[k,0]) and bottoms out half a turn later; the
+  box takes those extremes that fall within the sweep, and the endpoints;
+- B-splines: their model space control points (a curve with positive
+  weights stays within the hull of its control points);
+- conics, 112 splines and points: their own exact bounding_box();
+- any other curve: samples, padded (approximate);
+- groups: the union of their members' boxes; unlinked ones (402 forms
+  other than 15) have none.
+
+Entities without geometry (transforms, ...) get NaN rows, which no query
+matches.
+
+preview() uses the boxes to decimate a whole model into one NaN-separated
+polyline for quick display.
+"""
+import math
+import numpy as np
+from iges.curves_surfaces import RationalBSplineCurve, CurveGroup
+from iges.references import MEMBER
+from iges.tables import locate
+from iges.discretize import discretize
+
+SAMPLES = 32
+
+
+def line_boxes(table):
+    """ (N, 6) boxes of the rows of a LineTable """
+    e1, e2 = table.endpoints()
+    return np.hstack((np.minimum(e1, e2), np.maximum(e1, e2)))
+
+
+def arc_boxes(table):
+    """ (N, 6) exact boxes of the rows of an ArcTable """
+    n = len(table)
+    R = np.broadcast_to(np.eye(3), (n, 3, 3)).copy()
+    has = table.transform_index >= 0
+    R[has] = table.R[table.transform_index[has]]
+    c = table._to_model(table.centers[:, :, None])[:, :, 0]
+    r = table.radii
+
+    theta1, theta2 = table.angles()
+    start = np.minimum(theta1, theta2)
+    sweep = np.abs(theta2 - theta1)
+    peak = np.arctan2(R[:, :, 1], R[:, :, 0])                   # (N, 3)
+    amplitude = r[:, None]*np.hypot(R[:, :, 0], R[:, :, 1])
+    has_max = np.mod(peak - start[:, None], 2*math.pi) <= sweep[:, None]
+    has_min = np.mod(peak + math.pi - start[:, None], 2*math.pi) <= sweep[:, None]
+
+    e1, e2 = table.endpoints()
+    lo = np.minimum(e1, e2)
+    hi = np.maximum(e1, e2)
+    lo = np.where(has_min, np.minimum(lo, c - amplitude), lo)
+    hi = np.where(has_max, np.maximum(hi, c + amplitude), hi)
+    return np.hstack((lo, hi))
+
+
+def spline_box(e):
+    """ Box of the model space control points of a RationalBSplineCurve """
+    pts = e.transform(e.control_points.T)
+    return np.r_[pts.min(axis=1), pts.max(axis=1)]
+
+
+def sampled_box(e):
+    """
+    Box of samples along a curve, padded by 1% of its largest extent: an
+    approximation, for curves that offer no bounding_box() of their own
+    """
+    pts = e.linspace(SAMPLES).reshape(3, -1)
+    pad = 0.01*np.ptp(pts, axis=1).max()
+    return np.r_[pts.min(axis=1) - pad, pts.max(axis=1) + pad]
+
+
+def leaf_boxes(curves, tables=()):
+    """ (N, 6) boxes of leaf curves; rows of the tables are done in bulk """
+    boxes = np.full((len(curves), 6), np.nan)
+    which, row = locate(curves, tables)
+    for t, table in enumerate(tables):
+        mine = np.flatnonzero(which == t)
+        if not len(mine):
+            continue
+        table_boxes = arc_boxes(table) if hasattr(table, 'radii') else line_boxes(table)
+        boxes[mine] = table_boxes[row[mine]]
+    for i in np.flatnonzero(which < 0).tolist():
+        e = curves[i]
+        if isinstance(e, CurveGroup):
+            continue
+        if isinstance(e, RationalBSplineCurve):
+            boxes[i] = spline_box(e)
+        elif hasattr(e, 'bounding_box'):
+            boxes[i] = e.bounding_box()
+        elif hasattr(e, 'linspace'):
+            boxes[i] = sampled_box(e)
+    return boxes
+
+
+class Bounds(object):
+    """
+    boxes: (N, 6) [min xyz, max xyz] model space box of every entity, in
+           entity_list order; NaN for entities without geometry.
+    Queries return entity_list indices.
+    """
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+    def __len__(self):
+        return len(self.boxes)
+
+    @property
+    def extent(self):
+        """ (6,) box around everything, NaN if there is nothing """
+        valid = ~np.isnan(self.boxes).any(axis=1)
+        if not valid.any():
+            return np.full(6, np.nan)
+        return np.r_[self.boxes[valid, :3].min(axis=0), self.boxes[valid, 3:].max(axis=0)]
+
+    def overlapping(self, lo, hi):
+        """ Entities whose boxes meet the box [lo, hi] """
+        lo, hi = np.asarray(lo, dtype=float), np.asarray(hi, dtype=float)
+        return np.flatnonzero(np.all(self.boxes[:, :3] <= hi, axis=1) & np.all(self.boxes[:, 3:] >= lo, axis=1))
+
+    def inside(self, lo, hi):
+        """ Entities whose boxes lie entirely within the box [lo, hi] """
+        lo, hi = np.asarray(lo, dtype=float), np.asarray(hi, dtype=float)
+        return np.flatnonzero(np.all(self.boxes[:, :3] >= lo, axis=1) & np.all(self.boxes[:, 3:] <= hi, axis=1))
+
+    def containing(self, point, tol=0.0):
+        """ Entities whose boxes, grown by tol, contain a point """
+        p = np.asarray(point, dtype=float).reshape(3)
+        return self.overlapping(p - tol, p + tol)
+
+
+def model_bounds(igs):
+    """ Bounds of every entity of an IGES_Object """
+    boxes = leaf_boxes(igs.entity_list, (igs.lines, igs.arcs))
+    references = igs.references
+    done = {}
+
+    def group_box(i):
+        if i not in done:
+            done[i] = None   # cyclic membership: stop here
+            rows = [group_box(c) if c in groups else boxes[c] for c in references.children(i, MEMBER).tolist()]
+            rows = [b for b in rows if b is not None and not np.isnan(b).any()]
+            if rows:
+                rows = np.array(rows)
+                boxes[i] = np.r_[rows[:, :3].min(axis=0), rows[:, 3:].max(axis=0)]
+            done[i] = boxes[i]
+        return done[i]
+
+    groups = set(references.sources(MEMBER).tolist())
+    for i in groups:
+        group_box(i)
+    return Bounds(boxes)
+
+
+def preview(igs, tol=1e-3):
+    """
+    Every top-level curve of an IGES_Object as one NaN-separated (3, P)
+    polyline (see Discretization.polyline), sampled within a chord
+    tolerance of tol times the model's diagonal: lines stay two points,
+    arcs and splines get what the view needs, and curves smaller than the
+    tolerance are left out.
+    """
+    bounds = igs.bounds()
+    extent = bounds.extent
+    diagonal = np.linalg.norm(extent[3:] - extent[:3])
+    chord_tol = tol*diagonal if diagonal > 0 else tol
+    boxes = bounds.boxes[[igs.index(e) for e in igs.toplevel_entities]].reshape(-1, 6)
+    sizes = np.linalg.norm(boxes[:, 3:] - boxes[:, :3], axis=1)
+    curves = [e for e, size in zip(igs.toplevel_entities, sizes.tolist()) if not size < chord_tol]
+    d = discretize(curves, chord_tol=chord_tol, tables=(igs.lines, igs.arcs), index=igs.index)
+    return d.polyline()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Persistent cache of parsed models.
+
+A cache entry is an .npz sidecar holding the directory table, the tokenized
+parameter arrays, the chained child orderings with their reversal flags and,
+for reloadable models, the record keys that IGES_Object.reload() compares
+against.
+Entries are keyed on the file's content hash, size and mtime plus the
+library version, so a warm load skips text parsing and chaining entirely.
+The cache directory is trimmed least-recently-used first to `max_bytes`.
+"""
+import hashlib
+import io
+import os
+import tempfile
+import numpy as np
+from iges import __version__
+from iges.read import IGES_Object
+from iges.parameters import ParameterSection
+from iges.select import Selection
+
+CACHE_FORMAT = 3
+DEFAULT_CACHE_DIR = os.environ.get('IGES_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'iges'))
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def cache_key(data, stat, selection=''):
+    """ Hex key of file contents, size, mtime, library version and entity selection """
+    h = hashlib.blake2b(data, digest_size=20)
+    h.update('{0}:{1}:{2}:{3}:{4}'.format(stat.st_size, stat.st_mtime_ns, __version__, CACHE_FORMAT, selection).encode())
+    return h.hexdigest()
+
+
+def save(igs, path):
+    """ Write the parsed tables of an IGES_Object to an .npz file """
+    orderings = igs.child_orderings()
+    groups = sorted(orderings)
+    counts = [len(orderings[g][0]) for g in groups]
+    child_offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum(counts, out=child_offsets[1:])
+    string_keys = sorted(igs.parameters.strings)
+
+    with open(path, 'wb') as f:
+        np.savez(f,
+            global_string=np.array(igs.global_string),
+            directory=igs.directory,
+            pointers=igs.parameters.pointers,
+            offsets=igs.parameters.offsets,
+            values=igs.parameters.values,
+            string_keys=np.array(string_keys, dtype=np.int64),
+            string_values=np.array([igs.parameters.strings[k] for k in string_keys], dtype=str),
+            groups=np.array(groups, dtype=np.int64),
+            child_offsets=child_offsets,
+            child_index=np.array([i for g in groups for i in orderings[g][0]], dtype=np.int64),
+            child_flips=np.array([f for g in groups for f in orderings[g][1]], dtype=bool),
+            record_keys=igs.record_keys if igs.record_keys is not None else np.zeros(0, dtype='S16'))
+
+
+def load(path, selection=None):
+    """ Rebuild an IGES_Object from an .npz file written by save(); `selection` is the one it was loaded with """
+    with np.load(path, allow_pickle=False) as z:
+        strings = dict(zip(z['string_keys'].tolist(), z['string_values'].tolist()))
+        parameters = ParameterSection.from_chunks([(z['pointers'], z['offsets'], z['values'], strings)])
+        child_offsets = z['child_offsets'].tolist()
+        child_index = z['child_index'].tolist()
+        child_flips = z['child_flips'].tolist()
+        orderings = {}
+        for k, g in enumerate(z['groups'].tolist()):
+            a, b = child_offsets[k], child_offsets[k+1]
+            orderings[g] = (child_index[a:b], child_flips[a:b])
+        keys = z['record_keys'] if len(z['record_keys']) == len(z['directory']) else None
+        return IGES_Object.from_tables(str(z['global_string']), z['directory'], parameters, orderings,
+                                       record_keys=keys, selection=selection)
+
+
+def evict(cache_dir, max_bytes):
+    """ Remove least recently used entries until the cache fits in max_bytes """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.npz'):
+            st = os.stat(os.path.join(cache_dir, name))
+            entries.append((st.st_mtime, st.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except OSError:
+            pass
+        total -= size
+
+
+def load_cached(filename, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, **kwargs):
+    """
+    Load an IGES file through the cache.
+    Extra keyword arguments go to IGES_Object on a miss. Entity selections
+    (types, levels, colors, forms) are part of the key; a `where` predicate
+    cannot be, so such loads bypass the cache.
+    """
+    if kwargs.get('where') is not None:
+        with open(filename, 'r', encoding='latin-1') as f:
+            return IGES_Object(f, **kwargs)
+
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    with open(filename, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        data = f.read()
+    selection = Selection(**{k: kwargs.get(k) for k in ('types', 'levels', 'colors', 'forms')})
+    entry = os.path.join(cache_dir, cache_key(data, stat, selection.key()) + '.npz')
+
+    if os.path.exists(entry):
+        try:
+            igs = load(entry, selection if selection else None)
+            # an entry saved without record keys does not serve a reloadable load
+            if igs.record_keys is not None or not kwargs.get('reloadable'):
+                os.utime(entry)   # mark as recently used
+                return igs
+        except (OSError, ValueError, KeyError):
+            pass   # unreadable entry, rebuild it below
+
+    igs = IGES_Object(io.StringIO(data.decode('latin-1'), newline=None), **kwargs)
+
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+    os.close(fd)
+    try:
+        save(igs, tmp)
+        os.replace(tmp, entry)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    evict(cache_dir, max_bytes)
+    return igs
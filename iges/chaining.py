@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""
+Endpoint chaining for composite curves and associativity groups.
+
+Endpoints are snapped into a hash grid of tolerance-sized cells; only the 27
+cells around each endpoint are compared, and coincident endpoints are merged
+into nodes with a vectorized union-find, so the whole pass is near-linear.
+Members then become edges between nodes and are walked into chains:
+
+- every member is used exactly once, in as many open chains and closed loops
+  as the group contains;
+- a chain keeps the direction of its lowest-numbered member;
+- nodes where more than two member ends meet are junctions: chains stop there
+  and the junction is reported instead of silently picking a branch;
+- degenerate (zero length) members such as points are slotted in wherever the
+  chain passes through their node.
+"""
+import numpy as np
+from iges.tables import ragged
+
+# Odd 64 bit multipliers for hashing cell coordinates; collisions only add
+# candidates, which the exact distance test throws out again.
+_HASH = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+
+
+def _cell_hash(cells):
+    h = cells.astype(np.uint64)*_HASH
+    return h[:, 0] ^ h[:, 1] ^ h[:, 2]
+
+
+def close_pairs(points, tol):
+    """ All pairs (i, j), i < j, of (M,3) points no further than tol apart """
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    if len(points) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    cells = np.floor(points/max(tol, 1e-300)).astype(np.int64)
+    keys = _cell_hash(cells)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    I = []
+    J = []
+    r = np.arange(-1, 2)
+    for offset in np.stack(np.meshgrid(r, r, r, indexing='ij'), axis=-1).reshape(-1, 3):
+        target = _cell_hash(cells + offset)
+        lo = np.searchsorted(sorted_keys, target, side='left')
+        hi = np.searchsorted(sorted_keys, target, side='right')
+        _, i, pos = ragged(hi - lo)
+        j = order[lo[i] + pos]
+        keep = i < j
+        I.append(i[keep])
+        J.append(j[keep])
+    I = np.concatenate(I)
+    J = np.concatenate(J)
+    keep = np.sum((points[I] - points[J])**2, axis=1) <= tol*tol
+    pair = np.unique(I[keep]*len(points) + J[keep])
+    return pair//len(points), pair % len(points)
+
+
+def merge_points(points, tol):
+    """
+    Label (M,3) points so that points within tol of each other (transitively)
+    share a label. Labels run 0..K-1 in order of first appearance.
+    """
+    n = len(points)
+    I, J = close_pairs(points, tol)
+    labels = np.arange(n)
+    while len(I):
+        low = np.minimum(labels[I], labels[J])
+        changed = (labels[I] != low) | (labels[J] != low)
+        if not changed.any():
+            break
+        np.minimum.at(labels, I, low)
+        np.minimum.at(labels, J, low)
+        # pointer jumping
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind='stable')] = np.arange(len(first))
+    return rank[inverse.reshape(-1)]
+
+
+class Chaining(object):
+    """
+    chains:    list of chains, each a list of (member index, reversed) pairs
+    closed:    per chain, True for a closed loop
+    junctions: list of (node point, member indices) where more than two
+               member ends meet
+    """
+    def __init__(self, chains, closed, junctions):
+        self.chains = chains
+        self.closed = closed
+        self.junctions = junctions
+
+    def order(self):
+        """ All (member index, reversed) pairs, chain after chain """
+        return [step for chain in self.chains for step in chain]
+
+
+def chain(e1, e2, tol=1e-5, degenerate=None):
+    """ Chain N members with (N,3) start and end points; see the module docstring """
+    e1 = np.asarray(e1, dtype=float).reshape(-1, 3)
+    e2 = np.asarray(e2, dtype=float).reshape(-1, 3)
+    n = len(e1)
+    node = merge_points(np.vstack((e1, e2)), tol)
+    n1, n2 = node[:n].tolist(), node[n:].tolist()
+    degenerate = np.zeros(n, dtype=bool) if degenerate is None else np.asarray(degenerate, dtype=bool)
+
+    # node -> member ends (member, end) touching it
+    ends = {}
+    points = {}
+    for m in range(n):
+        if degenerate[m]:
+            continue
+        ends.setdefault(n1[m], []).append((m, 1))
+        ends.setdefault(n2[m], []).append((m, 2))
+        points.setdefault(n1[m], e1[m])
+        points.setdefault(n2[m], e2[m])
+    junctions = [(points[v], sorted(set(m for m, _ in touching)))
+                 for v, touching in ends.items() if len(touching) > 2]
+
+    def walk(m, end):
+        """ Members reached leaving member m through its end `end`; second value True if back at m """
+        steps = []
+        v = n2[m] if end == 2 else n1[m]
+        arrived = (m, end)
+        while True:
+            touching = ends[v]
+            if len(touching) != 2:
+                return steps, False
+            nxt = touching[1] if touching[0] == arrived else touching[0]
+            j, e = nxt
+            if j == m:
+                return steps, True
+            if used[j]:
+                return steps, False
+            used[j] = True
+            # entering j through end e: leave through the other one
+            steps.append((j, e))
+            arrived = (j, 3 - e)
+            v = n2[j] if e == 1 else n1[j]
+
+    used = degenerate.copy()
+    chains = []
+    closed = []
+    for m in range(n):
+        if used[m]:
+            continue
+        used[m] = True
+        forward, is_closed = walk(m, 2)
+        # going forward, entering through end 1 keeps the member's direction
+        steps = [(m, False)] + [(j, e == 2) for j, e in forward]
+        if not is_closed:
+            backward, _ = walk(m, 1)
+            # going backward, entering through end 2 keeps the member's direction
+            steps = [(j, e == 1) for j, e in reversed(backward)] + steps
+        chains.append(steps)
+        closed.append(is_closed)
+
+    # Slot degenerate members in where a chain passes through their node
+    pending = {}
+    for m in np.flatnonzero(degenerate).tolist():
+        pending.setdefault(n1[m], []).append(m)
+    if pending:
+        for c, steps in enumerate(chains):
+            placed = []
+            for k, (m, rev) in enumerate(steps):
+                start = n2[m] if rev else n1[m]
+                if k == 0 and start in pending:
+                    placed.extend((d, False) for d in pending.pop(start))
+                placed.append((m, rev))
+                stop = n1[m] if rev else n2[m]
+                if stop in pending:
+                    placed.extend((d, False) for d in pending.pop(stop))
+            chains[c] = placed
+        for group in pending.values():
+            for d in group:
+                chains.append([(d, False)])
+                closed.append(False)
+        order = sorted(range(len(chains)), key=lambda c: min(m for m, _ in chains[c]))
+        chains = [chains[c] for c in order]
+        closed = [closed[c] for c in order]
+
+    return Chaining(chains, closed, junctions)
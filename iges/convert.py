@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+"""
+Batch conversion of IGES files to discretized beam data.
+
+    iges-convert DIR_OR_GLOB [...] (--dx DX | --chord-tol TOL) [-o OUT_DIR] [-j JOBS]
+
+Inputs may be gzip, bz2 or xz compressed (.igs.gz, ...). Every top-level
+curve of every file is discretized (see iges.discretize)
+and saved as one .npz per file holding:
+
+    points      (3, P) float64 (float32 with --float32)
+    offsets     (K+1,) CSR offsets of the K top-level curves into points
+    entity_ids  (K,)   DE sequence number of each top-level curve
+    options     JSON of the conversion options
+
+Outputs drop the input extension (part.igs.gz -> part.npz); inputs that
+would share an output keep their whole name instead (part.igs.npz,
+part.iges.npz). Glob matches keep their path below the pattern's first
+wildcard under the output directory.
+
+Files are loaded concurrently in a process pool. An output is up to date,
+and its file skipped, when it is newer than its input and was written with
+the same options. Each file gets a report line with its timings or its
+error; --report saves them all as JSON. The exit status is 1 if any file
+failed.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+COMPRESSED = ('.gz', '.bz2', '.xz')
+EXTENSIONS = tuple(ext + z for ext in ('.igs', '.iges') for z in ('',) + COMPRESSED)
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def find_inputs(patterns, recursive=False):
+    """ (input path, output path relative to the output directory) of every file the patterns name """
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                for name in sorted(files):
+                    if name.lower().endswith(EXTENSIONS):
+                        path = os.path.join(root, name)
+                        found.append((path, os.path.relpath(path, pattern)))
+                if not recursive:
+                    break
+                dirs.sort()
+        else:
+            root = glob_root(pattern)
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    found.append((path, os.path.relpath(path, root)))
+    return found
+
+
+def glob_root(pattern):
+    """ Directory part of a glob pattern before its first wildcard """
+    parts = os.path.dirname(pattern).split(os.sep)
+    for k, part in enumerate(parts):
+        if glob.has_magic(part):
+            parts = parts[:k]
+            break
+    return os.sep.join(parts) or (os.sep if pattern.startswith(os.sep) else '.')
+
+
+def output_path(path, relative, out_dir=None):
+    """ .npz next to the input, or at its relative path under out_dir """
+    base = path if out_dir is None else os.path.join(out_dir, relative)
+    if base.lower().endswith(COMPRESSED):
+        base = os.path.splitext(base)[0]
+    return os.path.splitext(base)[0] + '.npz'
+
+
+def assign_outputs(files, out_dir=None):
+    """
+    (input path, output path or None, error) for (input path, relative path)
+    pairs. Inputs that would share an output keep their whole file name; if
+    that still collides, they get no output and an error.
+    """
+    by_output = {}
+    for path, relative in files:
+        by_output.setdefault(output_path(path, relative, out_dir), []).append((path, relative))
+    outputs = []
+    for out, group in by_output.items():
+        if len(group) == 1:
+            outputs.append((group[0][0], out))
+        else:
+            for path, relative in group:
+                outputs.append((path, (path if out_dir is None else os.path.join(out_dir, relative)) + '.npz'))
+
+    counts = {}
+    for _, out in outputs:
+        key = os.path.normcase(os.path.abspath(out))
+        counts[key] = counts.get(key, 0) + 1
+    assigned = []
+    for path, out in outputs:
+        if counts[os.path.normcase(os.path.abspath(out))] > 1:
+            assigned.append((path, None, 'output {0} would be shared with another input'.format(out)))
+        else:
+            assigned.append((path, out, None))
+    return assigned
+
+
+def up_to_date(path, out, options):
+    """ True if `out` is newer than `path` and was written with `options` """
+    try:
+        if os.path.getmtime(out) < os.path.getmtime(path):
+            return False
+        with np.load(out, allow_pickle=False) as z:
+            return json.loads(str(z['options'])) == options
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def convert_file(path, out, options):
+    """ Load, discretize and save one file; returns its report record. Never raises. """
+    from iges.read import IGES_Object
+    from iges.stream import open_stream
+    record = {'file': path, 'output': out, 'status': 'converted'}
+    try:
+        start = time.perf_counter()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with open_stream(path) as f:
+                igs = IGES_Object(f)
+            if not len(igs.entity_list):
+                raise ValueError('no directory entries; not an IGES file?')
+            loaded = time.perf_counter()
+            d = igs.discretize(dx=options['dx'], chord_tol=options['chord_tol'],
+                               max_len=options['max_len'], min_len=options['min_len'])
+        sampled = time.perf_counter()
+
+        points = d.points.astype(np.float32) if options['float32'] else d.points
+        entity_ids = igs.directory['sequence_number'][d.entity_ids] if len(d.entity_ids) else np.zeros(0, dtype=np.int64)
+        os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+        # A temporary file of our own, so concurrent writers never share one
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(out) or '.')
+        try:
+            os.chmod(tmp, 0o666 & ~UMASK)   # as if opened normally, not mkstemp's 0600
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, points=points, offsets=d.offsets, entity_ids=entity_ids,
+                         options=np.array(json.dumps(options, sort_keys=True)))
+            os.replace(tmp, out)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        record.update({
+            'entities': len(igs.entity_list),
+            'curves': len(d),
+            'points': int(d.points.shape[1]),
+            'warnings': len(caught),
+            'load_seconds': loaded - start,
+            'discretize_seconds': sampled - loaded,
+            'write_seconds': time.perf_counter() - sampled,
+            'seconds': time.perf_counter() - start,
+        })
+    except Exception as e:
+        record.update({'status': 'failed', 'error': '{0}: {1}'.format(type(e).__name__, e),
+                       'traceback': traceback.format_exc()})
+    return record
+
+
+def convert(files, options, out_dir=None, jobs=None, force=False, log=None):
+    """
+    Convert (input path, relative output path) pairs; returns report records
+    in completion order. `log`, if given, is called with each record.
+    """
+    records = []
+
+    def finish(record):
+        records.append(record)
+        if log:
+            log(record)
+
+    todo = []
+    for path, out, error in assign_outputs(files, out_dir):
+        if error is not None:
+            finish({'file': path, 'output': out, 'status': 'failed', 'error': error})
+        elif not force and up_to_date(path, out, options):
+            finish({'file': path, 'output': out, 'status': 'skipped'})
+        else:
+            todo.append((path, out))
+
+    if jobs == 1 or len(todo) < 2:
+        for path, out in todo:
+            finish(convert_file(path, out, options))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(convert_file, path, out, options) for path, out in todo]
+            for future in as_completed(futures):
+                finish(future.result())
+    return records
+
+
+def report_line(record):
+    if record['status'] == 'failed':
+        return 'FAILED    {0}: {1}'.format(record['file'], record['error'])
+    if record['status'] == 'skipped':
+        return 'skipped   {0} (up to date)'.format(record['file'])
+    return 'converted {0}: {1} curves, {2} points in {3:.3f} s (load {4:.3f}, discretize {5:.3f}, write {6:.3f})'.format(
+        record['file'], record['curves'], record['points'], record['seconds'],
+        record['load_seconds'], record['discretize_seconds'], record['write_seconds'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='iges-convert', description='Discretize IGES files into compact .npz beam data')
+    parser.add_argument('inputs', nargs='+', help='directories or glob patterns of IGES files')
+    step = parser.add_mutually_exclusive_group(required=True)
+    step.add_argument('--dx', type=float, help='sample every ~dx along each curve')
+    step.add_argument('--chord-tol', type=float, help='sample adaptively within this chord tolerance')
+    parser.add_argument('--max-len', type=float, help='longest segment, with --chord-tol')
+    parser.add_argument('--min-len', type=float, help='shortest segment, with --chord-tol')
+    parser.add_argument('-o', '--output-dir', help='write outputs here instead of next to the inputs')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('-r', '--recursive', action='store_true', help='descend into subdirectories')
+    parser.add_argument('--float32', action='store_true', help='store points as float32')
+    parser.add_argument('-f', '--force', action='store_true', help='convert even if the output is up to date')
+    parser.add_argument('--report', help='save the per-file report as JSON')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only report failures')
+    args = parser.parse_args(argv)
+
+    options = {'dx': args.dx, 'chord_tol': args.chord_tol, 'max_len': args.max_len,
+               'min_len': args.min_len, 'float32': args.float32}
+    files = find_inputs(args.inputs, args.recursive)
+    if not files:
+        parser.error('no IGES files found')
+
+    def log(record):
+        if record['status'] == 'failed' or not args.quiet:
+            print(report_line(record), file=sys.stderr if record['status'] == 'failed' else sys.stdout)
+
+    start = time.perf_counter()
+    records = convert(files, options, args.output_dir, args.jobs, args.force, log)
+    counts = {s: sum(r['status'] == s for r in records) for s in ('converted', 'skipped', 'failed')}
+    print('{0} converted, {1} skipped, {2} failed in {3:.1f} s'.format(
+        counts['converted'], counts['skipped'], counts['failed'], time.perf_counter() - start))
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'options': options, 'files': records}, f, indent=1)
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
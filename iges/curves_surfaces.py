@@ -3,21 +3,140 @@ from iges.entity import Entity
 import os
 import numpy as np
 import math
-from itertools import combinations
+import warnings
+from iges.chaining import chain
+from iges.tables import clamp_segments
 
 EPSILON = 1e-5
+# Spline quadrature: sub-intervals per knot span and Gauss points per sub-interval
+QUAD_DIVISIONS = 8
+QUAD_POINTS = 5
+# Nearest points: coarse samples per quadrature sub-interval, then safeguarded Newton steps at most
+PROJECT_DIVISIONS = 4
+PROJECT_STEPS = 60
+# Spline chord refinement: halving levels at most
+REFINE_DEPTH = 20
+PAIR_CHUNK = 1 << 22
+
+class Param(object):
+    """
+    Named slot of one of an entity's packed arrays: the parameter row
+    (`_params`) or the model space endpoints (`_ends`). Either array is owned
+    by the entity or a view into a model-level table.
+    """
+    __slots__ = ('index', 'size', 'field')
+
+    def __init__(self, index, size=None, field='_params'):
+        self.index = index
+        self.size = size
+        self.field = field
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        row = getattr(obj, self.field)
+        if self.size is None:
+            return float(row[self.index])
+        return row[self.index:self.index+self.size]
+
+    def __set__(self, obj, value):
+        row = getattr(obj, self.field)
+        if self.size is None:
+            row[self.index] = value
+        else:
+            row[self.index:self.index+self.size] = value
+
+def nearest_on_segments(p1, p2, X):
+    """
+    Vectorized Line.nearestPoint over rows of (M,3) segment ends and points.
+    Returns distances (M,), nearest points (M,3) and isnode (M,) as 1, 2 or 0.
+    """
+    d = p2 - p1
+    beyond1 = np.einsum('ij,ij->i', -d, p1 - X) <= EPSILON
+    beyond2 = ~beyond1 & (np.einsum('ij,ij->i', d, p2 - X) <= EPSILON)
+    L2 = np.einsum('ij,ij->i', d, d)
+    t = np.einsum('ij,ij->i', d, X - p1)/np.where(L2 > 0, L2, 1.)
+    pts = p1 + d*t[:, None]
+    pts[beyond1] = p1[beyond1]
+    pts[beyond2] = p2[beyond2]
+    isnode = np.where(beyond1, 1, np.where(beyond2, 2, 0)).astype(np.int8)
+    return np.linalg.norm(X - pts, axis=1), pts, isnode
+
+def nearest_on_arcs(P, N, va, sweep, sign, radius, e1, e2, X):
+    """
+    Vectorized CircArc.nearestPoint over rows of arc frames (see
+    CircArc.frame) and (M,3) points. Returns distances (M,), nearest points
+    (M,3) and isnode (M,) as 1, 2 or 0.
+    """
+    v = X - P
+    vparr = N*np.einsum('ij,ij->i', v, N)[:, None]
+    vperp = v - vparr
+    rperp = np.linalg.norm(vperp, axis=1)
+    dtoroid = np.hypot(np.linalg.norm(vparr, axis=1), rperp - radius)
+
+    thetaX = np.arctan2(sign*np.einsum('ij,ij->i', np.cross(va, vperp), N), np.einsum('ij,ij->i', vperp, va))
+    thetaX = np.mod(thetaX, 2*math.pi)
+    swept = (thetaX > EPSILON) & (thetaX < sweep - EPSILON)
+    start = ~swept & (thetaX - sweep > 2*math.pi - thetaX)
+    end = ~swept & ~start
+
+    # On the axis every point of the circle is equally near; take the start
+    direction = np.where((rperp > 0)[:, None], vperp/np.where(rperp > 0, rperp, 1.)[:, None], va/radius[:, None])
+    pts = P + radius[:, None]*direction
+    pts[start] = e1[start]
+    pts[end] = e2[end]
+    dist = np.where(swept, dtoroid, np.linalg.norm(X - pts, axis=1))
+    isnode = np.where(start, 1, np.where(end, 2, 0)).astype(np.int8)
+    return dist, pts, isnode
+
+def fraction_on_segments(p1, p2, X):
+    """ Fractions (M,) in [0, 1] along (M,3) segments of the points nearest to (M,3) X """
+    d = p2 - p1
+    L2 = np.einsum('ij,ij->i', d, d)
+    t = np.einsum('ij,ij->i', d, X - p1)/np.where(L2 > 0, L2, 1.)
+    return np.clip(t, 0., 1.)
+
+def fraction_on_arcs(P, N, va, sweep, sign, X):
+    """
+    Fractions (M,) in [0, 1] along arcs (frames as in nearest_on_arcs) of the
+    points nearest to (M,3) X; outside the sweep, the closer end wins.
+    """
+    v = X - P
+    thetaX = np.arctan2(sign*np.einsum('ij,ij->i', np.cross(va, v), N), np.einsum('ij,ij->i', v, va))
+    thetaX = np.mod(thetaX, 2*math.pi)
+    t = thetaX/np.where(sweep > 0, sweep, 1.)
+    beyond = thetaX > sweep
+    t[beyond] = np.where(thetaX[beyond] - sweep[beyond] > 2*math.pi - thetaX[beyond], 0., 1.)
+    return np.clip(t, 0., 1.)
+
+def quadratic_roots(a, b, c):
+    """ Both real roots of a x^2 + b x + c = 0, elementwise; NaN where there is none """
+    a, b, c = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (a, b, c)))
+    scale = np.maximum(np.maximum(abs(a), abs(b)), abs(c))
+    linear = abs(a) <= 1e-12*np.where(scale > 0, scale, 1.)
+    disc = b*b - 4*a*c
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # the numerically stable pair, q = -(b + sign(b) sqrt(disc))/2
+        q = -0.5*(b + np.copysign(np.sqrt(disc), b))
+        r1 = np.where(linear, -c/b, q/a)
+        r2 = np.where(linear, np.nan, c/q)
+    bad = ~linear & (disc < 0)
+    r1[bad] = np.nan
+    r2[bad] = np.nan
+    return r1, r2
 
 class Line(Entity):
     """Straight line segment (110)"""
+    __slots__ = ('_params', '_ends')
+    p1 = Param(0, 3)
+    p2 = Param(3, 3)
+    e1 = Param(0, 3, '_ends')
+    e2 = Param(3, 3, '_ends')
 
     def add_parameters(self, parameters):
-        p = [float(param.strip()) for param in parameters]
-
-        self.p1 = np.array(p[1:4]).reshape(3)
-        self.p2 = np.array(p[4:7]).reshape(3)
+        self._params = np.array(parameters[1:7], dtype=float)
 
-        self.e1 = None
-        self.e2 = None
+        self._ends = np.empty(6)
         self.computeEndpoints()
 
     def __str__(self):
@@ -34,7 +153,7 @@ class Line(Entity):
         return s
 
     def reverse(self):
-        self.p1, self.p2 = self.p2, self.p1
+        self._params[:] = self._params[[3, 4, 5, 0, 1, 2]]
         self.computeEndpoints()
         return self
 
@@ -56,22 +175,34 @@ class Line(Entity):
         n = math.ceil(self.length()/dx)
         return self.linspace(n, endpoint)
 
+    def chord_fractions(self, chord_tol, max_len=None, min_len=None):
+        """ Fractions of the length delimiting chords within chord_tol of the curve """
+        n = clamp_segments([1], [self.length()], max_len, min_len)[0]
+        return np.linspace(0.0, 1.0, n + 1)
+
     def nearestPoint(self, X):
-        p1 = self.p1
-        p2 = self.p2
-        p3 = X.reshape(3)
-
-        if np.dot(p1-p2, p1-p3) <= EPSILON:
-            # beyond p1
-            d = np.linalg.norm(p3-p1)
-            return (d, self.p1, 1)
-        elif np.dot(p2-p1, p2-p3) <= EPSILON:
-            # beyond p2
-            d = np.linalg.norm(p3-p2)
-            return (d, self.p2, 2)
-        else:
-            d = np.linalg.norm(np.cross(p2-p1, p1-p3))/np.linalg.norm(p2-p1)
-            return (d, p1+(p2-p1)*np.dot(p2-p1, p3-p1)/(np.linalg.norm(p2-p1)**2), False)
+        # returns distance from this line segment to the given point, in model space
+        d, pts, isnode = self.nearestPoints(X)
+        return (d[0], pts[0], int(isnode[0]) or False)
+
+    def nearestPoints(self, X):
+        """ nearestPoint for (M,3) points at once, in model space: (distances, points, isnode) arrays """
+        X = np.asarray(X, dtype=float).reshape(-1, 3)
+        e1 = np.broadcast_to(np.reshape(self.e1, 3), X.shape)
+        e2 = np.broadcast_to(np.reshape(self.e2, 3), X.shape)
+        return nearest_on_segments(e1, e2, X)
+
+    def evaluate(self, t):
+        """ Model space points (3, M) at fractions t of the length """
+        t = np.asarray(t, dtype=float).reshape(-1)
+        return self.transform(np.outer(self.p1, 1-t) + np.outer(self.p2, t)).reshape(3, -1)
+
+    def fraction(self, X):
+        """ Fractions (M,) of the length at which the points nearest to (M,3) X lie """
+        X = np.asarray(X, dtype=float).reshape(-1, 3)
+        e1 = np.broadcast_to(np.reshape(self.e1, 3), X.shape)
+        e2 = np.broadcast_to(np.reshape(self.e2, 3), X.shape)
+        return fraction_on_segments(e1, e2, X)
 
 class CircArc(Entity):
     """
@@ -86,26 +217,37 @@ class CircArc(Entity):
 
         The ordering of the end points corresponds to the ordering necessary 
         for the arc to betraced out in a counterclockwise direction.
-        """    
+
+        Parameters are packed as [x, y, z, x1, y1, x2, y2, reversed].
+        """
+    __slots__ = ('_params', '_ends', '_frame')
+    # x and y are center coordinates, z is displacement on xt,yt plane
+    x  = Param(0)
+    y  = Param(1)
+    z  = Param(2)
+    # x1,y1 are start, x2,y2 are end
+    x1 = Param(3)
+    y1 = Param(4)
+    x2 = Param(5)
+    y2 = Param(6)
+    # model space start and end points
+    e1 = Param(0, 3, '_ends')
+    e2 = Param(3, 3, '_ends')
+
+    @property
+    def reversed(self):
+        return bool(self._params[7])
+
+    @reversed.setter
+    def reversed(self, value):
+        self._params[7] = value
 
     def add_parameters(self, parameters):
-        # The order isn't a typo.
-        # z is displacement on xt,yt plane
-        self.z = float(parameters[1])
-        # x and y are center coordinates
-        self.x = float(parameters[2])
-        self.y = float(parameters[3])
-
-        # x1,y1 are start, x2,y2 are end
-        self.x1 = float(parameters[4])
-        self.y1 = float(parameters[5])
-        self.x2 = float(parameters[6])
-        self.y2 = float(parameters[7])
-
-        self.reversed = False
-
-        self.e1 = None
-        self.e2 = None
+        # The order isn't a typo: the file gives z first.
+        p = parameters
+        self._params = np.array([p[2], p[3], p[1], p[4], p[5], p[6], p[7], 0.])
+
+        self._ends = np.empty(6)
         self.computeEndpoints()
 
     def __repr__(self):
@@ -115,52 +257,60 @@ class CircArc(Entity):
         s+= "T({0})".format(repr(self.transformation))
         return s
 
+    def frame(self):
+        """
+        Model space frame used by the nearest point queries, cached until the
+        arc is reversed: (center, unit normal, start vector, sweep, sense,
+        radius, e1, e2).
+        """
+        if self._frame is None:
+            P = self.transform(np.array([self.x, self.y, self.z])).reshape(3)
+            N = self.transform(np.array([0., 0., 1.]), orientation_only=True).reshape(3)
+            N = N/np.linalg.norm(N)
+            va = self.transform(np.array([self.x1, self.y1, self.z])).reshape(3) - P
+            vb = self.transform(np.array([self.x2, self.y2, self.z])).reshape(3) - P
+            sign = -1. if self.reversed else 1.
+            sweep = math.atan2(sign*np.dot(np.cross(va, vb), N), np.dot(vb, va)) % (2*math.pi)
+            self._frame = (P, N, va, sweep, sign, self.radius(),
+                           np.reshape(self.e1, 3), np.reshape(self.e2, 3))
+        return self._frame
+
     def nearestPoint(self, X):
         # returns distance from this arc segment to the given point (column vector)
-        P = self.transform(np.array([self.x, self.y, self.z]))
-        N = self.transform(np.array([0., 0., 1.]), orientation_only=True)
-        X = X.reshape(3)
-        v = X - P
-
-        vparr = np.dot(v, N)/(np.linalg.norm(N)**2)*N
-        vperp = v - vparr
-        radius = self.radius()
-        Xproj = P + vperp
-
-        daxial  = np.linalg.norm(vparr)
-        dradial = np.linalg.norm(vperp)-radius
-        dtoroid = math.hypot(daxial, dradial)
-
-        va = (self.transform(np.array([self.x1, self.y1, self.z])) - self.transform(np.array([self.x, self.y, self.z])))
-        vb = (self.transform(np.array([self.x2, self.y2, self.z])) - self.transform(np.array([self.x, self.y, self.z])))
-        vc = vperp
-        thetaE = math.atan2((-1 if self.reversed else +1)*np.dot(np.cross(va, vb), N), np.dot(vb, va))
-        thetaX = math.atan2((-1 if self.reversed else +1)*np.dot(np.cross(va, vc), N), np.dot(vc, va))
-        while thetaX < 0:
-            thetaX += 2*math.pi
-        while thetaE < 0:
-            thetaE += 2*math.pi
-
-        if thetaX > EPSILON and thetaX < thetaE-EPSILON:
-            # in the "swept" section
-            pradial = P + radius*vperp/np.linalg.norm(vperp)
-            return (dtoroid, pradial, False)
-        elif thetaX-thetaE > 2*math.pi-thetaX:
-            # in a sphere close to startpoint
-            d = np.linalg.norm(X-self.e1)
-            return (d, self.e1, 1)
-        else:
-            # in a sphere close to endpoint
-            d = np.linalg.norm(X-self.e2)
-            return (d, self.e2, 2)
+        d, pts, isnode = self.nearestPoints(X)
+        return (d[0], pts[0], int(isnode[0]) or False)
+
+    def nearestPoints(self, X):
+        """ nearestPoint for (M,3) points at once: (distances, points, isnode) arrays """
+        X = np.asarray(X, dtype=float).reshape(-1, 3)
+        P, N, va, sweep, sign, radius, e1, e2 = self.frame()
+        m = len(X)
+        rows = lambda v: np.broadcast_to(v, (m,) + np.shape(v))
+        return nearest_on_arcs(rows(P), rows(N), rows(va), rows(sweep), rows(sign), rows(radius), rows(e1), rows(e2), X)
+
+    def evaluate(self, t):
+        """ Model space points (3, M) at fractions t of the length """
+        t = np.asarray(t, dtype=float).reshape(-1)
+        theta1, theta2 = self.thetas()
+        theta = theta1 + (theta2 - theta1)*t
+        r = self.radius()
+        pts = np.vstack((self.x+np.cos(theta)*r, self.y+np.sin(theta)*r, np.full(len(t), self.z)))
+        return self.transform(pts).reshape(3, -1)
+
+    def fraction(self, X):
+        """ Fractions (M,) of the length at which the points nearest to (M,3) X lie """
+        X = np.asarray(X, dtype=float).reshape(-1, 3)
+        P, N, va, sweep, sign, radius, e1, e2 = self.frame()
+        m = len(X)
+        rows = lambda v: np.broadcast_to(v, (m,) + np.shape(v))
+        return fraction_on_arcs(rows(P), rows(N), rows(va), rows(sweep), rows(sign), X)
 
     def radius(self):
         return math.hypot(self.x1-self.x, self.y1-self.y)
 
     def reverse(self):
-        self.x1, self.x2 = self.x2, self.x1
-        self.y1, self.y2 = self.y2, self.y1
-        self.reversed = True
+        self._params[3:7] = self._params[[5, 6, 3, 4]]
+        self.reversed = not self.reversed
         self.computeEndpoints()
         return self
 
@@ -177,6 +327,7 @@ class CircArc(Entity):
         return (theta1, theta2)
 
     def computeEndpoints(self):
+        self._frame = None
         self.e1 = self.transform(np.array([self.x1, self.y1, self.z]))
         self.e2 = self.transform(np.array([self.x2, self.y2, self.z]))
         return self.e1, self.e2
@@ -198,73 +349,68 @@ class CircArc(Entity):
         n = math.ceil(self.length()/dx)
         return self.linspace(n, endpoint)
 
-class CompCurve(Entity):
-    """ Composite curve (102) """
-    def add_parameters(self, parameters):
-        self.n_curves = int(parameters[1].strip())
-        self.pointers = []
-        for i in range(2, self.n_curves+2):
-            self.pointers.append(int(parameters[i].strip()))
-
-    def add_children(self, children, EPSILON = 1e-5):
-        """ This algorithm isn't the greatest. It's at least O(n^2) """
-        self.children = []
-        
-        comb = combinations(range(len(children)), 2)
-        dists = {}
-        for c in list(comb):
-            a = c[0]
-            b = c[1]
-            # check a.e1 to b.e1 and b.e2
-            # check a.e2 to b.e1 and b.e2
-
-            for x in [(b,1),(b,2),(a,1),(a,2)]:
-                if not x in dists:
-                    dists[x] = {}
-
-            dists[(b, 1)][(a, 1)] = dists[(a, 1)][(b, 1)] = np.linalg.norm(children[a].e1-children[b].e1)
-            dists[(b, 2)][(a, 1)] = dists[(a, 1)][(b, 2)] = np.linalg.norm(children[a].e1-children[b].e2)
-            dists[(b, 1)][(a, 2)] = dists[(a, 2)][(b, 1)] = np.linalg.norm(children[a].e2-children[b].e1)
-            dists[(b, 2)][(a, 2)] = dists[(a, 2)][(b, 2)] = np.linalg.norm(children[a].e2-children[b].e2)
-
-        # at this point we know all the distances from every node.
-
-        # pick a point to be the "starter". If we find an open node we'll change this later.
-        step = (0,1)
-        connections = {}
-
-        for point in dists:            
-            bestpt = min(dists[point], key=dists[point].get)
-            a = children[point[0]].e1 if point[1]==1 else children[point[0]].e2
-            b = children[bestpt[0]].e1 if bestpt[1]==1 else children[bestpt[0]].e2
-            if dists[point][bestpt] > 1e-5:
-                step = point
-                connections[point] = None
-            else:
-                connections[point] = bestpt
-
-        original = step
-
-        while True:
-            if step[1] == 2:
-                children[step[0]].reverse()
-            self.children.append(children[step[0]])
+    def chord_fractions(self, chord_tol, max_len=None, min_len=None):
+        """ Fractions of the length delimiting chords within chord_tol of the curve (sagitta, closed form) """
+        r = self.radius()
+        step = 2*math.acos(min(max(1 - chord_tol/r, -1.), 1.)) if r > 0 else 2*math.pi
+        sweep = abs(self.thetas()[1] - self.thetas()[0])
+        n = max(math.ceil(sweep/max(step, 1e-12)), 1)
+        n = clamp_segments([n], [self.length()], max_len, min_len)[0]
+        return np.linspace(0.0, 1.0, n + 1)
 
-            step = (step[0], 1 if step[1]==2 else 2)
-            step = connections[step]
+class CurveGroup(Entity):
+    """
+    Shared behaviour of entities that group curves end to end
+    (CompCurve, AssociativityInstance).
+    """
+    __slots__ = ('n_curves', 'pointers', 'children', 'flips', 'chains', 'closed', 'junctions', 'e1', 'e2')
 
-            if step is None or step[0] is original[0]:
-                break
+    def add_children(self, children, EPSILON = 1e-5):
+        """
+        Order and orient the members by chaining coincident endpoints; see
+        iges.chaining. A group may hold several open chains and closed loops
+        (self.chains, self.closed); self.children lists them one after another.
+        Junctions where more than two members meet are kept in self.junctions.
+        """
+        e1 = [np.reshape(child.e1, 3) for child in children]
+        e2 = [np.reshape(child.e2, 3) for child in children]
+        degenerate = [np.linalg.norm(a - b) <= EPSILON and child.length() <= EPSILON
+                      for child, a, b in zip(children, e1, e2)]
+        result = chain(e1, e2, EPSILON, degenerate)
+
+        self.chains = []
+        for steps in result.chains:
+            for i, flip in steps:
+                if flip:
+                    children[i].reverse()
+            self.chains.append([children[i] for i, _ in steps])
+        self.closed = result.closed
+        self.junctions = result.junctions
+        if self.junctions:
+            warnings.warn('{0} {1}: {2} junction(s) where more than two members meet'.format(
+                type(self).__name__, getattr(self, 'sequence_number', '?'), len(self.junctions)))
+
+        order = result.order()
+        self.children = [children[i] for i, _ in order]
+        self.flips = [flip for _, flip in order]
+        self.computeEndpoints()
 
+    def set_children(self, children, flips):
+        """ Take children already in chain order; flips marks the ones to reverse """
+        for child, flip in zip(children, flips):
+            if flip:
+                child.reverse()
+        self.children = list(children)
+        self.flips = list(flips)
         self.computeEndpoints()
 
     def computeEndpoints(self):
-        self.e1 = self.transform(self.children[ 0].e1)
-        self.e2 = self.transform(self.children[-1].e2)
+        self.e1 = np.array(self.transform(self.children[ 0].e1))
+        self.e2 = np.array(self.transform(self.children[-1].e2))
         return self.e1, self.e2
 
     def __repr__(self):
-        s = 'CompCurve ('
+        s = type(self).__name__ + ' ('
         s+=', '.join([repr(child) for child in self.children])
         s+=')'
         return s
@@ -302,7 +448,15 @@ class CompCurve(Entity):
                 isnode  = isn
         return (mindist, minpt, isnode)
 
-class AssociativityInstance(Entity):
+class CompCurve(CurveGroup):
+    """ Composite curve (102) """
+    __slots__ = ()
+
+    def add_parameters(self, parameters):
+        self.n_curves = int(parameters[1])
+        self.pointers = parameters[2:self.n_curves+2].astype(int).tolist()
+
+class AssociativityInstance(CurveGroup):
     """
     Associativity Instance Entity (Type 402)
     To be honest, I don't fully grok this, but SW seems to use it rather than composite curves.
@@ -314,122 +468,58 @@ class AssociativityInstance(Entity):
     1+N DE(N) Pointer Pointer to the DE of the last entity
 
     """
+    __slots__ = ()
 
     def add_parameters(self, parameters):
         if self.d['form_number'] == 15: # Ordered Group, no Back Pointers Associativity
-            self.n_curves = int(parameters[1].strip())
-            self.pointers = []
-            for i in range(2, self.n_curves+2):
-                self.pointers.append(int(parameters[i].strip()))
-
-    def add_children(self, children, EPSILON = 1e-5):
-        """ This algorithm isn't the greatest. It's at least O(n^2) """
-        self.children = []
-        
-        comb = combinations(range(len(children)), 2)
-        dists = {}
-        for c in list(comb):
-            a = c[0]
-            b = c[1]
-            # check a.e1 to b.e1 and b.e2
-            # check a.e2 to b.e1 and b.e2
-
-            for x in [(b,1),(b,2),(a,1),(a,2)]:
-                if not x in dists:
-                    dists[x] = {}
-
-            dists[(b, 1)][(a, 1)] = dists[(a, 1)][(b, 1)] = np.linalg.norm(children[a].e1-children[b].e1)
-            dists[(b, 2)][(a, 1)] = dists[(a, 1)][(b, 2)] = np.linalg.norm(children[a].e1-children[b].e2)
-            dists[(b, 1)][(a, 2)] = dists[(a, 2)][(b, 1)] = np.linalg.norm(children[a].e2-children[b].e1)
-            dists[(b, 2)][(a, 2)] = dists[(a, 2)][(b, 2)] = np.linalg.norm(children[a].e2-children[b].e2)
-
-        # at this point we know all the distances from every node.
-
-        # pick a point to be the "starter". If we find an open node we'll change this later.
-        step = (0,1)
-        connections = {}
-
-        for point in dists:
-            bestpt = min(dists[point], key=dists[point].get)
-            a = children[point[0]].e1 if point[1]==1 else children[point[0]].e2
-            b = children[bestpt[0]].e1 if bestpt[1]==1 else children[bestpt[0]].e2
-            if dists[point][bestpt] > 1e-5:
-                step = point
-                connections[point] = None
-            else:
-                connections[point] = bestpt
-
-        original = step
-
-        while True:
-            if step[1] == 2:
-                children[step[0]].reverse()
-            self.children.append(children[step[0]])
-
-            step = (step[0], 1 if step[1]==2 else 2)
-            step = connections[step]
-
-            if step is None or step[0] is original[0]:
-                break
-
-        self.computeEndpoints()
-
-    def computeEndpoints(self):
-        self.e1 = self.transform(self.children[ 0].e1)
-        self.e2 = self.transform(self.children[-1].e2)
-        return self.e1, self.e2
-
-    def __repr__(self):
-        s = 'CompCurve ('
-        s+=', '.join([repr(child) for child in self.children])
-        s+=')'
-        return s
-
-    def length(self):
-        return sum([child.length() for child in self.children])
-
-    def linspace(self, n_points, endpoint=True):
-        stack = []
-        for i, child in enumerate(self.children):
-            if i == len(self.children)-1:
-                stack.append(child.linspace(n_points, endpoint=endpoint))
-            else:
-                stack.append(child.linspace(n_points, endpoint=False))
-        return np.hstack(stack)
-
-    def arange(self, dx, endpoint=False):
-        stack = []
-        for i, child in enumerate(self.children):
-            if i == len(self.children)-1:
-                stack.append(child.arange(dx, endpoint=endpoint))
-            else:
-                stack.append(child.arange(dx, endpoint=False))
-        return np.hstack(stack)
+            self.n_curves = int(parameters[1])
+            self.pointers = parameters[2:self.n_curves+2].astype(int).tolist()
 
 class ColorDefinition(Entity):
     """
     Color Definition Entity Type (Type 314)
     """
-
-    pass
+    __slots__ = ()
 
 class TransformationMatrix(Entity):
-    """Transformation Matrix (124)"""
+    """
+    Transformation Matrix (124)
+    A 124 may itself point to another 124 (its own transformation), which is
+    applied after it; the whole chain is composed once, on first use.
+    """
+    __slots__ = ('R', 'T', '_composed')
 
     def add_parameters(self, parameters):
-        p = [float(param.strip()) for param in parameters]
+        p = parameters
         self.R = np.array([[p[1], p[2], p[3]], [p[5], p[6], p[7]], [p[9], p[10], p[11]]])
         self.T = np.array([p[4], p[8], p[12]]).reshape(3,1)
         # E_T = R*E + T
+        self._composed = None
+
+    def composed(self):
+        """ (R (3,3), T (3,)) of this transform followed by the chain it points to """
+        if self._composed is None:
+            self._composed = False   # resolving
+            R, T = self.R, self.T.reshape(3)
+            if self.transformation is not None:
+                Rp, Tp = self.transformation.composed()
+                R, T = Rp @ R, Rp @ T + Tp
+            self._composed = (R, T)
+        elif self._composed is False:
+            raise ValueError('Cyclic transformation chain at 124 entity {0}'.format(getattr(self, 'sequence_number', '?')))
+        return self._composed
 
     def transform(self, pt, orientation_only=False):
-        pt = pt.reshape(3, -1)
-        out = np.matmul(self.R, pt)
+        """ Transform a point (3,) or points (3, n); the shape is kept """
+        R, T = self.composed()
+        pt = np.asarray(pt, dtype=float)
+        if pt.ndim == 1:
+            out = R @ pt
+            return out if orientation_only else out + T
+        out = R @ pt.reshape(3, -1)
         if not orientation_only:
-            out += np.broadcast_to(self.T, pt.shape)
-        if pt.shape[1] == 1:
-            out = out.reshape(3) # back into 1D vector
-        return out
+            out += T[:, None]
+        return out.reshape(pt.shape)
 
     def __repr__(self):
         s = 'TransformationMatrix '
@@ -437,11 +527,219 @@ class TransformationMatrix(Entity):
         s += 'T = ' + repr(self.T)
         return s
 
-class RationalBSplineCurve(Entity):
+class ParametricCurve(Entity):
+    """
+    Shared behaviour of curves given as points(u) over a parameter range
+    [V0, V1] (RationalBSplineCurve, ParametricSplineCurve, ConicArc).
+    Subclasses provide points(u, derivative) in definition space and
+    breaks(), the parameter values inside (V0, V1) where the curve is only
+    piecewise smooth; sampling is by fractions of the arc length, which is
+    integrated by Gauss-Legendre quadrature between breaks.
+    """
+    __slots__ = ('V0', 'V1', '_ends', '_arc')
+    e1 = Param(0, 3, '_ends')
+    e2 = Param(3, 3, '_ends')
+
+    def breaks(self):
+        return np.zeros(0)
+
+    def _arc_table(self):
+        """
+        Cumulative arc length at a grid of parameter values, by Gauss-Legendre
+        quadrature over every knot span; cached until the curve changes.
+        """
+        if self._arc is None:
+            breaks = np.unique(np.r_[self.V0, self.breaks(), self.V1])
+            grid = np.linspace(breaks[:-1], breaks[1:], QUAD_DIVISIONS + 1, axis=1)
+            ugrid = np.r_[grid[:, :-1].reshape(-1), breaks[-1]]
+            x, wq = np.polynomial.legendre.leggauss(QUAD_POINTS)
+            half = np.diff(ugrid)/2
+            u = (ugrid[:-1] + half)[:, None] + half[:, None]*x
+            _, dC = self.points(u.reshape(-1), derivative=True)
+            speed = np.linalg.norm(dC, axis=1).reshape(u.shape)
+            s = np.r_[0., np.cumsum(half*(speed @ wq))]
+            self._arc = (ugrid, s)
+        return self._arc
+
+    def parameter(self, t):
+        """ Parameter values u at fractions t of the length """
+        ugrid, s = self._arc_table()
+        t = np.asarray(t, dtype=float).reshape(-1)
+        if s[-1] <= 0:
+            return self.V0 + (self.V1 - self.V0)*t
+        target = t*s[-1]
+        u = np.interp(target, s, ugrid)
+        for _ in range(2):
+            # Newton on the exact length
+            partial, speed = self._length_to(u)
+            u = np.clip(u - (partial - target)/np.where(speed > 0, speed, np.inf), self.V0, self.V1)
+        return u
+
+    def _length_to(self, u):
+        """ Arc length from V0 to each parameter value u, and the speed |dC/du| there """
+        ugrid, s = self._arc_table()
+        x, wq = np.polynomial.legendre.leggauss(QUAD_POINTS)
+        k = np.clip(np.searchsorted(ugrid, u, side='right') - 1, 0, len(ugrid) - 2)
+        half = (u - ugrid[k])/2
+        q = (ugrid[k] + half)[:, None] + half[:, None]*x
+        _, dC = self.points(np.r_[q.reshape(-1), u], derivative=True)
+        speed = np.linalg.norm(dC, axis=1)
+        return s[k] + half*(speed[:-len(u)].reshape(q.shape) @ wq), speed[-len(u):]
+
+    def computeEndpoints(self):
+        self._arc = None
+        ends = self.points([self.V0, self.V1])
+        self.e1 = self.transform(ends[0])
+        self.e2 = self.transform(ends[1])
+        return self.e1, self.e2
+
+    def evaluate(self, t):
+        """ Model space points (3, M) at fractions t of the length """
+        return self.transform(self.points(self.parameter(t)).T).reshape(3, -1)
+
+    def length(self):
+        return self._arc_table()[1][-1]
+
+    def linspace(self, n_points, endpoint=True):
+        return self.evaluate(np.linspace(0.0, 1.0, n_points, endpoint=endpoint))
+
+    def arange(self, dx, endpoint=False):
+        n = math.ceil(self.length()/dx)
+        return self.linspace(n, endpoint)
+
+    def chord_fractions(self, chord_tol, max_len=None, min_len=None):
+        """
+        Fractions of the length delimiting chords within chord_tol of the
+        curve: every span between breaks starts as one chord (a curve without
+        breaks as two), split evenly to stay under max_len, then chords whose
+        midpoint strays further than chord_tol are halved, all chords of a
+        level at once, as long as halves stay over min_len.
+        """
+        L = self.length()
+        breaks = self.breaks()
+        edges = np.array([0.0, 1.0])
+        if len(breaks) and L > 0:
+            edges = np.unique(np.r_[edges, np.clip(self._length_to(breaks)[0]/L, 0., 1.)])
+        counts = clamp_segments(np.full(len(edges) - 1, 2 if len(edges) == 2 else 1), np.diff(edges)*L, max_len, None)
+        t = np.unique(np.concatenate([np.linspace(a, b, n + 1) for a, b, n in zip(edges[:-1], edges[1:], counts)]))
+        a, b = t[:-1], t[1:]
+        done = []
+        for _ in range(REFINE_DEPTH):
+            ends = self.evaluate(np.r_[a, b, (a + b)/2]).T.reshape(3, -1, 3)
+            pa, pb, pm = ends
+            d = pb - pa
+            L2 = np.einsum('ij,ij->i', d, d)
+            s = np.clip(np.einsum('ij,ij->i', pm - pa, d)/np.where(L2 > 0, L2, 1.), 0., 1.)
+            deviation = np.linalg.norm(pm - pa - d*s[:, None], axis=1)
+            split = deviation > chord_tol
+            if min_len is not None:
+                split &= (b - a)*L/2 >= min_len
+            done.append(a[~split])
+            a, b = a[split], b[split]
+            if not len(a):
+                break
+            m = (a + b)/2
+            a, b = np.r_[a, m], np.r_[m, b]
+        else:
+            done.append(a)
+        return np.unique(np.r_[np.concatenate(done), 1.0])
+
+    def nearestPoint(self, X):
+        d, pts, isnode = self.nearestPoints(X)
+        return (d[0], pts[0], int(isnode[0]) or False)
+
+    def _model_points(self, u, derivative=False):
+        """ Model space points (M,3) at parameter values u; with derivative, also dC/du """
+        if not derivative:
+            return self.transform(self.points(u).T).reshape(3, -1).T
+        C, dC = self.points(u, derivative=True)
+        return (self.transform(C.T).reshape(3, -1).T,
+                self.transform(dC.T, orientation_only=True).reshape(3, -1).T)
+
+    def _box_at(self, u):
+        """ (6,) model space box of the ends and of the points at parameter values u inside the range """
+        u = np.asarray(u, dtype=float).reshape(-1)
+        u = np.r_[self.V0, self.V1, u[(u > self.V0) & (u < self.V1)]]
+        pts = self._model_points(u)
+        return np.r_[pts.min(axis=0), pts.max(axis=0)]
+
+    def _project(self, X):
+        """
+        Parameter values of the points nearest to (M,3) model space X.
+
+        The nearest of PROJECT_DIVISIONS samples per quadrature sub-interval
+        is bracketed by its neighbours, and the root of the slope of the
+        squared distance, g(u) = dC/du . (C(u) - X), is refined within the
+        bracket by Newton steps that fall back to bisection whenever they
+        leave it or shrink it too slowly. The result is kept only if it is
+        nearer than the best sample and both ends of the curve.
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, 3)
+        grid = self._arc_table()[0]
+        ugrid = np.r_[np.linspace(grid[:-1], grid[1:], PROJECT_DIVISIONS, endpoint=False, axis=1).reshape(-1), grid[-1]]
+        samples = self._model_points(ugrid)
+        best = np.empty(len(X), dtype=np.intp)
+        step = max(PAIR_CHUNK//len(ugrid), 1)
+        for a in range(0, len(X), step):
+            d2 = np.sum((X[a:a+step, None, :] - samples[None, :, :])**2, axis=2)
+            best[a:a+step] = np.argmin(d2, axis=1)
+        lo = ugrid[np.maximum(best - 1, 0)]
+        hi = ugrid[np.minimum(best + 1, len(ugrid) - 1)]
+
+        def slope(u, X):
+            C, dC = self._model_points(u, derivative=True)
+            return np.einsum('ij,ij->i', dC, C - X), np.einsum('ij,ij->i', dC, dC)
+
+        # The minimum lies before the best sample if the distance grows there, else after it
+        u = ugrid[best]
+        g, h = slope(u, X)
+        lo = np.where(g > 0, lo, u)
+        hi = np.where(g > 0, u, hi)
+        last = hi - lo
+        tol = 1e-14*max(abs(self.V1 - self.V0), 1.)
+        active = np.flatnonzero(hi - lo > tol)
+        for _ in range(PROJECT_STEPS):
+            if not len(active):
+                break
+            ua, ga, ha, la, ra = u[active], g[active], h[active], lo[active], hi[active]
+            newton = ua - ga/np.where(ha > 0, ha, np.inf)
+            bisect = ~((newton > la) & (newton < ra)) | (abs(2*ga) > abs(last[active]*ha))
+            new = np.where(bisect, (la + ra)/2, newton)
+            last[active] = abs(new - ua)
+            u[active] = new
+            g[active], h[active] = slope(new, X[active])
+            lo[active] = np.where(g[active] > 0, la, new)
+            hi[active] = np.where(g[active] > 0, new, ra)
+            active = active[(hi[active] - lo[active] > tol) & (last[active] > tol)]
+
+        # Never worse than the best sample or an end of the curve
+        candidates = np.stack((u, ugrid[best], np.full(len(X), ugrid[0]), np.full(len(X), ugrid[-1])), axis=1)
+        d2 = np.sum((self._model_points(candidates.reshape(-1)).reshape(len(X), 4, 3) - X[:, None, :])**2, axis=2)
+        return candidates[np.arange(len(X)), np.argmin(d2, axis=1)]
+
+    def nearestPoints(self, X):
+        """ nearestPoint for (M,3) model space points: (distances, points, isnode) arrays """
+        X = np.asarray(X, dtype=float).reshape(-1, 3)
+        u = self._project(X)
+        pts = self.transform(self.points(u).T).reshape(3, -1).T
+        e1, e2 = np.reshape(self.e1, 3), np.reshape(self.e2, 3)
+        at1 = np.linalg.norm(pts - e1, axis=1) <= EPSILON
+        at2 = ~at1 & (np.linalg.norm(pts - e2, axis=1) <= EPSILON)
+        isnode = np.where(at1, 1, np.where(at2, 2, 0)).astype(np.int8)
+        return np.linalg.norm(X - pts, axis=1), pts, isnode
+
+    def fraction(self, X):
+        """ Fractions (M,) of the length at which the points nearest to (M,3) X lie """
+        partial, _ = self._length_to(self._project(X))
+        return partial/max(self.length(), 1e-300)
+
+class RationalBSplineCurve(ParametricCurve):
     """Rational B-Spline Curve
     IGES Spec v5.3 p. 123 Section 4.23
     See also Appendix B, p. 545
     """
+    __slots__ = ('K', 'M', 'prop1', 'prop2', 'prop3', 'prop4', 'N', 'A', 'T', 'W', 'control_points',
+                 'planar_curve', 'XNORM', 'YNORM', 'ZNORM')
 
     def add_parameters(self, parameters):
         self.K = int(parameters[1])
@@ -455,20 +753,13 @@ class RationalBSplineCurve(Entity):
         self.A = self.N + 2 * self.M
 
         # Knot sequence
-        self.T = []
-        for i in range(7, 7 + self.A + 1):
-            self.T.append(float(parameters[i]))
+        self.T = np.array(parameters[7:8 + self.A])
 
         # Weights
-        self.W = []
-        for i in range(self.A + 8, self.A + self.K + 8):
-            self.W.append(float(parameters[i]))
+        self.W = np.array(parameters[8 + self.A:9 + self.A + self.K])
 
         # Control points
-        self.control_points = []
-        for i in range(9 + self.A + self.K, 9 + self.A + 4*self.K + 1, 3):
-            point = (float(parameters[i]), float(parameters[i+1]), float(parameters[i+2]))
-            self.control_points.append(point)
+        self.control_points = np.array(parameters[9 + self.A + self.K:12 + self.A + 4*self.K]).reshape(-1, 3)
 
         # Parameter values
         self.V0 = float(parameters[12 + self.A + 4 * self.K])
@@ -483,6 +774,71 @@ class RationalBSplineCurve(Entity):
         else:
             self.planar_curve = False
 
+        self._ends = np.empty(6)
+        self.computeEndpoints()
+
+    def basis(self, u, derivative=False):
+        """
+        Basis matrix (len(u), K+1) of the B-spline basis functions at the
+        parameter values u (Cox-de Boor, vectorized over u and the knots);
+        with derivative, also the matrix of their first derivatives.
+        """
+        u = np.asarray(u, dtype=float).reshape(-1)
+        T = self.T
+        p = self.M
+        # Knot span of each u; the end of the range belongs to the last span
+        span = np.clip(np.searchsorted(T, u, side='right') - 1, p, self.K)
+        B = np.zeros((len(u), len(T) - 1))
+        B[np.arange(len(u)), span] = 1.0
+        lower = B
+        for q in range(1, p + 1):
+            lower = B
+            n = len(T) - 1 - q
+            left = T[q:q+n] - T[:n]
+            right = T[q+1:q+1+n] - T[1:1+n]
+            a = np.divide(u[:, None] - T[:n], left, out=np.zeros((len(u), n)), where=left > 0)
+            b = np.divide(T[q+1:q+1+n] - u[:, None], right, out=np.zeros((len(u), n)), where=right > 0)
+            B = a*lower[:, :n] + b*lower[:, 1:n+1]
+        if not derivative:
+            return B
+        dB = np.zeros_like(B)
+        if p > 0:
+            n = self.K + 1
+            left = T[p:p+n] - T[:n]
+            right = T[p+1:p+1+n] - T[1:1+n]
+            a = np.divide(p, left, out=np.zeros(n), where=left > 0)
+            b = np.divide(p, right, out=np.zeros(n), where=right > 0)
+            dB = a*lower[:, :n] - b*lower[:, 1:n+1]
+        return B, dB
+
+    def points(self, u, derivative=False):
+        """
+        Definition space points (M,3) at parameter values u; with derivative,
+        also the first derivatives dC/du (M,3).
+        """
+        B, dB = self.basis(u, derivative=True)
+        Pw = self.control_points*self.W[:, None]
+        w = B @ self.W
+        C = (B @ Pw)/w[:, None]
+        if not derivative:
+            return C
+        dw = dB @ self.W
+        dC = ((dB @ Pw) - dw[:, None]*C)/w[:, None]
+        return C, dC
+
+    def reverse(self):
+        flip = self.T[0] + self.T[-1]
+        self.T = flip - self.T[::-1]
+        self.V0, self.V1 = flip - self.V1, flip - self.V0
+        self.W = self.W[::-1].copy()
+        self.control_points = self.control_points[::-1].copy()
+        self.computeEndpoints()
+        return self
+
+    def breaks(self):
+        """ Distinct knots inside the parameter range """
+        return np.unique(self.T[(self.T > self.V0) & (self.T < self.V1)])
+
     def __str__(self):
         s = '--- Rational B-Spline Curve ---' + os.linesep
         s += Entity.__str__(self) + os.linesep
@@ -494,3 +850,324 @@ class RationalBSplineCurve(Entity):
             s += "Unit normal: {0} {1} {2}".format(self.XNORM, self.YNORM, self.ZNORM)
         return s
 
+
+class ConicArc(ParametricCurve):
+    """
+    Conic arc (104): the part of A x^2 + B xy + C y^2 + D x + E y + F = 0 in
+    the plane z = ZT from (X1, Y1) to (X2, Y2). Ellipses are traced
+    counterclockwise (or clockwise once reversed), a whole ellipse if the
+    two points coincide; hyperbolas and parabolas from start to end.
+
+    Parameters are packed as [A, B, C, D, E, F, ZT, X1, Y1, X2, Y2, reversed].
+    The conic is brought to its axes once (center c, unit axes, semi-axes
+    a and b) and evaluated in closed form, in those axes, as
+    (a cos u, b sin u) for an ellipse, (a cosh u, b sinh u) for a hyperbola
+    and (u, k0 u^2 + k1 u + k2) for a parabola.
+    """
+    __slots__ = ('_params', '_conic')
+    A  = Param(0)
+    B  = Param(1)
+    C  = Param(2)
+    D  = Param(3)
+    E  = Param(4)
+    F  = Param(5)
+    ZT = Param(6)
+    X1 = Param(7)
+    Y1 = Param(8)
+    X2 = Param(9)
+    Y2 = Param(10)
+
+    @property
+    def reversed(self):
+        return bool(self._params[11])
+
+    @reversed.setter
+    def reversed(self, value):
+        self._params[11] = value
+
+    def add_parameters(self, parameters):
+        self._params = np.r_[np.asarray(parameters[1:12], dtype=float), 0.]
+        self._ends = np.empty(6)
+        self.computeEndpoints()
+
+    def __repr__(self):
+        s = 'ConicArc ({0}) '.format(self.kind())
+        s+= "({0}, {1})--({2}, {3}) / {4}".format(self.X1, self.Y1, self.X2, self.Y2, self.ZT)
+        return s
+
+    def kind(self):
+        """ 'ellipse', 'hyperbola' or 'parabola' """
+        return self._canonical()[0]
+
+    def _canonical(self):
+        """
+        (kind, center (2,), axes (2,2) as columns, a, b, (k0, k1, k2)),
+        oriented so that u runs from V0 to V1 along the arc; cached until
+        the arc is reversed.
+        """
+        if self._conic is not None:
+            return self._conic
+        A, B, C, D, E, F = self._params[:6]
+        lam, axes = np.linalg.eigh(np.array([[A, B/2], [B/2, C]]))
+        a = b = 1.
+        k = (0., 0., 0.)
+        if abs(lam).min() <= 1e-9*max(abs(lam).max(), 1e-300):
+            kind = 'parabola'
+            i = int(np.argmax(abs(lam)))
+            axes = axes[:, [i, 1-i]]
+            if np.linalg.det(axes) < 0:
+                # orient the axes before k is expressed in them
+                axes = axes*[1., -1.]
+            da, d0 = axes.T @ [D, E]
+            if d0 == 0:
+                warnings.warn('ConicArc {0}: degenerate parabola'.format(getattr(self, 'sequence_number', '?')))
+                d0 = 1e-300
+            k = (-lam[i]/d0, -da/d0, -F/d0)
+            center = np.zeros(2)
+        else:
+            center = np.linalg.solve(np.array([[A, B/2], [B/2, C]]), -0.5*np.array([D, E]))
+            Fc = F + 0.5*(D*center[0] + E*center[1])
+            if lam[0]*lam[1] > 0:
+                kind = 'ellipse'
+                a, b = np.sqrt(np.abs(Fc/lam))
+            else:
+                kind = 'hyperbola'
+                i = 0 if -Fc/lam[0] > 0 else 1
+                axes = axes[:, [i, 1-i]]
+                a, b = np.sqrt(abs(Fc/lam[i])), np.sqrt(abs(Fc/lam[1-i]))
+            if a == 0 or b == 0:
+                warnings.warn('ConicArc {0}: degenerate {1}'.format(getattr(self, 'sequence_number', '?'), kind))
+        if np.linalg.det(axes) < 0:
+            axes = axes*[1., -1.]
+        start = axes.T @ (np.array([self.X1, self.Y1]) - center)
+        if kind == 'hyperbola' and start[0] < 0:
+            a = -a   # the branch the arc is on
+
+        self._conic = (kind, center, axes, a, b, k)
+        u1, u2 = self._parameter_at(start), self._parameter_at(axes.T @ (np.array([self.X2, self.Y2]) - center))
+        flip = self.reversed if kind == 'ellipse' else u2 < u1
+        if flip:
+            # trace the other way: mirror the parameter
+            if kind == 'parabola':
+                axes = axes*[-1., 1.]
+                k = (k[0], -k[1], k[2])
+            else:
+                axes = axes*[1., -1.]
+            self._conic = (kind, center, axes, a, b, k)
+            u1, u2 = -u1, -u2
+        if kind == 'ellipse' and u2 <= u1:
+            u2 += 2*math.pi*math.ceil((u1 - u2)/(2*math.pi) + 1e-12)
+        self.V0, self.V1 = u1, u2
+        return self._conic
+
+    def _parameter_at(self, local):
+        """ Parameter of a point given in the conic's axes """
+        kind, center, axes, a, b, k = self._conic
+        if kind == 'ellipse':
+            return math.atan2(local[1]/b, local[0]/a)
+        if kind == 'hyperbola':
+            return math.asinh(local[1]/b)
+        return float(local[0])
+
+    def points(self, u, derivative=False):
+        """
+        Definition space points (M,3) at parameter values u; with derivative,
+        also the first derivatives dC/du (M,3).
+        """
+        kind, center, axes, a, b, k = self._canonical()
+        u = np.asarray(u, dtype=float).reshape(-1)
+        if kind == 'ellipse':
+            local = np.stack((a*np.cos(u), b*np.sin(u)), axis=1)
+            dlocal = np.stack((-a*np.sin(u), b*np.cos(u)), axis=1)
+        elif kind == 'hyperbola':
+            local = np.stack((a*np.cosh(u), b*np.sinh(u)), axis=1)
+            dlocal = np.stack((a*np.sinh(u), b*np.cosh(u)), axis=1)
+        else:
+            local = np.stack((u, (k[0]*u + k[1])*u + k[2]), axis=1)
+            dlocal = np.stack((np.ones_like(u), 2*k[0]*u + k[1]), axis=1)
+        C = np.column_stack((center + local @ axes.T, np.full(len(u), self.ZT)))
+        if not derivative:
+            return C
+        return C, np.column_stack((dlocal @ axes.T, np.zeros(len(u))))
+
+    def breaks(self):
+        """ Quarter turns of an ellipse, for the quadrature """
+        self._canonical()
+        if self._conic[0] != 'ellipse':
+            return np.zeros(0)
+        quarter = math.pi/2
+        q = np.arange(math.floor(self.V0/quarter) + 1, math.ceil(self.V1/quarter))*quarter
+        return q[(q > self.V0) & (q < self.V1)]
+
+    def reverse(self):
+        self._params[7:11] = self._params[[9, 10, 7, 8]]
+        self.reversed = not self.reversed
+        self.computeEndpoints()
+        return self
+
+    def bounding_box(self):
+        """
+        Exact (6,) model space box: a model coordinate of the arc is
+        w0 x(u) + w1 y(u) plus a constant, in the conic's axes, so it peaks
+        where the derivative of that has its closed-form roots.
+        """
+        kind, center, axes, a, b, k = self._canonical()
+        W = self.transform(np.eye(3), orientation_only=True)[:, :2] @ axes
+        w0, w1 = W[:, 0], W[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if kind == 'ellipse':
+                # w0 a cos u + w1 b sin u peaks at atan2(w1 b, w0 a), and half a turn later
+                peak = np.arctan2(w1*b, w0*a)
+                n = np.arange(math.floor((self.V0 - peak.max())/math.pi), math.ceil((self.V1 - peak.min())/math.pi) + 1)
+                u = (peak[:, None] + math.pi*n).reshape(-1)
+            elif kind == 'hyperbola':
+                # w0 a sinh u + w1 b cosh u = 0
+                u = np.arctanh(-w1*b/(w0*a))
+            else:
+                # w0 + w1 (2 k0 u + k1) = 0
+                u = -(w0 + w1*k[1])/(2*w1*k[0])
+        return self._box_at(u[np.isfinite(u)])
+
+    def computeEndpoints(self):
+        self._arc = None
+        self._conic = None
+        self._canonical()
+        self.e1 = self.transform(np.array([self.X1, self.Y1, self.ZT]))
+        self.e2 = self.transform(np.array([self.X2, self.Y2, self.ZT]))
+        return self.e1, self.e2
+
+class ParametricSplineCurve(ParametricCurve):
+    """
+    Parametric spline curve (112): N cubic segments over breakpoints
+    T(1) < ... < T(N+1); on segment i, with s = u - T(i), each coordinate
+    is A + B s + C s^2 + D s^3.
+
+    The coefficients are kept as one (N, 3, 4) array [segment, axis, power],
+    so points() evaluates any number of parameter values in one batched
+    Horner pass over their segments.
+    """
+    __slots__ = ('CTYPE', 'H', 'NDIM', 'N', 'T', 'coefficients')
+
+    def add_parameters(self, parameters):
+        self.CTYPE = int(parameters[1])
+        self.H = int(parameters[2])
+        self.NDIM = int(parameters[3])
+        self.N = int(parameters[4])
+        self.T = np.array(parameters[5:6 + self.N], dtype=float)
+        self.coefficients = np.array(parameters[6 + self.N:6 + 13*self.N], dtype=float).reshape(self.N, 3, 4)
+        # The terminal point and its derivatives follow; they are implied by the last segment
+        self.V0, self.V1 = float(self.T[0]), float(self.T[-1])
+        self._ends = np.empty(6)
+        self.computeEndpoints()
+
+    def __repr__(self):
+        return 'ParametricSplineCurve ({0} segments, T = {1}--{2})'.format(self.N, self.V0, self.V1)
+
+    def points(self, u, derivative=False):
+        """
+        Definition space points (M,3) at parameter values u; with derivative,
+        also the first derivatives dC/du (M,3).
+        """
+        u = np.asarray(u, dtype=float).reshape(-1)
+        segment = np.clip(np.searchsorted(self.T, u, side='right') - 1, 0, self.N - 1)
+        s = (u - self.T[segment])[:, None]
+        c = self.coefficients[segment]
+        C = ((c[:, :, 3]*s + c[:, :, 2])*s + c[:, :, 1])*s + c[:, :, 0]
+        if not derivative:
+            return C
+        return C, (3*c[:, :, 3]*s + 2*c[:, :, 2])*s + c[:, :, 1]
+
+    def terminal(self):
+        """ (3, 4) value and first three derivatives over k! of each coordinate at T(N+1), as written in the file """
+        h = self.T[-1] - self.T[-2]
+        a, b, c, d = np.moveaxis(self.coefficients[-1], 1, 0)
+        return np.stack((((d*h + c)*h + b)*h + a, (3*d*h + 2*c)*h + b, 3*d*h + c, d), axis=1)
+
+    def breaks(self):
+        return self.T[1:-1]
+
+    def bounding_box(self):
+        """
+        Exact (6,) model space box: every model coordinate is a cubic on
+        each segment, which peaks at the roots of its derivative.
+        """
+        R = self.transform(np.eye(3), orientation_only=True)
+        c = np.einsum('ja,iap->ijp', R, self.coefficients)
+        s = np.stack(quadratic_roots(3*c[:, :, 3], 2*c[:, :, 2], c[:, :, 1]), axis=2)
+        h = np.diff(self.T)[:, None, None]
+        inside = (s >= 0) & (s <= h)
+        return self._box_at((self.T[:-1, None, None] + s)[inside])
+
+    def reverse(self):
+        # Segment i becomes segment N-1-i, run with s' = h - s: shift each cubic to its far end
+        h = np.diff(self.T)[:, None]
+        a, b, c, d = np.moveaxis(self.coefficients, 2, 0)
+        shifted = np.stack((((d*h + c)*h + b)*h + a, -((3*d*h + 2*c)*h + b), 3*d*h + c, -d), axis=2)
+        self.coefficients = shifted[::-1].copy()
+        self.T = self.T[0] + self.T[-1] - self.T[::-1]
+        self.V0, self.V1 = float(self.T[0]), float(self.T[-1])
+        self.computeEndpoints()
+        return self
+
+class Point(Entity):
+    """
+    Point (116), packed as [x, y, z]. It behaves as a curve of zero length,
+    so it can stand among the members of a composite curve.
+    """
+    __slots__ = ('_params', '_ends', 'symbol')
+    x  = Param(0)
+    y  = Param(1)
+    z  = Param(2)
+    e1 = Param(0, 3, '_ends')
+    e2 = Param(3, 3, '_ends')
+
+    def add_parameters(self, parameters):
+        self._params = np.array(parameters[1:4], dtype=float)
+        # Pointer to a subfigure used as display symbol; not followed
+        self.symbol = int(parameters[4]) if len(parameters) > 4 else 0
+        self._ends = np.empty(6)
+        self.computeEndpoints()
+
+    def __repr__(self):
+        return 'Point ({0}, {1}, {2})'.format(self.x, self.y, self.z)
+
+    def computeEndpoints(self):
+        self.e1 = self.transform(self._params)
+        self.e2 = self.e1
+        return self.e1, self.e2
+
+    def reverse(self):
+        return self
+
+    def length(self):
+        return 0.0
+
+    def evaluate(self, t):
+        """ Model space points (3, M) at fractions t of the length: the point, M times """
+        n = np.size(t)
+        return np.repeat(np.reshape(self.e1, (3, 1)), n, axis=1)
+
+    def linspace(self, n_points, endpoint=True):
+        return np.repeat(np.reshape(self.e1, (3, 1)), n_points, axis=1)
+
+    def arange(self, dx, endpoint=False):
+        return self.linspace(0, endpoint)
+
+    def chord_fractions(self, chord_tol, max_len=None, min_len=None):
+        return np.array([0.0, 1.0])
+
+    def bounding_box(self):
+        return np.r_[self.e1, self.e1]
+
+    def nearestPoint(self, X):
+        d, pts, isnode = self.nearestPoints(X)
+        return (d[0], pts[0], 1)
+
+    def nearestPoints(self, X):
+        """ nearestPoint for (M,3) model space points: (distances, points, isnode) arrays """
+        X = np.asarray(X, dtype=float).reshape(-1, 3)
+        pts = np.repeat(np.reshape(self.e1, (1, 3)), len(X), axis=0)
+        return np.linalg.norm(X - pts, axis=1), pts, np.ones(len(X), dtype=np.int8)
+
+    def fraction(self, X):
+        return np.zeros(len(np.asarray(X, dtype=float).reshape(-1, 3)))
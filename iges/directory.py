@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Directory Entry (D section) parsing.
+
+Every entity owns two 80 column D lines made of 8 column fields
+(IGES spec v5.3, p. 24, Section 2.2.4.4). Because the layout is fixed, the
+whole section can be sliced at once into a NumPy structured array with one
+row per entity instead of walking it line by line.
+"""
+import numpy as np
+
+# (name, line, first column) for every integer field of the two DE lines.
+INT_FIELDS = [
+    ('entity_type_number', 0,  0),
+    ('parameter_pointer',  0,  8),
+    ('structure',          0, 16),
+    ('line_font_pattern',  0, 24),
+    ('level',              0, 32),
+    ('view',               0, 40),
+    ('transform',          0, 48),
+    ('label_assoc',        0, 56),
+    ('status_number',      0, 64),
+    ('sequence_number',    0, 73),
+    ('line_weight_number', 1,  8),
+    ('color_number',       1, 16),
+    ('param_line_count',   1, 24),
+    ('form_number',        1, 32),
+    ('entity_subs_num',    1, 64),
+]
+
+# Fields are at most 8 digits, so int32 holds any of them at half the memory.
+DIRECTORY_DTYPE = np.dtype([(name, np.int32) for name, _, _ in INT_FIELDS] +
+                           [('entity_label', 'U8')])
+
+RECORD_WIDTH = 80
+_ZERO  = ord('0')
+_MINUS = ord('-')
+
+
+def _parse_int_columns(chars):
+    """
+    Parse a (n, width) array of ASCII codes as right or left justified
+    integers. Blank fields default to 0, as the spec prescribes for the DE.
+    """
+    value = np.zeros(chars.shape[0], dtype=np.int64)
+    for col in range(chars.shape[1]):
+        digit = chars[:, col].astype(np.int64) - _ZERO
+        is_digit = (digit >= 0) & (digit <= 9)
+        value = np.where(is_digit, value*10 + digit, value)
+    negative = (chars == _MINUS).any(axis=1)
+    return np.where(negative, -value, value)
+
+
+def directory_chars(lines):
+    """
+    Pack D lines into a (n_entities, 2, 80) array of ASCII codes.
+    Short lines are space padded; line terminators are dropped.
+    """
+    text = ''.join(line.rstrip('\r\n')[:RECORD_WIDTH].ljust(RECORD_WIDTH) for line in lines)
+    chars = np.frombuffer(text.encode('latin-1'), dtype=np.uint8)
+    return chars.reshape(-1, 2, RECORD_WIDTH)
+
+
+def parse_directory(lines):
+    """
+    Parse the D section into a structured array of DIRECTORY_DTYPE.
+    `lines` holds only D lines, two per entity, in file order.
+    """
+    if len(lines) % 2:
+        raise ValueError('Directory section has an odd number of lines ({0})'.format(len(lines)))
+
+    chars = directory_chars(lines)
+    table = np.empty(chars.shape[0], dtype=DIRECTORY_DTYPE)
+    for name, line, start in INT_FIELDS:
+        width = 7 if name == 'sequence_number' else 8
+        table[name] = _parse_int_columns(chars[:, line, start:start+width])
+
+    labels = np.ascontiguousarray(chars[:, 1, 56:64]).view('S8').reshape(-1)
+    table['entity_label'] = np.char.strip(labels.astype('U8'))
+    return table
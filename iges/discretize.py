@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Whole-model discretization into one contiguous point buffer.
+
+Segment counts are computed for every leaf curve first, then a single
+(3, total_points) float64 buffer is allocated and filled in place, one
+vectorized pass per geometry table. Which points belong to which curve is
+described CSR style:
+
+    points[:, offsets[k]:offsets[k+1]]              top-level curve k
+    points[:, child_offsets[j]:child_offsets[j+1]]  leaf curve j
+
+Each top-level curve is sampled like its own linspace(n_points, endpoint) or
+arange(dx, endpoint): the leaves of a composite curve leave out their
+endpoint except the last one.
+
+The adaptive mode (chord_tol) instead picks segments per leaf so that no
+chord strays further than chord_tol from the curve: one segment for a line,
+a closed-form count from radius and sagitta for an arc, recursive halving
+for a spline; max_len and min_len bound the segment lengths.
+"""
+import numpy as np
+from iges.curves_surfaces import CurveGroup
+from iges.tables import fractions, locate, clamp_segments
+
+
+class Discretization(object):
+    """
+    points        (3, P) float64
+    offsets       (K+1,) CSR offsets of the K top-level curves
+    entity_ids    (K,)   entity_list index of each top-level curve
+    child_offsets (J+1,) CSR offsets of the J leaf curves
+    child_ids     (J,)   entity_list index of each leaf curve
+    child_parent  (J,)   top-level slot (0..K-1) each leaf belongs to
+    """
+    def __init__(self, points, offsets, entity_ids, child_offsets, child_ids, child_parent):
+        self.points = points
+        self.offsets = offsets
+        self.entity_ids = entity_ids
+        self.child_offsets = child_offsets
+        self.child_ids = child_ids
+        self.child_parent = child_parent
+
+    def __len__(self):
+        return len(self.entity_ids)
+
+    def __getitem__(self, k):
+        """ Points of the k-th top-level curve """
+        return self.points[:, self.offsets[k]:self.offsets[k+1]]
+
+    def polyline(self):
+        """
+        All curves as one (3, P + K - 1) polyline, a NaN column between
+        consecutive top-level curves, so a plotter draws them in one call
+        """
+        counts = np.diff(self.offsets)
+        out = np.full((3, self.points.shape[1] + max(len(counts) - 1, 0)), np.nan)
+        out[:, np.arange(self.points.shape[1]) + np.repeat(np.arange(len(counts)), counts)] = self.points
+        return out
+
+
+def leaves(entity, endpoint=True):
+    """
+    Yield (leaf curve, endpoint flag) in sampling order. Groups that were
+    never linked (402 forms other than 15) have no members and yield nothing.
+    """
+    if not isinstance(entity, CurveGroup):
+        yield entity, endpoint
+        return
+    children = getattr(entity, 'children', ())
+    for i, child in enumerate(children):
+        for leaf in leaves(child, endpoint and i == len(children)-1):
+            yield leaf
+
+
+def leaf_lengths(leaf_list, which, row, tables):
+    """ Length of every leaf, from the tables where possible """
+    lengths = np.empty(len(leaf_list))
+    for t, table in enumerate(tables):
+        mine = which == t
+        lengths[mine] = table.lengths()[row[mine]]
+    for j in np.flatnonzero(which < 0).tolist():
+        lengths[j] = leaf_list[j].length()
+    return lengths
+
+
+def chord_segments(leaf_list, which, row, tables, chord_tol, max_len=None, min_len=None):
+    """
+    Segments per leaf for a chord tolerance, plus {leaf: fractions} of the
+    leaves outside the tables, which may be spaced unevenly.
+    """
+    counts = np.empty(len(leaf_list), dtype=np.int64)
+    for t, table in enumerate(tables):
+        mine = which == t
+        counts[mine] = table.chord_segments(chord_tol)[row[mine]]
+    lengths = leaf_lengths(leaf_list, which, row, tables)
+    counts = clamp_segments(counts, lengths, max_len, min_len)
+    uneven = {}
+    for j in np.flatnonzero(which < 0).tolist():
+        uneven[j] = leaf_list[j].chord_fractions(chord_tol, max_len, min_len)
+        counts[j] = len(uneven[j]) - 1
+    return counts, uneven
+
+
+def discretize(entities, dx=None, n_points=None, endpoint=True, tables=(), index=None,
+               chord_tol=None, max_len=None, min_len=None):
+    """
+    Sample `entities` (top-level curves) either every ~dx, n_points times
+    per leaf curve, or adaptively within chord_tol (see the module
+    docstring). `tables` are GeometryTables used for vectorized filling;
+    leaves not found in them fall back to their own linspace. `index` maps
+    an entity to its id in the output (default: position in `entities`,
+    -1 for leaves that are not listed).
+    """
+    if sum(x is not None for x in (dx, n_points, chord_tol)) != 1:
+        raise ValueError('Give exactly one of dx, n_points or chord_tol')
+
+    curves = [e for e in entities if hasattr(e, 'linspace')]
+
+    leaf_list = []
+    flags = []
+    parent = []
+    for k, e in enumerate(curves):
+        for leaf, flag in leaves(e, endpoint):
+            leaf_list.append(leaf)
+            flags.append(flag)
+            parent.append(k)
+    flags = np.array(flags, dtype=bool)
+    which, row = locate(leaf_list, tables)
+
+    # Point counts first
+    uneven = {}
+    if n_points is not None:
+        counts = np.full(len(leaf_list), n_points, dtype=np.int64)
+    elif dx is not None:
+        counts = np.ceil(leaf_lengths(leaf_list, which, row, tables)/dx).astype(np.int64)
+    else:
+        segments, uneven = chord_segments(leaf_list, which, row, tables, chord_tol, max_len, min_len)
+        counts = segments + flags
+
+    child_offsets = np.zeros(len(leaf_list) + 1, dtype=np.int64)
+    np.cumsum(counts, out=child_offsets[1:])
+    points = np.empty((3, child_offsets[-1]))
+
+    # Then fill in place, one pass per table
+    for t, table in enumerate(tables):
+        mine = np.flatnonzero(which == t)
+        if len(mine) == 0:
+            continue
+        local_offsets, local_leaf, frac = fractions(counts[mine], flags[mine])
+        dest = child_offsets[mine][local_leaf] + (np.arange(len(frac)) - local_offsets[local_leaf])
+        points[:, dest] = table.evaluate(row[mine][local_leaf], frac)
+    for j in np.flatnonzero(which < 0).tolist():
+        a, b = child_offsets[j], child_offsets[j+1]
+        if j in uneven:
+            points[:, a:b] = leaf_list[j].evaluate(uneven[j][:b-a])
+        elif b > a:
+            points[:, a:b] = leaf_list[j].linspace(b - a, endpoint=bool(flags[j])).reshape(3, -1)
+
+    parent = np.array(parent, dtype=np.int64)
+    top_counts = np.bincount(parent, weights=counts, minlength=len(curves)).astype(np.int64)
+    offsets = np.zeros(len(curves) + 1, dtype=np.int64)
+    np.cumsum(top_counts, out=offsets[1:])
+
+    if index is None:
+        positions = {id(e): i for i, e in enumerate(entities)}
+        index = lambda e: positions.get(id(e), -1)
+    entity_ids = np.array([index(e) for e in curves], dtype=np.int64)
+    child_ids = np.array([index(e) for e in leaf_list], dtype=np.int64)
+    return Discretization(points, offsets, entity_ids, child_offsets, child_ids, parent)
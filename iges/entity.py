@@ -1,25 +1,81 @@
 #!/usr/bin/env python
 import os
+import numpy as np
 from iges.constants import line_font_pattern
+from iges.directory import DIRECTORY_DTYPE
+from iges.parameters import tokenize, _to_float
+
+def process_global_section(global_string, param_sep=',', record_sep=';'):
+    """
+    Global section parameters (IGES spec v5.3, p. 17, Table 2), in order:
+    Hollerith strings as str, numbers as float, defaulted ones as None.
+    """
+    tokens, strings = tokenize(global_string, param_sep, record_sep)
+    values = []
+    for i, token in enumerate(tokens):
+        if i in strings:
+            values.append(strings[i])
+        elif not token.strip():
+            values.append(None)
+        else:
+            try:
+                values.append(_to_float(token))
+            except ValueError:
+                values.append(token.strip())
+    return values
 
-def process_global_section(global_string):
-    print(global_string)
 
+class Entity(object):
+    """
+    Base of all entities. The DE fields are not copied: an entity keeps the
+    shared directory table and its row number, and `d` is a view of that row.
+    Entities can be weakly referenced (see iges.write).
+    """
+    __slots__ = ('_directory', '_row', 'transformation', '__weakref__')
 
-class Entity():
     def __init__(self):
-        self.d = dict()
+        self._directory = None
+        self._row = 0
         self.transformation = None
 
+    @property
+    def d(self):
+        """ DE fields by name, a view of this entity's row of the directory table """
+        if self._directory is None:
+            self._directory = np.zeros(1, dtype=DIRECTORY_DTYPE)
+        return self._directory[self._row]
+
+    @property
+    def sequence_number(self):
+        return int(self.d['sequence_number'])
+
+    @sequence_number.setter
+    def sequence_number(self, value):
+        self.d['sequence_number'] = value
+
+    def attach(self, directory, row):
+        """ Take DE fields from row `row` of a directory table (see iges.directory) """
+        self._directory = directory
+        self._row = row
+
+    def detach(self):
+        """ Keep a copy of this entity's row, so the shared directory table can be freed """
+        self.attach(self.d.reshape(1).copy() if self.d.ndim else np.array([self.d]), 0)
+
     def add_section(self, string, key, type='int'):
         string = string.strip()
         if type == 'string':
             self.d[key] = string
         else:
-            if len(string) > 0:
-                self.d[key] = int(string)
-            else:
-                self.d[key] = None
+            self.d[key] = int(string) if len(string) > 0 else 0
+
+    def add_directory(self, fields):
+        """ Take all DE fields at once, e.g. one row of iges.directory.parse_directory """
+        fields = dict(fields)
+        row = np.zeros(1, dtype=DIRECTORY_DTYPE)
+        for name in DIRECTORY_DTYPE.names:
+            row[name] = fields.get(name, 0)
+        self.attach(row, 0)
 
     def transform(self, pt, orientation_only=False):
         # pt is a column vector
@@ -33,7 +89,7 @@ class Entity():
         s += str(self.d['entity_type_number']) + os.linesep
         s += str(self.d['parameter_pointer']) + os.linesep
         s += str(self.d['structure']) + os.linesep
-        s += line_font_pattern[self.d['line_font_pattern']] + os.linesep
+        s += line_font_pattern.get(int(self.d['line_font_pattern']), 'Pointer') + os.linesep
         s += str(self.d['level']) + os.linesep
         s += str(self.d['view']) + os.linesep
         s += str(self.d['transform']) + os.linesep
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+"""
+Incremental re-parse of an edited IGES file.
+
+Every entity of a model loaded with reloadable=True gets a key at load
+time (a reload keeps the new keys for the next one): a digest of its own DE
+fields (not the
+pointer fields, nor the sequence number or P line pointer, which shift when
+records are inserted) and of the raw text of its P record, less the member
+pointers of groups (102, 402). On reload, each
+entity's key is extended with the keys of the 124 it points to and of its
+group members, recursively, so an entity matches an old one exactly when
+it and everything it depends on is unchanged, wherever it now sits in the
+file.
+
+- matched entities are reused as they are: not re-parsed, not re-chained;
+- an unmatched entity at the sequence number of an unmatched old entity of
+  the same type is modified: the old object is re-parsed in place;
+- the rest are added, or removed;
+- a reused member of a group that is chained again is re-read too, to
+  start from its orientation in the file, so it is reported as modified.
+
+Only the P records of modified and added entities are tokenized (and the
+group records, for their member pointers), and only modified or added groups
+are chained again; since a group's key covers its members, editing a member
+marks its group modified. The reference graph, geometry tables and
+parameter arrays are rebuilt with their usual vectorized passes.
+"""
+import hashlib
+import warnings
+import numpy as np
+from iges.directory import parse_directory
+from iges.parameters import ParameterSection, record_values, tokenize
+from iges.references import resolve, MEMBER, ReferenceGraph
+from iges.curves_surfaces import TransformationMatrix, CompCurve, AssociativityInstance, CurveGroup
+from iges.entity import process_global_section
+
+GROUP_TYPES = (102, 402)
+# DE fields that are plain values, not pointers
+VALUE_FIELDS = ('entity_type_number', 'form_number', 'line_weight_number', 'status_number', 'entity_subs_num')
+# DE fields that hold values when >= 0 and pointers when < 0
+SIGNED_FIELDS = ('line_font_pattern', 'level', 'color_number')
+
+
+class ChangeSet(object):
+    """
+    added, removed, modified: lists of entities (removed ones are the old
+    objects; modified ones were re-parsed in place, so they are the same
+    objects as before). unchanged: number of entities reused as they were.
+    """
+    def __init__(self, added, removed, modified, unchanged):
+        self.added = added
+        self.removed = removed
+        self.modified = modified
+        self.unchanged = unchanged
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.modified)
+
+    def __repr__(self):
+        return 'ChangeSet(added={0}, removed={1}, modified={2}, unchanged={3})'.format(
+            len(self.added), len(self.removed), len(self.modified), self.unchanged)
+
+
+def record_texts(p_lines):
+    """ {DE pointer: text of its P record (columns 1-64 of its lines)} """
+    texts = {}
+    parts = []
+    current = None
+    for line in p_lines:
+        line = line.rstrip('\r\n')
+        key = line[64:72]
+        if key != current:
+            if parts:
+                texts[int(current)] = ''.join(parts)
+            parts = []
+            current = key
+        parts.append(line[:64].ljust(64))
+    if parts:
+        texts[int(current)] = ''.join(parts)
+    return texts
+
+
+def _without_members(text, param_sep, record_sep):
+    """ Group record text with its member pointers left out """
+    tokens, strings = tokenize(text, param_sep, record_sep)
+    try:
+        n = int(tokens[1])
+    except (IndexError, ValueError):
+        return text
+    tokens = [t.strip() for t in tokens]
+    return repr((tokens[:2] + tokens[2+n:], sorted(strings.items())))
+
+
+def record_keys(directory, texts, param_sep=',', record_sep=';'):
+    """
+    16 byte digest per directory row of its own DE fields and P record text
+    (for groups, less the member pointers; their members' keys stand in for them)
+    """
+    fields = [directory[name] for name in VALUE_FIELDS]
+    fields += [np.maximum(directory[name], -1) for name in SIGNED_FIELDS]
+    rows = np.ascontiguousarray(np.stack(fields, axis=1).astype(np.int64)).tobytes()
+    width = 8*len(fields)
+    labels = directory['entity_label'].tolist()
+    is_group = np.isin(directory['entity_type_number'], GROUP_TYPES).tolist()
+    keys = []
+    for i, seq in enumerate(directory['sequence_number'].tolist()):
+        h = hashlib.blake2b(rows[i*width:(i+1)*width], digest_size=16)
+        h.update(labels[i].encode('latin-1', 'replace'))
+        text = texts.get(seq, '')
+        if is_group[i]:
+            text = _without_members(text, param_sep, record_sep)
+        h.update(text.encode('latin-1', 'replace'))
+        keys.append(h.digest())
+    return np.array(keys, dtype='S16')
+
+
+def deep_keys(own, transform_of, members_of):
+    """
+    Keys covering each entity, the 124 it points to and its members,
+    recursively. transform_of: index or -1 per entity; members_of: {index: [indices]}.
+    """
+    own = own.tolist()
+    deep = [None]*len(own)
+
+    def key(i, seen):
+        if deep[i] is not None:
+            return deep[i]
+        if i in seen:
+            return own[i]   # cyclic reference: stop here
+        seen.add(i)
+        h = hashlib.blake2b(own[i], digest_size=16)
+        t = transform_of[i]
+        if t >= 0:
+            h.update(b'T' + key(t, seen))
+        for m in members_of.get(i, ()):
+            h.update(b'M' + key(m, seen))
+        seen.discard(i)
+        deep[i] = h.digest()
+        return deep[i]
+
+    for i in range(len(own)):
+        key(i, set())
+    return deep
+
+
+def transforms_of(directory):
+    """ Index of the entity each row's transform pointer leads to, -1 for none """
+    ptr = directory['transform']
+    target = resolve(directory['sequence_number'], ptr)
+    target[ptr <= 0] = -1
+    return target
+
+
+def group_pointers(directory, texts, param_sep, record_sep):
+    """
+    Member pointers of the group entities, from their P records only:
+    ({row: pointers}, {row: (values, strings)})
+    """
+    classes = {102: CompCurve, 402: AssociativityInstance}
+    pointers = {}
+    records = {}
+    rows = np.flatnonzero(np.isin(directory['entity_type_number'], GROUP_TYPES))
+    for i in rows.tolist():
+        group = classes[int(directory['entity_type_number'][i])]()
+        group.attach(directory, i)
+        records[i] = record_values(texts.get(group.sequence_number, ''), param_sep, record_sep)
+        group.add_parameters(records[i][0])
+        if getattr(group, 'pointers', None) is not None:
+            pointers[i] = group.pointers[:group.n_curves]
+    return pointers, records
+
+
+def old_record_values(parameters, pointer_dict):
+    """ {entity index: (values, strings keyed by parameter index)} of a ParameterSection """
+    offsets = parameters.offsets
+    strings = {}
+    if parameters.strings:
+        keys = np.array(sorted(parameters.strings), dtype=np.int64)
+        recs = np.searchsorted(offsets, keys, side='right') - 1
+        for k, r in zip(keys.tolist(), recs.tolist()):
+            strings.setdefault(r, {})[k - int(offsets[r])] = parameters.strings[k]
+    out = {}
+    for k, ptr in enumerate(parameters.pointers.tolist()):
+        i = pointer_dict.get(ptr)
+        if i is not None:
+            out[i] = (parameters.record(k), strings.get(k, {}))
+    return out
+
+
+def merged_parameters(directory, records):
+    """ ParameterSection from per-row (values, strings), in row order """
+    rows = sorted(records)
+    pointers = directory['sequence_number'][rows] if rows else np.zeros(0, dtype=np.int64)
+    counts = [len(records[i][0]) for i in rows]
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    values = np.concatenate([records[i][0] for i in rows]) if rows else np.zeros(0)
+    strings = {}
+    for k, i in enumerate(rows):
+        base = int(offsets[k])
+        strings.update((base + j, s) for j, s in records[i][1].items())
+    return ParameterSection.from_chunks([(pointers, offsets, values, strings)])
+
+
+def reload(igs, f):
+    """ Bring an IGES_Object up to date with an edited file; returns a ChangeSet """
+    from iges.read import read_sections, separators, make_entity, link_transforms
+    from iges.tables import LineTable, ArcTable
+    from iges.curves_surfaces import Line, CircArc
+    from iges.select import select
+
+    if isinstance(f, str):
+        with open(f, 'r', encoding='latin-1') as fh:
+            global_string, d_lines, p_lines = read_sections(fh)
+    else:
+        global_string, d_lines, p_lines = read_sections(f)
+    param_sep, record_sep = separators(global_string)
+    directory = parse_directory(d_lines)
+    if igs.selection:
+        directory, p_lines = select(directory, p_lines, igs.selection, param_sep, record_sep)
+    texts = record_texts(p_lines)
+    own = record_keys(directory, texts, param_sep, record_sep)
+    sequence = directory['sequence_number'].tolist()
+    types = directory['entity_type_number'].tolist()
+    pointer_dict = dict(zip(sequence, range(len(sequence))))
+
+    # What each new entity depends on
+    pointers, group_records = group_pointers(directory, texts, param_sep, record_sep)
+    groups = list(pointers)
+    counts = [len(pointers[i]) for i in groups]
+    target = resolve(directory['sequence_number'], np.array([p for i in groups for p in pointers[i]], dtype=np.int64))
+    bounds = np.r_[0, np.cumsum(counts, dtype=np.int64)].tolist()
+    members = {}
+    for k, i in enumerate(groups):
+        t = target[bounds[k]:bounds[k+1]]
+        members[i] = t[t >= 0].tolist()
+    new_keys = deep_keys(own, transforms_of(directory).tolist(), members)
+
+    # ... and each old one
+    old_list = igs.entity_list
+    if igs.record_keys is not None:
+        old_members = {i: igs.references.children(i, MEMBER).tolist() for i in igs.references.sources(MEMBER).tolist()}
+        old_keys = deep_keys(igs.record_keys, transforms_of(igs.directory).tolist(), old_members)
+    else:
+        old_keys = [None]*len(old_list)
+    by_key = {}
+    for j, k in enumerate(old_keys):
+        if k is not None:
+            by_key.setdefault(k, []).append(j)
+
+    # Match
+    reused = {}
+    for i, k in enumerate(new_keys):
+        candidates = by_key.get(k)
+        if candidates:
+            reused[i] = candidates.pop(0)
+    unmatched_old = set(range(len(old_list))) - set(reused.values())
+    old_at = {(old_list[j].sequence_number, int(old_list[j].d['entity_type_number'])): j for j in unmatched_old}
+    modified = {}
+    for i in range(len(new_keys)):
+        if i not in reused:
+            j = old_at.pop((sequence[i], types[i]), None)
+            if j is not None:
+                modified[i] = j
+    removed = [old_list[j] for j in sorted(set(old_at.values()))]
+
+    old_records = old_record_values(igs.parameters, igs.pointer_dict)
+    entity_list = []
+    for i in range(len(sequence)):
+        j = reused.get(i, modified.get(i))
+        e = make_entity(directory, i) if j is None else old_list[j]
+        e.attach(directory, i)
+        entity_list.append(e)
+    changed = [i for i in range(len(entity_list)) if i not in reused]
+    for i in changed:
+        entity_list[i].transformation = None
+    link_transforms(entity_list, pointer_dict)
+
+    # Parse what changed, transformation matrices first
+    records = {i: old_records[reused[i]] for i in reused if reused[i] in old_records}
+    records.update((i, group_records[i]) for i in reused if i in group_records)
+
+    def parse(i):
+        values, strings = record_values(texts.get(sequence[i], ''), param_sep, record_sep)
+        records[i] = (values, strings)
+        entity_list[i].add_parameters(values)
+
+    for first in (True, False):
+        for i in changed:
+            if isinstance(entity_list[i], TransformationMatrix) == first:
+                parse(i)
+    # Reused groups keep their children; their pointers now carry the new numbers
+    for i, ptrs in pointers.items():
+        if i in reused:
+            entity_list[i].pointers = list(ptrs)
+            entity_list[i].n_curves = len(ptrs)
+
+    references = ReferenceGraph.from_model(entity_list, directory)
+    lost, ptrs, kinds = references.dangling
+    for i, ptr in zip(lost[kinds == MEMBER].tolist(), ptrs[kinds == MEMBER].tolist()):
+        warnings.warn('Entity {0}: member pointer {1} does not lead to any directory entry'.format(sequence[i], ptr))
+    is_member = references.referenced(MEMBER).tolist()
+
+    # Chain only the groups that changed; reused members are re-read first so
+    # that they start from their orientation in the file, as in a full load
+    changed_set = set(changed)
+    reread = set()
+    for index in references.sources(MEMBER).tolist():
+        if index not in changed_set:
+            continue
+        children = references.children(index, MEMBER).tolist()
+        for c in children:
+            if c not in changed_set and c not in reread and not isinstance(entity_list[c], CurveGroup):
+                parse(c)
+                reread.add(c)
+        entity_list[index].add_children([entity_list[c] for c in children])
+
+    igs.lines = LineTable(e for e in entity_list if isinstance(e, Line))
+    igs.arcs = ArcTable(e for e in entity_list if isinstance(e, CircArc))
+    igs.parameters = merged_parameters(directory, records)
+    igs.entity_list = entity_list
+    igs.global_string = global_string
+    igs.global_parameters = process_global_section(global_string, param_sep, record_sep)
+    igs.pointer_dict = pointer_dict
+    igs.directory = directory
+    igs.toplevel_entities = [e for e, member in zip(entity_list, is_member) if not member]
+    igs.references = references
+    igs.record_keys = own
+    igs._bounds = None
+    igs.stats = None
+
+    return ChangeSet([entity_list[i] for i in changed if i not in modified],
+                     removed, [entity_list[i] for i in sorted(set(modified) | reread)], len(reused) - len(reread))
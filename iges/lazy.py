@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+Lazy, memory-mapped access to IGES files.
+
+Opening only indexes the file: one scan finds the byte offset of every line,
+the D section is parsed into the directory table and the P section is kept
+as a table of line offsets. An entity's parameters are parsed the first time
+it is reached through entity_list, a pointer_dict index or
+toplevel_entities, so memory grows with what is touched, not with file size.
+"""
+import mmap
+import warnings
+import numpy as np
+from iges.directory import parse_directory
+from iges.read import make_entity, separators
+from iges.parameters import record_values
+from iges.entity import process_global_section
+
+SCAN_CHUNK = 1 << 24
+GROUP_TYPES = (102, 402)
+
+
+def line_offsets(mm, chunk=SCAN_CHUNK):
+    """ Byte offset of the start of every line in a buffer, in chunks to bound memory """
+    starts = [np.zeros(1, dtype=np.int64)]
+    size = len(mm)
+    for offset in range(0, size, chunk):
+        count = min(chunk, size - offset)
+        buf = np.frombuffer(mm, dtype=np.uint8, count=count, offset=offset)
+        starts.append(np.flatnonzero(buf == 10).astype(np.int64) + offset + 1)
+        del buf
+    starts = np.concatenate(starts)
+    return starts[starts < size]
+
+
+class LazyEntityList(object):
+    """ Sequence of entities that are parsed on first access """
+    def __init__(self, model, indices=None):
+        self._model = model
+        self._indices = indices
+
+    def __len__(self):
+        if self._indices is None:
+            return len(self._model.directory)
+        return len(self._indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError('entity index out of range')
+        if self._indices is not None:
+            i = int(self._indices[i])
+        return self._model.entity(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class LazyIGES_Object(object):
+    """
+    Random-access counterpart of IGES_Object.
+    `f` is a path or a file object with a fileno(), opened in either mode.
+    """
+    def __init__(self, f):
+        if isinstance(f, str):
+            with open(f, 'rb') as fh:
+                self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        mm = self._mm
+        starts = line_offsets(mm)
+        # Section letter of every line sits in column 73
+        codes = self._section_codes(starts)
+
+        g_starts = starts[codes == ord('G')]
+        d_starts = starts[codes == ord('D')]
+        self._p_starts = starts[codes == ord('P')]
+
+        self.global_string = ''.join(self._line(s)[:72] for s in g_starts.tolist())
+        self.param_sep, self.record_sep = separators(self.global_string)
+        self.global_parameters = process_global_section(self.global_string, self.param_sep, self.record_sep)
+
+        if len(d_starts):
+            first, last = int(d_starts[0]), self._line_end(int(d_starts[-1]))
+            d_lines = mm[first:last].decode('latin-1').splitlines()
+        else:
+            d_lines = []
+        self.directory = parse_directory(d_lines)
+        self.pointer_dict = dict(zip(self.directory['sequence_number'].tolist(), range(len(self.directory))))
+
+        self._entities = {}
+        self._linked = set()
+        self._toplevel = None
+        self.entity_list = LazyEntityList(self)
+
+    def _section_codes(self, starts):
+        mm = self._mm
+        pos = starts + 72
+        codes = np.full(len(starts), 32, dtype=np.uint8)
+        valid = pos < len(mm)
+        buf = np.frombuffer(mm, dtype=np.uint8)
+        codes[valid] = buf[pos[valid]]
+        del buf
+        return codes
+
+    def _line_end(self, start):
+        end = self._mm.find(b'\n', start)
+        return len(self._mm) if end < 0 else end + 1
+
+    def _line(self, start):
+        return self._mm[start:self._line_end(start)].decode('latin-1').rstrip('\r\n')
+
+    def parameters(self, i):
+        """ Parameter values of entity i, read straight from the map """
+        first = int(self.directory['parameter_pointer'][i]) - 1
+        count = max(int(self.directory['param_line_count'][i]), 1)
+        lines = [self._line(int(s)) for s in self._p_starts[first:first+count].tolist()]
+        return record_values(''.join(line[:64] for line in lines), self.param_sep, self.record_sep)[0]
+
+    def _parsed(self, i):
+        """ Entity i with its transformation and parameters, but no children """
+        e = self._entities.get(i)
+        if e is None:
+            e = make_entity(self.directory, i)
+            self._entities[i] = e
+            if e.d['transform']:
+                t = self.pointer_dict.get(e.d['transform'])
+                if t is None or self.directory['entity_type_number'][t] != 124:
+                    warnings.warn('Entity {0}: transformation pointer {1} does not point to a 124 entity'.format(e.sequence_number, e.d['transform']))
+                else:
+                    e.transformation = self._parsed(t)
+            e.add_parameters(self.parameters(i))
+        return e
+
+    def entity(self, i):
+        """ Entity i, fully linked """
+        e = self._parsed(i)
+        if i not in self._linked:
+            self._linked.add(i)
+            if hasattr(e, 'pointers'):
+                members = [self.pointer_dict.get(ptr) for ptr in e.pointers[:e.n_curves]]
+                members = [self.entity(m) for m in members if m is not None]
+                if members:
+                    e.add_children(members)
+        return e
+
+    @property
+    def toplevel_entities(self):
+        """ Entities that are not a member of any group; only group records are parsed to find them """
+        if self._toplevel is None:
+            is_child = np.zeros(len(self.directory), dtype=bool)
+            groups = np.flatnonzero(np.isin(self.directory['entity_type_number'], GROUP_TYPES))
+            for i in groups.tolist():
+                e = self._parsed(i)
+                for ptr in getattr(e, 'pointers', []):
+                    if ptr in self.pointer_dict:
+                        is_child[self.pointer_dict[ptr]] = True
+            self._toplevel = LazyEntityList(self, np.flatnonzero(~is_child))
+        return self._toplevel
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
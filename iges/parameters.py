@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""
+Parameter Data (P section) tokenizing.
+
+The P section is read in one pass: lines are grouped into per-entity records
+by their DE pointer (columns 65-72), each record is split on the parameter
+delimiter while skipping over Hollerith strings (nH...), and all numeric
+tokens are converted to one flat float64 array. Records are then handed out
+as views of that array, indexed CSR style by `offsets`.
+
+Hollerith strings come out as NaN in the value array; their text is kept in
+`strings`, keyed by flat token index. Blank (defaulted) parameters are 0.
+"""
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+from iges.directory import _parse_int_columns
+
+DATA_WIDTH = 64
+RECORD_WIDTH = 80
+CHUNK_LINES = 1 << 16
+
+_HOLLERITH = re.compile(r'\s*(\d+)[Hh]')
+
+
+def tokenize(text, param_sep=',', record_sep=';'):
+    """
+    Split one record into parameter tokens.
+    Returns (tokens, strings): Hollerith tokens are '' in `tokens` and their
+    text is in `strings`, keyed by token position.
+    """
+    end = text.find(record_sep)
+    body = text if end < 0 else text[:end]
+    if 'H' not in body and 'h' not in body:
+        return body.split(param_sep), {}
+
+    delimiters = re.compile('[' + re.escape(param_sep + record_sep) + ']')
+    tokens = []
+    strings = {}
+    pos = 0
+    while True:
+        m = _HOLLERITH.match(text, pos)
+        if m:
+            count = int(m.group(1))
+            strings[len(tokens)] = text[m.end():m.end()+count]
+            tokens.append('')
+            d = delimiters.search(text, m.end() + count)
+            if d is None:
+                break
+        else:
+            d = delimiters.search(text, pos)
+            if d is None:
+                tokens.append(text[pos:])
+                break
+            tokens.append(text[pos:d.start()])
+        pos = d.end()
+        if d.group() == record_sep:
+            break
+    return tokens, strings
+
+
+def to_floats(tokens, strings=None):
+    """ Convert tokens to float64; blanks default to 0, Hollerith strings become NaN """
+    try:
+        values = np.array(tokens, dtype=np.float64)
+    except ValueError:
+        values = np.array([_to_float(token) for token in tokens], dtype=np.float64)
+    if strings:
+        values[list(strings)] = np.nan
+    return values
+
+
+def _to_float(token):
+    token = token.strip()
+    if not token:
+        return 0.0
+    try:
+        return float(token)
+    except ValueError:
+        # Fortran style double precision exponent
+        return float(token.replace('D', 'E').replace('d', 'e'))
+
+
+def record_values(text, param_sep=',', record_sep=';'):
+    """ Float parameters (and Hollerith strings) of a single record """
+    tokens, strings = tokenize(text, param_sep, record_sep)
+    return to_floats(tokens, strings), strings
+
+
+def line_pointers(padded, n_lines):
+    """ DE pointer of every P line, from fixed-width padded text """
+    chars = np.frombuffer(padded.encode('latin-1'), dtype=np.uint8).reshape(n_lines, RECORD_WIDTH)
+    return _parse_int_columns(chars[:, DATA_WIDTH:72])
+
+
+def tokenize_lines(lines, param_sep=',', record_sep=';'):
+    """
+    Tokenize entity-aligned P lines.
+    Returns (pointers, offsets, values, strings) as described for ParameterSection.
+    """
+    n_lines = len(lines)
+    if n_lines == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64), np.zeros(0), {}
+
+    padded = ''.join(line.rstrip('\r\n')[:RECORD_WIDTH].ljust(RECORD_WIDTH) for line in lines)
+    pointers = line_pointers(padded, n_lines)
+    first = np.flatnonzero(np.r_[True, pointers[1:] != pointers[:-1]])
+    bounds = np.r_[first, n_lines].tolist()
+
+    tokens = []
+    strings = {}
+    counts = []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        text = ''.join([padded[RECORD_WIDTH*i:RECORD_WIDTH*i+DATA_WIDTH] for i in range(a, b)])
+        rec_tokens, rec_strings = tokenize(text, param_sep, record_sep)
+        for k, s in rec_strings.items():
+            strings[len(tokens) + k] = s
+        tokens.extend(rec_tokens)
+        counts.append(len(rec_tokens))
+
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return pointers[first], offsets, to_floats(tokens, strings), strings
+
+
+class ParameterSection(object):
+    """
+    All P records of a file, tokenized in entity-aligned chunks of about
+    `chunk_lines` lines. With `workers` > 1 the chunks are tokenized in a
+    process pool; the merged result is identical to a serial run.
+    """
+    def __init__(self, lines, param_sep=',', record_sep=';', chunk_lines=CHUNK_LINES, workers=None):
+        if workers and workers > 1:
+            chunk_lines = min(chunk_lines, max(len(lines) // (4*workers), 1))
+
+        bounds = [0]
+        while bounds[-1] < len(lines):
+            bounds.append(_record_boundary(lines, bounds[-1] + chunk_lines))
+        pieces = [lines[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+        if workers and workers > 1 and len(pieces) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunks = list(pool.map(tokenize_lines, pieces, repeat(param_sep), repeat(record_sep)))
+        else:
+            chunks = [tokenize_lines(piece, param_sep, record_sep) for piece in pieces]
+        self._merge(chunks)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """ Merge tokenize_lines results of consecutive chunks """
+        section = cls.__new__(cls)
+        section._merge(chunks)
+        return section
+
+    def _merge(self, chunks):
+        if not chunks:
+            chunks = [tokenize_lines([])]
+        base = 0
+        offsets = [np.zeros(1, dtype=np.int64)]
+        self.strings = {}
+        for pointers, chunk_offsets, values, strings in chunks:
+            offsets.append(chunk_offsets[1:] + base)
+            self.strings.update((k + base, s) for k, s in strings.items())
+            base += len(values)
+        self.pointers = np.concatenate([c[0] for c in chunks])
+        self.offsets = np.concatenate(offsets)
+        self.values = np.concatenate([c[2] for c in chunks])
+
+    def __len__(self):
+        return len(self.pointers)
+
+    def record(self, k):
+        """ Values of the k-th record, as a view """
+        return self.values[self.offsets[k]:self.offsets[k+1]]
+
+    def record_strings(self, k):
+        """ Hollerith strings of the k-th record, keyed by parameter index """
+        a, b = self.offsets[k], self.offsets[k+1]
+        return {i - a: s for i, s in self.strings.items() if a <= i < b}
+
+    def records(self):
+        """ Yield (DE pointer, values) for every record in file order """
+        values = self.values
+        offsets = self.offsets.tolist()
+        for k, ptr in enumerate(self.pointers.tolist()):
+            yield ptr, values[offsets[k]:offsets[k+1]]
+
+
+def _record_boundary(lines, i):
+    """ First line index >= i that starts a new record """
+    if i >= len(lines):
+        return len(lines)
+    ptr = lines[i-1][64:72]
+    while i < len(lines) and lines[i][64:72] == ptr:
+        i += 1
+    return i
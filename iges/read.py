@@ -1,164 +1,274 @@
 import os
-from iges.curves_surfaces import Line, CircArc, TransformationMatrix, RationalBSplineCurve, CompCurve, AssociativityInstance
+import time
+import warnings
+from iges.curves_surfaces import Line, CircArc, ConicArc, ParametricSplineCurve, Point, TransformationMatrix, RationalBSplineCurve, CompCurve, AssociativityInstance
 from iges.entity import process_global_section, Entity
+from iges.directory import parse_directory
+from iges.parameters import ParameterSection
+from iges.tables import LineTable, ArcTable
+from iges.discretize import discretize
+from iges.references import ReferenceGraph, MEMBER
+from iges.stats import make_stats
+from iges.select import Selection, select
+from iges.incremental import record_texts, record_keys
+
+# Entity classes by type number. See IGES spec v5.3, p. 38, Table 3
+# Anything missing falls back to a bare Entity. TODO, at least:
+#   108 Plane, 114 Parametric spline surface, 118 Ruled surface, 120 Surface of revolution,
+#   122 Tabulated cylinder, 128 Rational B-spline surface, 150 Block (CSG), 186 B-Rep, 202 Annotation, 132 Structural
+ENTITY_CLASSES = {
+	100: CircArc,               # Circular arc
+	102: CompCurve,             # Composite curve
+	104: ConicArc,              # Conic arc
+	110: Line,                  # Line
+	112: ParametricSplineCurve, # Parametric spline curve
+	116: Point,                 # Point
+	124: TransformationMatrix,  # Transformation matrix
+	126: RationalBSplineCurve,  # Rational B-spline curve
+	402: AssociativityInstance, # Associativity instance
+}
+
+def make_entity(directory, row, type_number=None):
+	""" Instantiate the entity for one directory row, dispatching on type number """
+	if type_number is None:
+		type_number = int(directory['entity_type_number'][row])
+	e = ENTITY_CLASSES.get(type_number, Entity)()
+	e.attach(directory, row)
+	return e
+
+def build_entities(directory):
+	""" Instantiate one entity per directory row; each keeps a view of its row """
+	types = directory['entity_type_number'].tolist()
+	entity_list = [make_entity(directory, i, t) for i, t in enumerate(types)]
+	pointer_dict = dict(zip(directory['sequence_number'].tolist(), range(len(entity_list))))
+	return entity_list, pointer_dict
+
+def link_transforms(entity_list, pointer_dict):
+	"""
+	Point every entity at its transformation (124), wherever in the file that
+	is defined. Dangling pointers are reported and ignored.
+	"""
+	for e in entity_list:
+		ptr = e.d['transform']
+		if not ptr:
+			continue
+		i = pointer_dict.get(ptr)
+		if i is None or not isinstance(entity_list[i], TransformationMatrix):
+			warnings.warn('Entity {0}: transformation pointer {1} does not point to a 124 entity'.format(e.sequence_number, ptr))
+			continue
+		e.transformation = entity_list[i]
+
+def separators(global_string):
+	""" Parameter and record delimiters from the first two global parameters """
+	param_sep = global_string[2] if global_string[:2] == '1H' else ','
+	record_sep = global_string[6] if global_string[4:6] == '1H' else ';'
+	return param_sep, record_sep
+
+def read_sections(f, stats=None):
+	"""
+	Sort the lines of an open file into (global string, D lines, P lines).
+	The characters read are added to stats.bytes_read, if given.
+	"""
+	global_string = ""
+	d_lines = []
+	p_lines = []
+	lines = f.readlines()
+	if stats is not None:
+		stats.bytes_read += sum(map(len, lines))
+	for line in lines:
+		id_code = line[72:73]
+
+		if id_code == 'D':     # Directory entry
+			d_lines.append(line)
+		elif id_code == 'P':   # Parameter data
+			p_lines.append(line)
+		elif id_code == 'G':   # Global
+			global_string += line[:72]   # Consolidate all global lines
+		# Start and Terminate sections are ignored
+	return global_string, d_lines, p_lines
 
 class IGES_Object(object):
-	def __init__(self, f):
-		# Outputs we care about
-		param_string = ''
-		params = []
-		entity_list = []
-		global_string = ""
-		pointer_dict = {}
-
-		# States for state machines
-		displayed = False
-		first_dict_line = True
-		first_global_line = True
-		first_param_line = True
-		global_string = ""
-		pointer_dict = {}
-		entity_index = 0
-
-		# Walk through each line
-		for line in f.readlines():
-			data = line[:80]
-			id_code = line[72]
-
-			if id_code == 'S':     # Start
-				pass
-			elif id_code == 'G':   # Global
-				global_string += data   # Consolidate all global lines
-				if first_global_line:
-					param_sep = data[2]
-					record_sep = data[6]
-					first_global_line = False
-
-				# Record separator denotes end of global section
-				if global_string.strip()[-1] == record_sep:
-					process_global_section(global_string)
-			elif id_code == 'D':   # Directory entry
-				if first_dict_line:
-					entity_type_number = int(data[0:8].strip())
-					# Curve and surface entities.  See IGES spec v5.3, p. 38, Table 3
-					if entity_type_number == 100:   # Circular arc
-						e = CircArc()
-					elif entity_type_number == 102: # Composite curve TODO
-						e = CompCurve()
-					elif entity_type_number == 104: # Conic arc TODO
-						e = Entity()
-					elif entity_type_number == 108: # Plane TODO
-						e = Entity()
-					elif entity_type_number == 110: # Line
-						e = Line()
-					elif entity_type_number == 112: # Parametric spline curve TODO
-						e = Entity()
-					elif entity_type_number == 114: # Parametric spline surface TODO
-						e = Entity()
-					elif entity_type_number == 116: # Point TODO
-						e = Entity()
-					elif entity_type_number == 118: # Ruled surface TODO
-						e = Entity()
-					elif entity_type_number == 120: # Surface of revolution TODO
-						e = Entity()
-					elif entity_type_number == 122: # Tabulated cylinder TODO
-						e = Entity()
-					elif entity_type_number == 124: # Transformation matrix
-						e = TransformationMatrix()
-					elif entity_type_number == 126: # Rational B-spline curve
-						e = RationalBSplineCurve()
-					elif entity_type_number == 128: # Rational B-spline surface TODO
-						e = Entity()
-					# TODO: Need to add more ...
-					
-					# CSG Entities. See IGES spec v5.3, p. 42, Section 3.3
-					elif entity_type_number == 150: # Block
-						e = Entity()
-
-					# B-Rep entities.  See IGES spec v5.3, p. 43, Section 3.4
-					elif  entity_type_number == 186:
-						e = Entity()
-
-					# Annotation entities.  See IGES spec v5.3, p. 46, Section 3.5
-					elif  entity_type_number == 202:
-						e = Entity()
-
-					# Structural entities.  See IGES spec v5.3, p. 50, Section 3.6
-					elif  entity_type_number == 132:
-						e = Entity()
-
-					elif  entity_type_number == 402:
-						e = AssociativityInstance()
-
-					else:
-						e = Entity()
-
-					e.add_section(data[0:8], 'entity_type_number')
-					e.add_section(data[8:16], 'parameter_pointer')
-					e.add_section(data[16:24], 'structure')
-					e.add_section(data[24:32], 'line_font_pattern')
-					e.add_section(data[32:40], 'level')
-					e.add_section(data[40:48], 'view')
-					e.add_section(data[48:56], 'transform')
-					e.add_section(data[56:65], 'label_assoc')
-					e.add_section(data[65:72], 'status_number')
-					e.sequence_number = int(data[73:].strip())
-
-					# Get transformations and bring them along for the ride, if they exist
-					if e.d['transform']:
-						e.transformation = entity_list[pointer_dict[e.d['transform']]]
-
-
-					first_dict_line = False
-				else:
-					e.add_section(data[8:16], 'line_weight_number')
-					e.add_section(data[16:24], 'color_number')
-					e.add_section(data[24:32], 'param_line_count')
-					e.add_section(data[32:40], 'form_number')
-					e.add_section(data[56:64], 'entity_label', type='string')
-					e.add_section(data[64:72], 'entity_subs_num')
-
-					first_dict_line = True
-					entity_list.append(e)
-					pointer_dict.update({e.sequence_number : entity_index})
-					entity_index += 1
-
-			elif id_code == 'P':   # Parameter data
-				# Concatenate multiple lines into one string
-				if first_param_line:
-					param_string = data[:64]
-					directory_pointer = int(data[64:72].strip())
-					first_param_line = False
-				else:
-					param_string += data[:64]
+	"""
+	Parsed IGES file. `f` is an open text file.
+	workers: if > 1, tokenize the P section in a process pool of that size.
+	         Entities, transforms and children are linked afterwards, so the
+	         result is identical to a serial load.
+	stats:   True or an iges.stats.LoadStats (e.g. with hooks) to time every
+	         phase of the load; kept as self.stats (None when off).
+	types, levels, colors, forms, where:
+	         load only the entities these pick (see iges.select.Selection),
+	         plus the transforms and group members they need. The P records
+	         of everything else are never tokenized.
+	reloadable: also digest every DE and P record (see iges.incremental),
+	         so that reload() can tell which entities an edit left alone.
+	         Without it, the first reload() re-parses every entity.
+	"""
+	def __init__(self, f, workers=None, stats=None, types=None, levels=None, colors=None, forms=None, where=None, reloadable=False):
+		stats = make_stats(stats)
+		with stats.phase('read'):
+			global_string, d_lines, p_lines = read_sections(f, stats if stats.enabled else None)
+		param_sep, record_sep = separators(global_string)
+
+		# Directory entries, all at once
+		with stats.phase('directory'):
+			directory = parse_directory(d_lines)
+		selection = Selection(types, levels, colors, forms, where)
+		if selection:
+			with stats.phase('select'):
+				directory, p_lines = select(directory, p_lines, selection, param_sep, record_sep)
+		# Parameter data, tokenized in one pass
+		with stats.phase('parameters'):
+			parameters = ParameterSection(p_lines, param_sep, record_sep, workers=workers)
+
+		self._build(global_string, directory, parameters, stats=stats)
+		self.record_keys = None
+		if reloadable:
+			with stats.phase('keys'):
+				self.record_keys = record_keys(directory, record_texts(p_lines), param_sep, record_sep)
+		self.selection = selection if selection else None
+
+	@classmethod
+	def from_tables(cls, global_string, directory, parameters, orderings=None, stats=None, record_keys=None, selection=None):
+		"""
+		Build a model from already parsed tables (see iges.cache).
+		orderings: {group index: (child indices, reversal flags)} as returned
+		           by child_orderings(); if given, children are not chained again.
+		record_keys, selection: as kept by a loaded model; without keys,
+		           the first reload() treats every entity as changed.
+		"""
+		self = cls.__new__(cls)
+		self._build(global_string, directory, parameters, orderings, make_stats(stats))
+		self.record_keys = record_keys
+		self.selection = selection
+		return self
+
+	def _build(self, global_string, directory, parameters, orderings=None, stats=None):
+		stats = make_stats(stats)
+		stats.count_entities(directory)
+		with stats.phase('global'):
+			global_parameters = process_global_section(global_string, *separators(global_string))
+
+		with stats.phase('entities'):
+			entity_list, pointer_dict = build_entities(directory)
 
-				if param_string.strip()[-1] == record_sep:
-					first_param_line = True
-					param_string = param_string.strip()[:-1]
-					parameters = param_string.split(param_sep)
-					entity_list[pointer_dict[directory_pointer]].add_parameters(parameters)
-			elif id_code == 'T':   # Terminate
-				pass
+		# Get transformations and bring them along for the ride, if they exist
+		with stats.phase('transforms'):
+			link_transforms(entity_list, pointer_dict)
 
-		toplevel_entities = [entity for entity in entity_list]
+		# Transformation matrices first: the others use them as they are built
+		with stats.phase('add_parameters'):
+			is_transform = [isinstance(e, TransformationMatrix) for e in entity_list]
+			for first in (True, False):
+				for directory_pointer, values in parameters.records():
+					i = pointer_dict[directory_pointer]
+					if is_transform[i] == first:
+						entity_list[i].add_parameters(values)
+
+		# Every pointer in one graph; top-level entities are the ones no group lists
+		with stats.phase('references'):
+			references = ReferenceGraph.from_model(entity_list, directory)
+		lost, ptrs, kinds = references.dangling
+		for i, ptr in zip(lost[kinds == MEMBER].tolist(), ptrs[kinds == MEMBER].tolist()):
+			warnings.warn('Entity {0}: member pointer {1} does not lead to any directory entry'.format(entity_list[i].sequence_number, ptr))
+		is_member = references.referenced(MEMBER).tolist()
+		toplevel_entities = [e for e, member in zip(entity_list, is_member) if not member]
 
 		# Second pass for references
-		for entity in entity_list:
-			if type(entity) in [CompCurve, AssociativityInstance]:
-				children = []	
-				for i in range(entity.n_curves):
-					ptr = entity.pointers[i]
-					ent = entity_list[pointer_dict[ptr]]
-					children.append(ent)
-					toplevel_entities.remove(ent)
-
-				entity.add_children(children)
-				#toplevel_entities.append(entity)
-		
-		# Save 
-		self.param_string      = param_string
-		self.params            = params
+		with stats.phase('chaining'):
+			timed = stats.enabled
+			for index in references.sources(MEMBER).tolist():
+				entity = entity_list[index]
+				children = [entity_list[i] for i in references.children(index, MEMBER).tolist()]
+				if orderings is not None and index in orderings:
+					order, flips = orderings[index]
+					entity.set_children([entity_list[i] for i in order], flips)
+				elif timed:
+					start = time.perf_counter()
+					entity.add_children(children)
+					stats.group(entity, time.perf_counter() - start)
+				else:
+					entity.add_children(children)
+
+		# Struct-of-arrays geometry; the entities become views into these
+		with stats.phase('tables'):
+			self.lines = LineTable(e for e in entity_list if isinstance(e, Line))
+			self.arcs  = ArcTable(e for e in entity_list if isinstance(e, CircArc))
+
+		# Save
+		self.stats             = stats if stats.enabled else None
+		self.parameters        = parameters
 		self.entity_list       = entity_list
 		self.global_string     = global_string
+		self.global_parameters = global_parameters
 		self.pointer_dict      = pointer_dict
-		self.toplevel_entities = toplevel_entities
\ No newline at end of file
+		self.directory         = directory
+		self.toplevel_entities = toplevel_entities
+		self.references        = references
+		self._bounds           = None
+
+	def child_orderings(self):
+		""" {group index: (chained child indices, reversal flags)} for every linked group """
+		index = {id(e): i for i, e in enumerate(self.entity_list)}
+		return {index[id(e)]: ([index[id(c)] for c in e.children], list(e.flips))
+				for e in self.entity_list if hasattr(e, 'children')}
+
+	def reload(self, f):
+		"""
+		Bring the model up to date with an edited version of its file (a
+		path or an open text file), re-parsing only the entities whose
+		records changed and re-chaining only the groups they affect; the
+		same entity selection is applied. That takes the record keys of a
+		model loaded with reloadable=True (or reloaded before); without
+		them every entity is re-parsed. Returns an
+		iges.incremental.ChangeSet of the added, removed and modified entities.
+		"""
+		from iges.incremental import reload
+		return reload(self, f)
+
+	def index(self, entity):
+		""" Position of an entity in entity_list """
+		return self.pointer_dict[entity.sequence_number]
+
+	def discretize(self, dx=None, n_points=None, endpoint=True, chord_tol=None, max_len=None, min_len=None):
+		"""
+		Sample every top-level curve every ~dx, n_points times per leaf, or
+		adaptively within chord_tol (segments bounded by max_len/min_len)
+		into one (3, P) buffer with CSR offsets; see iges.discretize.
+		"""
+		return discretize(self.toplevel_entities, dx, n_points, endpoint,
+			tables=(self.lines, self.arcs), index=self.index,
+			chord_tol=chord_tol, max_len=max_len, min_len=min_len)
+
+	def write(self, f, start='', filename=''):
+		""" Write every top-level entity (and what it points to) to an open text file; see iges.write """
+		from iges.write import write
+		return write(f, self.toplevel_entities, self.global_parameters, start, filename)
+
+	def bounds(self):
+		""" iges.bounds.Bounds of every entity: (N, 6) model space boxes with box queries; computed once """
+		if self._bounds is None:
+			from iges.bounds import model_bounds
+			self._bounds = model_bounds(self)
+		return self._bounds
+
+	def preview(self, tol=1e-3):
+		"""
+		The whole model as one NaN-separated (3, P) polyline, decimated to
+		tol times the model's size, for a single plot call; see iges.bounds
+		"""
+		from iges.bounds import preview
+		return preview(self, tol)
+
+	def curve_index(self, cell_size=None):
+		""" Spatial index over the leaves of every top-level curve; see iges.spatial """
+		from iges.spatial import curve_index
+		return curve_index(self, cell_size)
+
+	def topology(self, tol=1e-5, dx=None, cell_size=None, chord_tol=None, max_len=None, min_len=None):
+		"""
+		Beam-mesh nodes and two-node elements: endpoints merged within tol,
+		curves split at T-junctions, optionally subdivided every ~dx or
+		within chord_tol; see iges.topology.
+		"""
+		from iges.topology import model_topology
+		return model_topology(self, tol, dx, cell_size, chord_tol, max_len, min_len)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Reference graph between the entities of a model.
+
+Every pointer in the model becomes an edge (source, target, kind): group
+members (102, 402) from the parameter data, and the DE pointer fields
+(transformation, structure, line font, level, view, label display, color)
+straight from the directory table. Edges are stored CSR style in both
+directions, so the children and the parents of an entity are array slices,
+and top-level membership is a boolean mask. Building it is linear in the
+number of entities plus pointers.
+"""
+import numpy as np
+
+MEMBER, TRANSFORM, STRUCTURE, LINE_FONT, LEVEL, VIEW, LABEL, COLOR = range(8)
+KIND_NAMES = ('member', 'transform', 'structure', 'line font', 'level', 'view', 'label display', 'color')
+
+# DE fields holding pointers: (field, kind, True if only negative values are pointers)
+DE_POINTERS = [
+    ('transform',         TRANSFORM, False),
+    ('structure',         STRUCTURE, True),
+    ('line_font_pattern', LINE_FONT, True),
+    ('level',             LEVEL,     True),
+    ('view',              VIEW,      False),
+    ('label_assoc',       LABEL,     False),
+    ('color_number',      COLOR,     True),
+]
+
+
+def resolve(sequence_numbers, pointers):
+    """ Indices of the DE sequence numbers `pointers` point to, -1 where none does """
+    target = np.full(len(pointers), -1, dtype=np.int64)
+    if len(sequence_numbers) and len(pointers):
+        order = np.argsort(sequence_numbers, kind='stable')
+        ordered = sequence_numbers[order]
+        slot = np.minimum(np.searchsorted(ordered, pointers), len(ordered) - 1)
+        found = ordered[slot] == pointers
+        target[found] = order[slot[found]]
+    return target
+
+
+def directory_edges(directory):
+    """ (source, pointer, kind) arrays of every pointer held in the DE fields """
+    source = []
+    pointer = []
+    kind = []
+    for field, k, negated in DE_POINTERS:
+        values = directory[field]
+        ptr = -values if negated else values
+        mine = np.flatnonzero(ptr > 0)
+        source.append(mine)
+        pointer.append(ptr[mine])
+        kind.append(np.full(len(mine), k, dtype=np.int8))
+    return np.concatenate(source), np.concatenate(pointer), np.concatenate(kind)
+
+
+def _csr(n, key, other, kind):
+    order = np.argsort(key, kind='stable')
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(key, minlength=n), out=offsets[1:])
+    return offsets, other[order], kind[order]
+
+
+class ReferenceGraph(object):
+    """
+    Edges between entity_list indices, looked up both ways.
+    dangling: (source, pointer, kind) arrays of pointers that lead nowhere.
+    """
+    def __init__(self, n, source, target, kind, dangling=None):
+        self.n = n
+        self.source = np.asarray(source, dtype=np.int64)
+        self.target = np.asarray(target, dtype=np.int64)
+        self.kind = np.asarray(kind, dtype=np.int8)
+        self._child_offsets, self._child, self._child_kind = _csr(n, self.source, self.target, self.kind)
+        self._parent_offsets, self._parent, self._parent_kind = _csr(n, self.target, self.source, self.kind)
+        empty = np.zeros(0, dtype=np.int64)
+        self.dangling = dangling if dangling is not None else (empty, empty, empty.astype(np.int8))
+
+    @classmethod
+    def from_model(cls, entity_list, directory):
+        """ Collect every pointer of a model whose parameters have been read """
+        source, pointer, kind = directory_edges(directory)
+        # Group members, in the order the group lists them
+        members = [(i, e.pointers[:e.n_curves]) for i, e in enumerate(entity_list)
+                   if getattr(e, 'pointers', None) is not None]
+        if members:
+            counts = [len(p) for _, p in members]
+            source = np.r_[source, np.repeat([i for i, _ in members], counts)]
+            pointer = np.r_[pointer, np.array([q for _, p in members for q in p], dtype=np.int64)]
+            kind = np.r_[kind, np.full(sum(counts), MEMBER, dtype=np.int8)]
+
+        target = resolve(directory['sequence_number'], pointer)
+        found = target >= 0
+        lost = ~found
+        dangling = (source[lost], pointer[lost], kind[lost])
+        # members first, in pointer order, so children() lists them as the group does
+        order = np.argsort(kind[found] != MEMBER, kind='stable')
+        return cls(len(entity_list), source[found][order], target[found][order], kind[found][order], dangling)
+
+    def children(self, i, kind=None):
+        """ Entities entity i points to (of one kind, if given), in pointer order """
+        a, b = self._child_offsets[i], self._child_offsets[i+1]
+        if kind is None:
+            return self._child[a:b]
+        return self._child[a:b][self._child_kind[a:b] == kind]
+
+    def parents(self, i, kind=None):
+        """ Entities pointing to entity i (of one kind, if given) """
+        a, b = self._parent_offsets[i], self._parent_offsets[i+1]
+        if kind is None:
+            return self._parent[a:b]
+        return self._parent[a:b][self._parent_kind[a:b] == kind]
+
+    def referenced(self, kind=MEMBER):
+        """ Boolean mask of the entities that are the target of an edge of this kind """
+        mask = np.zeros(self.n, dtype=bool)
+        mask[self.target[self.kind == kind]] = True
+        return mask
+
+    def sources(self, kind=MEMBER):
+        """ Entities with at least one edge of this kind, in index order """
+        return np.unique(self.source[self.kind == kind])
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Load-time entity selection.
+
+Entities are picked from the directory table alone, by type number, level,
+color number, form number or a predicate over the table, before any P record
+is tokenized. The selection is then closed over what the picked entities
+need: the transformations (124) they point to, chained or not, and the
+members of the groups (102, 402) among them, recursively. Only the group
+records are read to find those members; the P lines of everything left out
+are never tokenized.
+"""
+import numpy as np
+from iges.curves_surfaces import CompCurve, AssociativityInstance
+from iges.parameters import record_values
+from iges.references import resolve
+from iges.tables import ragged
+
+GROUP_CLASSES = {102: CompCurve, 402: AssociativityInstance}
+
+
+class Selection(object):
+    """
+    Which entities to load. Each criterion is a collection of accepted
+    values, or None for any:
+    types:  entity type numbers
+    levels: level numbers (DE field 5)
+    colors: color numbers (DE field 13; negative values are pointers)
+    forms:  form numbers
+    where:  callable taking the directory table and returning a boolean
+            mask over its rows, e.g. lambda d: d['status_number'] == 0
+    """
+    def __init__(self, types=None, levels=None, colors=None, forms=None, where=None):
+        self.types = types
+        self.levels = levels
+        self.colors = colors
+        self.forms = forms
+        self.where = where
+
+    def __bool__(self):
+        return any(c is not None for c in (self.types, self.levels, self.colors, self.forms, self.where))
+
+    def key(self):
+        """ Text describing the value criteria (not `where`), e.g. for cache keys """
+        parts = []
+        for name in ('types', 'levels', 'colors', 'forms'):
+            values = getattr(self, name)
+            if values is not None:
+                parts.append('{0}={1}'.format(name, sorted(int(v) for v in values)))
+        return ';'.join(parts)
+
+    def mask(self, directory):
+        """ Rows of the directory table picked by the criteria, before closure """
+        keep = np.ones(len(directory), dtype=bool)
+        for name, field in (('types', 'entity_type_number'), ('levels', 'level'),
+                            ('colors', 'color_number'), ('forms', 'form_number')):
+            values = getattr(self, name)
+            if values is not None:
+                keep &= np.isin(directory[field], np.asarray(list(values), dtype=np.int64))
+        if self.where is not None:
+            keep &= np.asarray(self.where(directory), dtype=bool).reshape(len(directory))
+        return keep
+
+
+def record_lines(directory, rows):
+    """ P line indices of the records of `rows`, in row order, from their DE pointer and line count """
+    start = directory['parameter_pointer'][rows] - 1
+    count = np.maximum(directory['param_line_count'][rows], 1)
+    _, row, pos = ragged(count)
+    return start[row] + pos
+
+
+def member_pointers(directory, rows, p_lines, param_sep=',', record_sep=';'):
+    """ DE pointers of the members of the group entities at `rows` """
+    pointers = []
+    for i in rows.tolist():
+        cls = GROUP_CLASSES.get(int(directory['entity_type_number'][i]))
+        if cls is None:
+            continue
+        lines = [p_lines[k] for k in record_lines(directory, np.array([i])).tolist() if k < len(p_lines)]
+        group = cls()
+        group.attach(directory, i)
+        group.add_parameters(record_values(''.join(line[:64] for line in lines), param_sep, record_sep)[0])
+        if getattr(group, 'pointers', None) is not None:
+            pointers.extend(group.pointers[:group.n_curves])
+    return np.array(pointers, dtype=np.int64)
+
+
+def close(directory, keep, p_lines, param_sep=',', record_sep=';'):
+    """ Add the transforms and group members that the kept rows reach, until nothing changes """
+    keep = keep.copy()
+    sequence = directory['sequence_number']
+    is_group = np.isin(directory['entity_type_number'], list(GROUP_CLASSES))
+    frontier = np.flatnonzero(keep)
+    while len(frontier):
+        transforms = directory['transform'][frontier]
+        pointers = np.r_[transforms[transforms > 0],
+                         member_pointers(directory, frontier[is_group[frontier]], p_lines, param_sep, record_sep)]
+        target = resolve(sequence, pointers)
+        target = np.unique(target[target >= 0])
+        frontier = target[~keep[target]]
+        keep[frontier] = True
+    return keep
+
+
+def select(directory, p_lines, selection, param_sep=',', record_sep=';'):
+    """
+    Apply a Selection to a parsed directory and its raw P lines.
+    Returns the directory rows kept (a new table) and their P lines, in file order.
+    """
+    keep = close(directory, selection.mask(directory), p_lines, param_sep, record_sep)
+    rows = np.flatnonzero(keep)
+    lines = record_lines(directory, rows)
+    lines = lines[lines < len(p_lines)]
+    return directory[rows], [p_lines[k] for k in np.sort(lines).tolist()]
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+"""
+Uniform-grid spatial index over leaf curves.
+
+Every leaf curve (lines, arcs, members of composite curves) is registered in
+all grid cells its bounding box overlaps. A nearest query scans the block of
+cells within k cells of each query point (or of its projection onto the grid
+box, for queries outside it): if the best distance found is at most k*h (h the
+cell size) nothing outside the block can be closer, otherwise the queries
+still open are searched again out to the best distance found (or twice as far
+if they found nothing). Queries are batched, so the work per
+round is a handful of vectorized passes.
+
+Results carry the same information as nearestPoint: distance, nearest point
+and isnode (1 or 2 for the start or end node, 0 in between).
+"""
+import numpy as np
+from iges.curves_surfaces import Line, CircArc, CurveGroup, nearest_on_segments, nearest_on_arcs
+from iges.discretize import leaves
+from iges.tables import ragged
+from iges.bounds import leaf_boxes
+
+PAIR_BUDGET = 1 << 22
+
+_OFFSETS = {}
+
+
+def _block(k):
+    """ (n, 3) integer offsets of a block of cells reaching k = (kx, ky, kz) cells out """
+    k = tuple(int(i) for i in k)
+    if k not in _OFFSETS:
+        r = [np.arange(-i, i+1) for i in k]
+        _OFFSETS[k] = np.stack(np.meshgrid(*r, indexing='ij'), axis=-1).reshape(-1, 3)
+    return _OFFSETS[k]
+
+
+def by_leaf(leaf, mask):
+    """ Yield (leaf, positions) for the masked items, grouped by leaf """
+    rest = np.flatnonzero(mask)
+    if not len(rest):
+        return
+    rest = rest[np.argsort(leaf[rest], kind='stable')]
+    bounds = np.flatnonzero(np.r_[True, leaf[rest][1:] != leaf[rest][:-1], True])
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        yield int(leaf[rest[lo]]), rest[lo:hi]
+
+
+def bounding_boxes(curves, tables=()):
+    """ (N, 6) [min xyz, max xyz] model space boxes of leaf curves; see iges.bounds """
+    return leaf_boxes(curves, tables)
+
+
+class CurveIndex(object):
+    """
+    Grid index over leaf curves.
+    curves: leaf curve entities; ids: their entity_list indices; parent: the
+    top-level entity_list index each leaf belongs to.
+    """
+    def __init__(self, curves, ids=None, parent=None, tables=(), cell_size=None):
+        self.curves = list(curves)
+        n = len(self.curves)
+        self.ids = np.arange(n) if ids is None else np.asarray(ids)
+        self.parent = self.ids if parent is None else np.asarray(parent)
+        self.boxes = bounding_boxes(self.curves, tables)
+        self.is_line = np.array([isinstance(e, Line) for e in self.curves], dtype=bool)
+        self.e1 = np.array([np.reshape(e.e1, 3) for e in self.curves]).reshape(-1, 3)
+        self.e2 = np.array([np.reshape(e.e2, 3) for e in self.curves]).reshape(-1, 3)
+        self.is_arc = np.array([isinstance(e, CircArc) for e in self.curves], dtype=bool)
+        self.arc_row = np.cumsum(self.is_arc) - 1
+        frames = [e.frame() for e in self.curves if isinstance(e, CircArc)]
+        self.arc_frames = [np.array(f) for f in zip(*frames)] if frames else None
+
+        if n:
+            self.origin = self.boxes[:, :3].min(axis=0)
+            extent = self.boxes[:, 3:].max(axis=0) - self.origin
+            if cell_size is None:
+                sizes = (self.boxes[:, 3:] - self.boxes[:, :3]).max(axis=1)
+                cell_size = max(np.median(sizes), extent.max()/np.cbrt(n))
+            self.h = max(float(cell_size), 1e-9)
+            self.dims = (extent//self.h).astype(np.int64) + 1
+        else:
+            self.origin = np.zeros(3)
+            self.h = 1.0
+            self.dims = np.ones(3, dtype=np.int64)
+        self._register()
+
+    def _cell(self, pts):
+        return np.floor((pts - self.origin)/self.h).astype(np.int64)
+
+    def _key(self, cells):
+        return (cells[:, 0]*self.dims[1] + cells[:, 1])*self.dims[2] + cells[:, 2]
+
+    def _register(self):
+        lo = np.clip(self._cell(self.boxes[:, :3]), 0, self.dims - 1)
+        hi = np.clip(self._cell(self.boxes[:, 3:]), 0, self.dims - 1)
+        span = hi - lo + 1
+        _, leaf, pos = ragged(span.prod(axis=1))
+        sy, sz = span[leaf, 1], span[leaf, 2]
+        cells = lo[leaf] + np.stack((pos//(sy*sz), (pos//sz) % sy, pos % sz), axis=1)
+        keys = self._key(cells)
+        order = np.argsort(keys, kind='stable')
+        self._items = leaf[order]
+        self._keys, self._starts = np.unique(keys[order], return_index=True)
+        self._starts = np.r_[self._starts, len(order)]
+
+    def _candidates(self, points, queries, k):
+        """ (query, leaf) pairs for every leaf registered within k cells of each query """
+        offsets = _block(k)
+        # Searching around the query's projection onto the grid box keeps the
+        # k*h guarantee for queries outside it
+        cells = np.clip(self._cell(points[queries]), 0, self.dims - 1)
+        q = np.repeat(queries, len(offsets))
+        cells = (cells[:, None, :] + offsets[None, :, :]).reshape(-1, 3)
+        inside = ((cells >= 0) & (cells < self.dims)).all(axis=1)
+        q, cells = q[inside], cells[inside]
+        keys = self._key(cells)
+        slot = np.searchsorted(self._keys, keys)
+        slot = np.minimum(slot, len(self._keys) - 1)
+        hit = self._keys[slot] == keys
+        q, slot = q[hit], slot[hit]
+        counts = self._starts[slot+1] - self._starts[slot]
+        _, which, pos = ragged(counts)
+        return q[which], self._items[self._starts[slot][which] + pos]
+
+    def distances(self, points, q, leaf):
+        """ Exact (distance, point, isnode) for (query, leaf) pairs """
+        dist = np.empty(len(q))
+        near = np.empty((len(q), 3))
+        isnode = np.zeros(len(q), dtype=np.int8)
+        lines = self.is_line[leaf]
+        if lines.any():
+            l = leaf[lines]
+            dist[lines], near[lines], isnode[lines] = nearest_on_segments(self.e1[l], self.e2[l], points[q[lines]])
+        arcs = self.is_arc[leaf]
+        if arcs.any():
+            a = self.arc_row[leaf[arcs]]
+            frame = [f[a] for f in self.arc_frames]
+            dist[arcs], near[arcs], isnode[arcs] = nearest_on_arcs(*frame, points[q[arcs]])
+        for c, mine in by_leaf(leaf, ~lines & ~arcs):
+            dist[mine], near[mine], isnode[mine] = self.curves[c].nearestPoints(points[q[mine]])
+        return dist, near, isnode
+
+    def nearest(self, points):
+        """
+        Closest leaf curve to each of the (M,3) points.
+        Returns (distance (M,), point (M,3), isnode (M,), leaf (M,)) where leaf
+        indexes self.curves (see self.ids / self.parent), -1 if empty.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        m = len(points)
+        best = np.full(m, np.inf)
+        near = np.full((m, 3), np.nan)
+        isnode = np.zeros(m, dtype=np.int8)
+        which = np.full(m, -1, dtype=np.int64)
+        if not self.curves:
+            return best, near, isnode, which
+
+        # Distance from each query to the grid box: a curve point within r of
+        # the query is within sqrt(r^2 - out^2) of the query's projection
+        out2 = np.sum((points - np.clip(points, self.origin, self.origin + self.dims*self.h))**2, axis=1)
+        open_ = np.arange(m)
+        k = np.ones(m, dtype=np.int64)
+        while len(open_):
+            for kq in np.unique(k[open_]).tolist():
+                mine = open_[k[open_] == kq]
+                for q, leaf in self._pairs(points, mine, kq):
+                    self._keep_best(points, q, leaf, best, near, isnode, which)
+                if self._exhaustive(kq):
+                    out2[mine] = np.inf   # nothing left to find
+            reach2 = best[open_]**2 - out2[open_]
+            open_ = open_[reach2 > (k[open_]*self.h)**2]
+            # A candidate at distance d bounds the search to d/h cells;
+            # queries that found nothing look twice as far
+            reach = np.sqrt(np.maximum(best[open_]**2 - out2[open_], 0))/self.h
+            k[open_] = np.where(np.isfinite(reach), np.maximum(np.ceil(reach), k[open_] + 1), 2*k[open_])
+        return best, near, isnode, which
+
+    def _reach(self, k):
+        """ Per-axis block reach, clipped to the grid """
+        return np.minimum(k, self.dims - 1)
+
+    def _exhaustive(self, k):
+        """ True once a k-block is no cheaper than testing every curve """
+        kk = self._reach(k)
+        return np.prod(2*kk + 1) >= len(self.curves) or (kk < k).all()
+
+    def _pairs(self, points, queries, k):
+        """ Yield (query, leaf) candidate pairs in chunks of about PAIR_BUDGET """
+        brute = self._exhaustive(k)
+        # expected candidates per query: block cells times mean cell occupancy
+        occupancy = len(self._items)/max(len(self._keys), 1)
+        per_query = len(self.curves) if brute else int(len(_block(self._reach(k)))*occupancy) + 1
+        step = max(PAIR_BUDGET//per_query, 1)
+        for a in range(0, len(queries), step):
+            chunk = queries[a:a+step]
+            if brute:
+                yield np.repeat(chunk, len(self.curves)), np.tile(np.arange(len(self.curves)), len(chunk))
+            else:
+                yield self._candidates(points, chunk, self._reach(k))
+
+    def _keep_best(self, points, q, leaf, best, near, isnode, which):
+        """ Update the running per-query minimum with (query, leaf) pairs """
+        if not len(q):
+            return
+        d, p, n = self.distances(points, q, leaf)
+        # sort by (query, distance) and take the first of each query
+        order = np.lexsort((d, q))
+        q, d, p, n, leaf = q[order], d[order], p[order], n[order], leaf[order]
+        first = np.r_[True, q[1:] != q[:-1]]
+        better = first.copy()
+        better[first] = d[first] < best[q[first]]
+        q, d, p, n, leaf = q[better], d[better], p[better], n[better], leaf[better]
+        best[q], near[q], isnode[q], which[q] = d, p, n, leaf
+
+    def within(self, points, radius):
+        """
+        All leaf curves within `radius` of each of the (M,3) points, CSR style:
+        (offsets (M+1,), leaf (P,), distance (P,), point (P,3), isnode (P,)),
+        sorted by query then distance.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        k = max(int(np.ceil(radius/self.h)), 1)
+        parts = []
+        if self.curves:
+            for q, leaf in self._pairs(points, np.arange(len(points)), k):
+                # a leaf registered in several cells comes up once per cell
+                pair = np.sort(q*len(self.curves) + leaf)
+                pair = pair[np.r_[True, pair[1:] != pair[:-1]]]
+                q, leaf = pair//len(self.curves), pair % len(self.curves)
+                # cheap box test before the exact distances
+                box = self.boxes[leaf]
+                near = ((points[q] >= box[:, :3] - radius) & (points[q] <= box[:, 3:] + radius)).all(axis=1)
+                q, leaf = q[near], leaf[near]
+                d, p, n = self.distances(points, q, leaf)
+                keep = d <= radius
+                parts.append((q[keep], leaf[keep], d[keep], p[keep], n[keep]))
+        if not parts:
+            parts = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros((0, 3)), np.zeros(0, dtype=np.int8))]
+        q, leaf, d, p, n = [np.concatenate(c) for c in zip(*parts)]
+        order = np.lexsort((d, q))
+        q, leaf, d, p, n = q[order], leaf[order], d[order], p[order], n[order]
+        offsets = np.zeros(len(points) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(q, minlength=len(points)), out=offsets[1:])
+        return offsets, leaf, d, p, n
+
+
+def curve_index(igs, cell_size=None):
+    """ CurveIndex over the leaves of every top-level curve of an IGES_Object """
+    curves = []
+    parent = []
+    for e in igs.toplevel_entities:
+        if not isinstance(e, CurveGroup) and not hasattr(e, 'nearestPoint'):
+            continue
+        # unlinked groups (402 forms other than 15) have no leaves
+        for leaf, _ in leaves(e):
+            if not isinstance(leaf, CurveGroup) and hasattr(leaf, 'nearestPoint'):
+                curves.append(leaf)
+                parent.append(igs.index(e))
+    ids = [igs.index(e) for e in curves]
+    return CurveIndex(curves, ids, parent, tables=(igs.lines, igs.arcs), cell_size=cell_size)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Load instrumentation.
+
+A LoadStats collects, while an IGES_Object is built:
+
+- wall time and call count per phase (read, directory, parameters, ...);
+- entity counts per type number;
+- characters read (bytes, for the usual ASCII / latin-1 files);
+- the slowest add_children groups.
+
+Hooks are plain callables, called as each measurement is taken:
+
+    on_phase(name, seconds)
+    on_group(entity, seconds)      after every add_children
+
+When a model is loaded without stats, the phases run under NULL_STATS,
+whose phase() is a shared no-op context manager and nothing is timed.
+"""
+import heapq
+import time
+import numpy as np
+
+SLOWEST = 10
+
+
+class _Phase(object):
+    __slots__ = ('stats', 'name', 'start')
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.stats.record(self.name, time.perf_counter() - self.start)
+
+
+class _NoPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class LoadStats(object):
+    """
+    phases:         {phase: [seconds, calls]}, in the order first seen
+    entity_counts:  {type number: count}
+    bytes_read:     characters of file text read
+    groups:         add_children calls
+    slowest_groups: [(seconds, sequence number, type number, members)],
+                    slowest first, at most `slowest` of them
+    """
+    enabled = True
+
+    def __init__(self, on_phase=None, on_group=None, slowest=SLOWEST):
+        self.on_phase = on_phase
+        self.on_group = on_group
+        self.slowest = slowest
+        self.phases = {}
+        self.entity_counts = {}
+        self.bytes_read = 0
+        self.groups = 0
+        self._groups = []
+
+    def phase(self, name):
+        """ Context manager timing one call of a phase """
+        return _Phase(self, name)
+
+    def record(self, name, seconds):
+        """ Add one call of `seconds` to a phase """
+        entry = self.phases.get(name)
+        if entry is None:
+            entry = self.phases[name] = [0.0, 0]
+        entry[0] += seconds
+        entry[1] += 1
+        if self.on_phase is not None:
+            self.on_phase(name, seconds)
+
+    def group(self, entity, seconds):
+        """ Record one add_children call """
+        self.groups += 1
+        n = len(getattr(entity, 'children', ()))
+        item = (seconds, entity.sequence_number, int(entity.d['entity_type_number']), n)
+        if len(self._groups) < self.slowest:
+            heapq.heappush(self._groups, item)
+        elif item > self._groups[0]:
+            heapq.heapreplace(self._groups, item)
+        if self.on_group is not None:
+            self.on_group(entity, seconds)
+
+    def count_entities(self, directory):
+        """ Entity counts per type number from a directory table """
+        types, counts = np.unique(directory['entity_type_number'], return_counts=True)
+        for t, n in zip(types.tolist(), counts.tolist()):
+            self.entity_counts[t] = self.entity_counts.get(t, 0) + n
+
+    @property
+    def slowest_groups(self):
+        return sorted(self._groups, reverse=True)
+
+    @property
+    def total(self):
+        """ Seconds spent in all phases """
+        return sum(seconds for seconds, _ in self.phases.values())
+
+    def as_dict(self):
+        """ Plain dict, e.g. for JSON """
+        return {
+            'phases': {name: {'seconds': s, 'calls': n} for name, (s, n) in self.phases.items()},
+            'entity_counts': {str(t): n for t, n in sorted(self.entity_counts.items())},
+            'bytes_read': self.bytes_read,
+            'groups': self.groups,
+            'slowest_groups': [{'seconds': s, 'sequence_number': seq, 'type': t, 'members': n}
+                               for s, seq, t, n in self.slowest_groups],
+        }
+
+    def __str__(self):
+        s = '--- Load statistics ---\n'
+        for name, (seconds, calls) in self.phases.items():
+            s += '{0:<16}{1:10.4f} s {2:>8} call(s)\n'.format(name, seconds, calls)
+        s += '{0:<16}{1:10.4f} s\n'.format('total', self.total)
+        s += 'Read {0} bytes; entities by type: '.format(self.bytes_read)
+        s += ', '.join('{0}: {1}'.format(t, n) for t, n in sorted(self.entity_counts.items()))
+        if self._groups:
+            s += '\nSlowest of {0} groups:'.format(self.groups)
+            for seconds, seq, t, n in self.slowest_groups:
+                s += '\n  {0} {1} ({2} members) {3:.4f} s'.format(t, seq, n, seconds)
+        return s
+
+
+class _NullStats(object):
+    """ Stand-in when a load is not instrumented """
+    enabled = False
+    _phase = _NoPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def record(self, name, seconds):
+        pass
+
+    def group(self, entity, seconds):
+        pass
+
+    def count_entities(self, directory):
+        pass
+
+
+NULL_STATS = _NullStats()
+
+
+def make_stats(stats):
+    """ LoadStats for a `stats` argument: None/False (off), True or a LoadStats """
+    if stats is None or stats is False:
+        return NULL_STATS
+    if stats is True:
+        return LoadStats()
+    return stats
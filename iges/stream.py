@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+"""
+Streaming IGES reader.
+
+Reads any binary or text stream, or a path, in fixed-size chunks; gzip, bz2
+and xz input is recognised by its magic bytes and decompressed on the fly.
+Files without line terminators (bare 80 column records) are read too.
+
+All D lines come before the first P line, so the D section is spooled to a
+temporary file (in memory up to SPOOL_BYTES, then on disk). The P section
+is then tokenized in entity-aligned chunks of about CHUNK_LINES lines,
+walking the spooled directory in step with it, and every entity is built as
+soon as its P record is complete:
+
+- transformation matrices (124) are kept until the last entity pointing to
+  them (counted while spooling the D section) is built; an entity whose 124
+  comes later waits for it;
+- group members (102, 402) are held back until their group arrives, which
+  chains them as usual; an entity no group has claimed within `window`
+  later entities is given out as top-level, as is everything left at the end.
+
+Memory does not grow with the number of entities once the window is full,
+but the reader holds more than the entity being built:
+
+- the P lines of the current chunk (CHUNK_LINES, or one longer record) and
+  the spooled D section while it fits in SPOOL_BYTES;
+- a use count per 124 referenced anywhere in the file, and every 124 that
+  is still to be used;
+- up to `window` built entities awaiting a group (WINDOW, 65536, by
+  default), each pinning the directory chunk of DE_CHUNK rows it is a view
+  of;
+- entities whose 124 comes later in the file, and groups whose members do,
+  until these arrive.
+
+The last two only grow with forward references. A smaller window bounds
+memory harder, but members further than `window` entities ahead of their
+group are given out unlinked (with a warning). Entities come out in roughly
+file order; with link=False every entity is given out as soon as it is
+built, groups unlinked.
+"""
+import bz2
+import gzip
+import io
+import lzma
+import tempfile
+import warnings
+from collections import OrderedDict
+from iges.directory import parse_directory
+from iges.parameters import tokenize_lines
+from iges.read import make_entity, separators
+from iges.entity import process_global_section
+from iges.curves_surfaces import TransformationMatrix
+
+CHUNK_BYTES = 1 << 20
+CHUNK_LINES = 1 << 14
+DE_CHUNK = 1 << 12
+SPOOL_BYTES = 1 << 24
+WINDOW = 1 << 16
+
+MAGIC = [
+    (b'\x1f\x8b', lambda f: gzip.GzipFile(fileobj=f)),
+    (b'BZh', bz2.BZ2File),
+    (b'\xfd7zXZ\x00', lzma.LZMAFile),
+]
+
+
+def open_stream(source):
+    """ Text stream (latin-1) of a path or a binary or text file object, decompressed if need be """
+    if isinstance(source, str):
+        source = open(source, 'rb')
+    if isinstance(source, io.TextIOBase):
+        return source
+    if not hasattr(source, 'peek'):
+        source = io.BufferedReader(source)
+    head = source.peek(6)[:6]
+    for magic, decompress in MAGIC:
+        if head.startswith(magic):
+            source = decompress(source)
+            break
+    return io.TextIOWrapper(source, encoding='latin-1', newline=None)
+
+
+def records(text, chunk_size=CHUNK_BYTES):
+    """ Yield the 80 column records of a text stream, reading chunk_size characters at a time """
+    tail = ''
+    fixed = None
+    while True:
+        chunk = text.read(chunk_size)
+        if not chunk:
+            break
+        buf = tail + chunk
+        if fixed is None:
+            first = buf.find('\n')
+            if first < 0 and len(buf) <= 81:
+                tail = buf
+                continue
+            # no terminator within the first record: bare 80 column records
+            fixed = first < 0 or first > 81
+        if fixed:
+            n = len(buf)//80*80
+            for k in range(0, n, 80):
+                yield buf[k:k+80]
+            tail = buf[n:]
+        else:
+            lines = buf.split('\n')
+            tail = lines.pop()
+            for line in lines:
+                yield line.rstrip('\r')
+    if tail.strip():
+        yield tail.rstrip('\r\n')
+
+
+class StreamReader(object):
+    """
+    Iterate over the entities of an IGES stream; see the module docstring.
+    global_string and global_parameters are set once the G section is read,
+    i.e. after the first entity is given out.
+    """
+    def __init__(self, source, chunk_size=CHUNK_BYTES, link=True, window=WINDOW):
+        self._text = open_stream(source)
+        self.chunk_size = chunk_size
+        self.link = link
+        self.window = window
+        self.global_string = ''
+        self.global_parameters = None
+        self.param_sep, self.record_sep = ',', ';'
+
+    def __iter__(self):
+        return self.entities()
+
+    def entities(self):
+        """ Generator of entities, as described in the module docstring """
+        self._transforms = {}
+        self._uses = {}         # 124 sequence number -> entities yet to be built that use it
+        self._waiting = {}      # 124 sequence number -> [(entity, values)] waiting for it
+        self._pending = OrderedDict()   # not yet claimed by a group
+        self._groups = {}       # member sequence number -> group waiting for it
+        self._missing = {}      # group -> member pointers still to come
+        self._out = []
+
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, mode='w+', encoding='latin-1', newline='')
+        p_lines = []
+        directory = None
+        try:
+            for line in records(self._text, self.chunk_size):
+                code = line[72:73]
+                if code == 'P':
+                    if directory is None:
+                        self._start_parameters()
+                        spool.seek(0)
+                        directory = self._directory_rows(spool)
+                    p_lines.append(line)
+                    if len(p_lines) >= CHUNK_LINES:
+                        cut = _last_record(p_lines)
+                        if cut:
+                            for e in self._parameters(p_lines[:cut], directory):
+                                yield e
+                            del p_lines[:cut]
+                elif code == 'D':
+                    spool.write(line[:80].ljust(80) + '\n')
+                    transform = line[48:56].strip()
+                    if transform and transform != '0' and int(line[73:80]) % 2:
+                        transform = int(transform)
+                        self._uses[transform] = self._uses.get(transform, 0) + 1
+                elif code == 'G':
+                    self.global_string += line[:72]
+            if directory is None:
+                self._start_parameters()
+                directory = iter(())
+            for e in self._parameters(p_lines, directory):
+                yield e
+            for e in self._finish():
+                yield e
+        finally:
+            spool.close()
+
+    def _start_parameters(self):
+        self.param_sep, self.record_sep = separators(self.global_string)
+        self.global_parameters = process_global_section(self.global_string, self.param_sep, self.record_sep)
+
+    def _directory_rows(self, spool):
+        """ Yield (table, row) of every spooled DE, parsed DE_CHUNK at a time """
+        while True:
+            lines = [spool.readline() for _ in range(2*DE_CHUNK)]
+            lines = [line for line in lines if line]
+            if not lines:
+                return
+            table = parse_directory(lines[:len(lines)//2*2])
+            for row in range(len(table)):
+                yield table, row
+
+    def _parameters(self, lines, directory):
+        """ Build the entities of entity-aligned P lines; yield what is ready """
+        pointers, offsets, values, _ = tokenize_lines(lines, self.param_sep, self.record_sep)
+        offsets = offsets.tolist()
+        for k, ptr in enumerate(pointers.tolist()):
+            for table, row in directory:
+                seq = int(table['sequence_number'][row])
+                if seq == ptr:
+                    break
+                if seq > ptr:
+                    raise ValueError('P record of DE {0} is out of directory order; load the file with IGES_Object'.format(ptr))
+            else:
+                raise ValueError('P record points to DE {0}, which is not in the directory'.format(ptr))
+            self._build(make_entity(table, row), values[offsets[k]:offsets[k+1]])
+            for e in self._out:
+                yield e
+            del self._out[:]
+
+    def _build(self, e, values):
+        ptr = int(e.d['transform'])
+        if ptr:
+            t = self._transforms.get(ptr)
+            if t is None:
+                self._waiting.setdefault(ptr, []).append((e, values))
+                return
+            e.transformation = t
+            self._used(ptr)
+        e.add_parameters(values)
+        self._complete(e)
+
+    def _used(self, ptr):
+        """ One fewer entity left to use the 124 `ptr`; forget it after the last """
+        left = self._uses.get(ptr, 0) - 1
+        if left > 0:
+            self._uses[ptr] = left
+        else:
+            self._uses.pop(ptr, None)
+            self._transforms.pop(ptr, None)
+
+    def _complete(self, e):
+        seq = e.sequence_number
+        if isinstance(e, TransformationMatrix):
+            if self._uses.get(seq):
+                # kept a while: do not hold on to its whole directory chunk
+                e.detach()
+                self._transforms[seq] = e
+            for waiting, values in self._waiting.pop(seq, []):
+                waiting.transformation = e
+                self._used(seq)
+                waiting.add_parameters(values)
+                self._complete(waiting)
+        if not self.link:
+            self._out.append(e)
+            return
+
+        pointers = getattr(e, 'pointers', None)
+        if pointers is not None:
+            missing = set(p for p in pointers[:e.n_curves] if p not in self._pending)
+            # members that come later in the file; those already given out are lost
+            missing = set(p for p in missing if p > seq)
+            if missing:
+                self._missing[e] = missing
+                for p in missing:
+                    self._groups[p] = e
+            else:
+                self._link(e)
+        else:
+            self._hold(e)
+
+    def _hold(self, e):
+        """ Keep an entity until a group claims it, or the window passes it by """
+        seq = e.sequence_number
+        group = self._groups.pop(seq, None)
+        self._pending[seq] = e
+        if group is not None:
+            self._missing[group].discard(seq)
+            if not self._missing[group]:
+                del self._missing[group]
+                self._link(group)
+        while len(self._pending) > self.window:
+            self._out.append(self._pending.popitem(last=False)[1])
+
+    def _link(self, group):
+        members = group.pointers[:group.n_curves]
+        children = [self._pending.pop(p) for p in members if p in self._pending]
+        if len(children) < len(members):
+            warnings.warn('{0} {1}: {2} member(s) were given out before the group arrived; raise the window'.format(
+                type(group).__name__, group.sequence_number, len(members) - len(children)))
+        if children:
+            group.add_children(children)
+        self._hold(group)
+
+    def _finish(self):
+        """ Everything still held, at the end of the stream """
+        for ptr, waiting in self._waiting.items():
+            for e, values in waiting:
+                warnings.warn('Entity {0}: transformation pointer {1} does not point to a 124 entity'.format(e.sequence_number, ptr))
+                e.add_parameters(values)
+                self._complete(e)
+        self._waiting = {}
+        for group in list(self._missing):
+            if group in self._missing:
+                del self._missing[group]
+                self._link(group)
+        self._out.extend(self._pending.values())
+        self._pending.clear()
+        out, self._out = self._out, []
+        return out
+
+    def close(self):
+        self._text.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _last_record(lines):
+    """ Index of the first line of the last (maybe incomplete) record """
+    i = len(lines) - 1
+    ptr = lines[i][64:72]
+    while i > 0 and lines[i-1][64:72] == ptr:
+        i -= 1
+    return i
+
+
+def iter_entities(source, **kwargs):
+    """ Entities of an IGES path or stream, one at a time; see StreamReader """
+    with StreamReader(source, **kwargs) as reader:
+        for e in reader:
+            yield e
+
+
+def discretize_stream(source, dx=None, n_points=None, endpoint=True, batch=4096, chord_tol=None, max_len=None, min_len=None):
+    """
+    Discretize the curves of an IGES path or stream as they arrive: yields
+    one iges.discretize.Discretization per `batch` top-level curves, with
+    entity_ids holding DE sequence numbers.
+    """
+    from iges.discretize import discretize
+    curves = []
+    for e in iter_entities(source):
+        if hasattr(e, 'linspace'):
+            curves.append(e)
+        if len(curves) >= batch:
+            yield discretize(curves, dx, n_points, endpoint, index=lambda c: c.sequence_number,
+                             chord_tol=chord_tol, max_len=max_len, min_len=min_len)
+            curves = []
+    if curves:
+        yield discretize(curves, dx, n_points, endpoint, index=lambda c: c.sequence_number,
+                         chord_tol=chord_tol, max_len=max_len, min_len=min_len)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+"""
+Struct-of-arrays geometry tables.
+
+A table packs the parameter rows of every entity of one type into a single
+(N, width) array, and their model space endpoints into an (N, 6) array, and
+rebinds each entity's `_params` and `_ends` to views of its rows, so
+per-entity objects and the table always agree. Queries run over all
+rows at once instead of one small NumPy call per entity.
+
+Results are in model space: each row's transformation (124) is applied.
+Point batches are returned as (N, 3, n) arrays; ragged results (arange) come
+back CSR style as a (3, P) point array plus (N+1,) offsets.
+"""
+import math
+import numpy as np
+
+# Up to this many distinct transforms, rows are moved transform by transform
+GROUPED_TRANSFORMS = 64
+
+
+def stack_transforms(entities):
+    """
+    Per-entity transform index into stacked rotations R (K,3,3) and
+    translations T (K,3). Entities without a transformation get index -1.
+    """
+    slots = {}
+    R = []
+    T = []
+    index = np.full(len(entities), -1, dtype=np.int64)
+    for i, e in enumerate(entities):
+        t = e.transformation
+        if t is None:
+            continue
+        k = slots.get(id(t))
+        if k is None:
+            k = slots[id(t)] = len(R)
+            r, d = t.composed()
+            R.append(r)
+            T.append(d)
+        index[i] = k
+    R = np.array(R).reshape(-1, 3, 3)
+    T = np.array(T).reshape(-1, 3)
+    return index, R, T
+
+
+def apply_transforms(pts, index, R, T):
+    """
+    Transform (N, 3, ...) points row by row; index -1 leaves a row alone.
+    Rows sharing a transform are moved together in one matrix product.
+    """
+    out = np.array(pts, dtype=float)
+    rows = np.flatnonzero(index >= 0)
+    if not len(rows):
+        return out
+    shape = out[rows].shape
+    k = index[rows]
+    if len(T) <= GROUPED_TRANSFORMS:
+        for j in np.unique(k).tolist():
+            mine = rows[k == j]
+            local = out[mine].reshape(len(mine), 3, -1)
+            out[mine] = (np.matmul(R[j], local) + T[j][:, None]).reshape((len(mine),) + shape[1:])
+    else:
+        local = out[rows].reshape(len(rows), 3, -1)
+        moved = np.einsum('nij,njm->nim', R[k], local) + T[k][:, :, None]
+        out[rows] = moved.reshape(shape)
+    return out
+
+
+def ragged(counts):
+    """ CSR offsets and, for every item, its row and position within the row """
+    counts = np.asarray(counts, dtype=np.int64)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    row = np.repeat(np.arange(len(counts)), counts)
+    pos = np.arange(offsets[-1]) - offsets[row]
+    return offsets, row, pos
+
+
+def fractions(counts, endpoint):
+    """
+    Curve fractions in [0, 1] for rows sampled `counts` times, like
+    np.linspace(0, 1, n, endpoint) per row. Returns (offsets, row, t).
+    """
+    offsets, row, pos = ragged(counts)
+    counts = np.asarray(counts, dtype=np.int64)
+    endpoint = np.broadcast_to(endpoint, counts.shape)
+    div = np.where(endpoint, counts - 1, counts)[row]
+    t = pos / np.maximum(div, 1)
+    return offsets, row, t
+
+
+def clamp_segments(counts, lengths, max_len=None, min_len=None):
+    """ Segment counts adjusted so segments are at most max_len and at least min_len long """
+    counts = np.asarray(counts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=float)
+    if max_len is not None:
+        counts = np.maximum(counts, np.ceil(lengths/max_len).astype(np.int64))
+    if min_len is not None:
+        counts = np.minimum(counts, np.floor(lengths/min_len).astype(np.int64))
+    return np.maximum(counts, 1)
+
+
+def locate(entities, tables):
+    """
+    Where each entity lives in a list of tables: (table number, row) arrays,
+    both -1 for entities that are in none of them.
+    """
+    rows = {}
+    for t, table in enumerate(tables):
+        for r, e in enumerate(table.entities):
+            rows[id(e)] = (t, r)
+    where = np.array([rows.get(id(e), (-1, -1)) for e in entities], dtype=np.int64).reshape(-1, 2)
+    return where[:, 0], where[:, 1]
+
+
+class GeometryTable(object):
+    """ Shared bookkeeping for the per-type tables """
+    width = 0
+
+    def __init__(self, entities):
+        self.entities = list(entities)
+        self.params = np.empty((len(self.entities), self.width))
+        self.ends = np.empty((len(self.entities), 6))
+        for i, e in enumerate(self.entities):
+            self.params[i] = e._params
+            e._params = self.params[i]
+            self.ends[i] = e._ends
+            e._ends = self.ends[i]
+        self.transform_index, self.R, self.T = stack_transforms(self.entities)
+
+    def __len__(self):
+        return len(self.entities)
+
+    def _to_model(self, pts, rows=None):
+        index = self.transform_index if rows is None else self.transform_index[rows]
+        return apply_transforms(pts, index, self.R, self.T)
+
+    def sample(self, counts, endpoint=True):
+        """ counts[i] points along row i, as ((3, P) points, (N+1,) offsets) """
+        offsets, row, t = fractions(counts, endpoint)
+        return self.evaluate(row, t), offsets
+
+    def arange(self, dx, endpoint=False):
+        """ Points every ~dx along each row, as ((3, P) points, (N+1,) offsets) """
+        counts = np.ceil(self.lengths()/dx).astype(np.int64)
+        return self.sample(counts, endpoint)
+
+
+class LineTable(GeometryTable):
+    """ Line (110) rows: [start xyz, end xyz] in definition space """
+    width = 6
+
+    @property
+    def start(self):
+        return self.params[:, 0:3]
+
+    @property
+    def end(self):
+        return self.params[:, 3:6]
+
+    def lengths(self):
+        return np.linalg.norm(self.end - self.start, axis=1)
+
+    def endpoints(self):
+        """ Model space (N,3) start and end points """
+        pts = self._to_model(self.params.reshape(-1, 2, 3).transpose(0, 2, 1))
+        return pts[:, :, 0], pts[:, :, 1]
+
+    def chord_segments(self, chord_tol):
+        """ Segments per row for a chord tolerance: a straight line needs one """
+        return np.ones(len(self), dtype=np.int64)
+
+    def linspace(self, n_points, endpoint=True):
+        t = np.linspace(0.0, 1.0, n_points, endpoint=endpoint)
+        pts = self.start[:, :, None]*(1-t) + self.end[:, :, None]*t
+        return self._to_model(pts)
+
+    def evaluate(self, rows, t):
+        """ Model space points (3, P) at fractions t along the given rows """
+        pts = self.start[rows]*(1-t)[:, None] + self.end[rows]*t[:, None]
+        return self._to_model(pts[:, :, None], rows)[:, :, 0].T
+
+
+class ArcTable(GeometryTable):
+    """ CircArc (100) rows: [x, y, z, x1, y1, x2, y2, reversed] in definition space """
+    width = 8
+
+    @property
+    def centers(self):
+        return self.params[:, 0:3]
+
+    @property
+    def radii(self):
+        p = self.params
+        return np.hypot(p[:, 3]-p[:, 0], p[:, 4]-p[:, 1])
+
+    def angles(self):
+        """ Start and end angles, traced CCW (or CW once reversed), as in CircArc.thetas """
+        p = self.params
+        theta1 = np.arctan2(p[:, 4]-p[:, 1], p[:, 3]-p[:, 0])
+        theta2 = np.arctan2(p[:, 6]-p[:, 1], p[:, 5]-p[:, 0])
+        sweep = theta2 - theta1
+        reversed = p[:, 7] != 0
+        theta2 = np.where(reversed, theta1 - np.mod(-sweep, 2*math.pi), theta1 + np.mod(sweep, 2*math.pi))
+        return theta1, theta2
+
+    def lengths(self):
+        theta1, theta2 = self.angles()
+        return np.abs(theta2 - theta1)*self.radii
+
+    def chord_segments(self, chord_tol):
+        """
+        Segments per row keeping the sagitta r*(1 - cos(a/2)) of every chord
+        within chord_tol, in closed form.
+        """
+        theta1, theta2 = self.angles()
+        radii = self.radii
+        step = 2*np.arccos(np.clip(1 - chord_tol/np.where(radii > 0, radii, 1.), -1., 1.))
+        return np.maximum(np.ceil(np.abs(theta2 - theta1)/np.maximum(step, 1e-12)), 1).astype(np.int64)
+
+    def endpoints(self):
+        """ Model space (N,3) start and end points """
+        p = self.params
+        pts = np.stack((p[:, [3, 5]], p[:, [4, 6]], np.repeat(p[:, 2:3], 2, axis=1)), axis=1)
+        pts = self._to_model(pts)
+        return pts[:, :, 0], pts[:, :, 1]
+
+    def linspace(self, n_points, endpoint=True):
+        theta1, theta2 = self.angles()
+        t = np.linspace(0.0, 1.0, n_points, endpoint=endpoint)
+        theta = theta1[:, None] + (theta2 - theta1)[:, None]*t
+        r = self.radii[:, None]
+        c = self.centers
+        pts = np.stack((c[:, 0:1] + r*np.cos(theta), c[:, 1:2] + r*np.sin(theta),
+                        np.broadcast_to(c[:, 2:3], theta.shape)), axis=1)
+        return self._to_model(pts)
+
+    def evaluate(self, rows, t):
+        """ Model space points (3, P) at fractions t along the given rows """
+        theta1, theta2 = self.angles()
+        theta = theta1[rows] + (theta2 - theta1)[rows]*t
+        r = self.radii[rows]
+        c = self.centers[rows]
+        pts = np.stack((c[:, 0] + r*np.cos(theta), c[:, 1] + r*np.sin(theta), c[:, 2]), axis=1)
+        return self._to_model(pts[:, :, None], rows)[:, :, 0].T
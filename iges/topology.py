@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Model-wide node merging and beam-mesh topology.
+
+Every leaf curve of the model becomes one or more two-node elements:
+
+- a curve is split wherever another curve's endpoint lands on its interior
+  (T-junctions), found with one CurveIndex.within query over all endpoints;
+- each piece is optionally subdivided every ~dx along its length, or
+  adaptively within a chord tolerance;
+- all element ends are merged into nodes within `tol` with the hash-grid
+  union-find of iges.chaining, so shared endpoints become shared nodes.
+
+Both passes are batched over the whole model and run in near-linear time.
+"""
+import numpy as np
+from iges.curves_surfaces import fraction_on_segments, fraction_on_arcs, EPSILON
+from iges.chaining import merge_points
+from iges.tables import ragged, locate
+from iges.spatial import by_leaf, curve_index
+from iges.discretize import leaf_lengths, chord_segments
+
+
+class Topology(object):
+    """
+    nodes          (K, 3) node coordinates
+    elements       (E, 2) node numbers of each two-node element
+    element_leaf   (E,)   leaf curve (CurveIndex.curves slot) each element lies on
+    element_ids    (E,)   entity_list index of that leaf curve
+    element_parent (E,)   entity_list index of its top-level curve
+    """
+    def __init__(self, nodes, elements, element_leaf, element_ids, element_parent):
+        self.nodes = nodes
+        self.elements = elements
+        self.element_leaf = element_leaf
+        self.element_ids = element_ids
+        self.element_parent = element_parent
+
+    def __len__(self):
+        return len(self.elements)
+
+    def degree(self):
+        """ Number of element ends at each node """
+        return np.bincount(self.elements.reshape(-1), minlength=len(self.nodes))
+
+
+def fractions_at(index, leaf, points):
+    """ Fractions along index.curves[leaf] of the (M,3) points, which lie on them """
+    t = np.empty(len(leaf))
+    lines = index.is_line[leaf]
+    if lines.any():
+        l = leaf[lines]
+        t[lines] = fraction_on_segments(index.e1[l], index.e2[l], points[lines])
+    arcs = index.is_arc[leaf]
+    if arcs.any():
+        a = index.arc_row[leaf[arcs]]
+        P, N, va, sweep, sign = [f[a] for f in index.arc_frames[:5]]
+        t[arcs] = fraction_on_arcs(P, N, va, sweep, sign, points[arcs])
+    for c, mine in by_leaf(leaf, ~lines & ~arcs):
+        t[mine] = index.curves[c].fraction(points[mine])
+    return t
+
+
+def split_points(index, tol=EPSILON):
+    """
+    (leaf, fraction) pairs where an endpoint of one curve lies within tol of
+    the interior of another.
+    """
+    n = len(index.curves)
+    ends = np.vstack((index.e1, index.e2))
+    offsets, leaf, _, near, isnode = index.within(ends, tol)
+    owner = np.repeat(np.arange(len(ends)) % max(n, 1), np.diff(offsets))
+    hit = (isnode == 0) & (leaf != owner)
+    leaf, near = leaf[hit], near[hit]
+    return leaf, fractions_at(index, leaf, near)
+
+
+def topology(index, tol=EPSILON, dx=None, tables=(), chord_tol=None, max_len=None, min_len=None):
+    """
+    Beam-mesh topology of the curves of a CurveIndex. With dx, pieces are
+    subdivided into elements no longer than ~dx; with chord_tol, into their
+    share of the leaf's adaptive segments (see iges.discretize); otherwise
+    each piece between split points is one element.
+    """
+    curves = index.curves
+    n = len(curves)
+    if not n:
+        return Topology(np.zeros((0, 3)), np.zeros((0, 2), dtype=np.int64), *[np.zeros(0, dtype=np.int64)]*3)
+    which, row = locate(curves, tables)
+
+    # Cuts: both ends of every curve plus the split points
+    split_leaf, split_t = split_points(index, tol)
+    cut_leaf = np.concatenate((np.arange(n), np.arange(n), split_leaf))
+    cut_t = np.concatenate((np.zeros(n), np.ones(n), split_t))
+    order = np.lexsort((cut_t, cut_leaf))
+    cut_leaf, cut_t = cut_leaf[order], cut_t[order]
+
+    # Pieces between consecutive cuts, subdivided every ~dx
+    piece = np.flatnonzero(cut_leaf[1:] == cut_leaf[:-1])
+    piece_leaf = cut_leaf[piece]
+    a, b = cut_t[piece], cut_t[piece+1]
+    if dx is not None:
+        lengths = leaf_lengths(curves, which, row, tables)
+        counts = np.maximum(np.ceil((b - a)*lengths[piece_leaf]/dx), 1).astype(np.int64)
+    elif chord_tol is not None:
+        # each piece gets its share of the leaf's adaptive segments
+        segments, _ = chord_segments(curves, which, row, tables, chord_tol, max_len, min_len)
+        counts = np.maximum(np.ceil((b - a)*segments[piece_leaf] - 1e-9), 1).astype(np.int64)
+    else:
+        counts = np.ones(len(piece), dtype=np.int64)
+    _, p, pos = ragged(counts)
+    start_leaf = piece_leaf[p]
+    start_t = a[p] + (b - a)[p]*pos/counts[p]
+    # element k runs from point k to point k+1; one extra end point per leaf
+    last = np.r_[start_leaf[1:] != start_leaf[:-1], True]
+    slot = np.arange(len(start_t)) + np.cumsum(np.r_[False, last[:-1]])
+    m = len(start_t) + n
+    point_leaf = np.empty(m, dtype=np.int64)
+    point_t = np.empty(m)
+    point_leaf[slot] = start_leaf
+    point_t[slot] = start_t
+    point_leaf[slot[last] + 1] = start_leaf[last]
+    point_t[slot[last] + 1] = 1.0
+
+    # Evaluate every point, one pass per table
+    points = np.empty((m, 3))
+    where = which[point_leaf]
+    for t, table in enumerate(tables):
+        mine = np.flatnonzero(where == t)
+        if len(mine):
+            points[mine] = table.evaluate(row[point_leaf[mine]], point_t[mine]).T
+    for c, mine in by_leaf(point_leaf, where < 0):
+        points[mine] = curves[c].evaluate(point_t[mine]).T
+
+    # Merge, then connect consecutive points of the same leaf
+    labels = merge_points(points, tol)
+    _, first = np.unique(labels, return_index=True)
+    nodes = points[first]
+    elements = np.stack((labels[slot], labels[slot + 1]), axis=1)
+    keep = elements[:, 0] != elements[:, 1]
+    element_leaf = start_leaf[keep]
+    return Topology(nodes, elements[keep], element_leaf,
+                    np.asarray(index.ids)[element_leaf], np.asarray(index.parent)[element_leaf])
+
+
+def model_topology(igs, tol=EPSILON, dx=None, cell_size=None, chord_tol=None, max_len=None, min_len=None):
+    """ Topology of every top-level curve of an IGES_Object """
+    return topology(curve_index(igs, cell_size), tol, dx, tables=(igs.lines, igs.arcs),
+                    chord_tol=chord_tol, max_len=max_len, min_len=min_len)
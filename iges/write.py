@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+"""
+Streaming IGES writer.
+
+Entities are written as they are added: the Start and Global sections go out
+first, every entity's two DE lines go straight to the output in buffered
+chunks, and its P lines go to a spooled temporary file (memory up to
+SPOOL_BYTES, then disk), which is copied after the D section on close. So
+the text does not accumulate in memory; the sequence numbers of written
+entities are kept in a weak-keyed map, so that an entity reached twice is
+written once without the writer keeping anything alive: an entry goes
+when its entity does.
+
+An entity's transformation (124) and, for groups, its members are written
+before it, each only once, so every pointer refers to an entity already in
+the D section. Parameters are written in definition space, as read.
+Parameters are packed 64 columns to a P line and 72 to a G line, never
+splitting a number across lines; reals always carry a decimal point.
+"""
+import io
+import shutil
+import tempfile
+import time
+import warnings
+import weakref
+from iges import __version__
+from iges.curves_surfaces import Line, CircArc, ConicArc, ParametricSplineCurve, Point, CompCurve, AssociativityInstance, TransformationMatrix, RationalBSplineCurve
+
+SPOOL_BYTES = 1 << 24
+FLUSH_LINES = 1 << 14
+DE_FORMAT = '{0:>8}{1:>8}{2:>8}{3:>8}{4:>8}{5:>8}{6:>8}{7:>8}{8:>8}D{9:>7}\n'
+
+# Global parameters holding integers (1-based, IGES spec v5.3, p. 17, Table 2)
+INTEGER_GLOBALS = {7, 8, 9, 10, 11, 14, 16, 23, 24}
+
+
+def real(x):
+    """ IGES real: repr precision, always with a decimal point """
+    s = repr(float(x))
+    if 'e' in s:
+        mantissa, exponent = s.split('e')
+        if '.' not in mantissa:
+            mantissa += '.'
+        s = mantissa + 'E' + exponent
+    return s
+
+
+def hollerith(s):
+    return '{0}H{1}'.format(len(s), s)
+
+
+def wrap(tokens, width, param_sep=',', record_sep=';'):
+    """
+    Pack parameter tokens into lines of at most `width` columns, with their
+    delimiters, breaking only between tokens (or inside a token too long
+    for any line).
+    """
+    lines = []
+    line = ''
+    last = len(tokens) - 1
+    for k, token in enumerate(tokens):
+        token += record_sep if k == last else param_sep
+        if len(line) + len(token) > width and line:
+            lines.append(line)
+            line = ''
+        while len(token) > width:
+            lines.append(token[:width])
+            token = token[width:]
+        line += token
+    if line or not lines:
+        lines.append(line)
+    return lines
+
+
+def default_global(filename=''):
+    """ Global section parameters for a file written by this package """
+    date = time.strftime('%Y%m%d.%H%M%S')
+    return [',', ';', 'iges', filename, 'iges', 'iges ' + __version__, 32, 38, 6, 308, 15,
+            'iges', 1.0, 2, 'MM', 1, 1.0, date, 1e-08, 0.0, '', '', 11, 0, date]
+
+
+def global_tokens(parameters):
+    """ Tokens of the global section; strings become Hollerith, None is defaulted """
+    tokens = []
+    for k, value in enumerate(parameters):
+        if value is None:
+            tokens.append('')
+        elif isinstance(value, str):
+            tokens.append(hollerith(value))
+        elif k + 1 in INTEGER_GLOBALS:
+            tokens.append(str(int(value)))
+        else:
+            tokens.append(real(value))
+    # this writer always uses the default delimiters
+    tokens[:2] = [hollerith(','), hollerith(';')]
+    return tokens
+
+
+def line_parameters(e, pointer):
+    return 110, 0, [real(v) for v in e._params[:6]]
+
+
+def arc_parameters(e, pointer):
+    # Written counterclockwise, as the spec requires; the file gives z first
+    x1, y1, x2, y2 = (e.x2, e.y2, e.x1, e.y1) if e.reversed else (e.x1, e.y1, e.x2, e.y2)
+    return 100, 0, [real(v) for v in (e.z, e.x, e.y, x1, y1, x2, y2)]
+
+
+def conic_parameters(e, pointer):
+    # Ellipses are written counterclockwise, as the spec requires
+    x1, y1, x2, y2 = (e.X2, e.Y2, e.X1, e.Y1) if e.reversed else (e.X1, e.Y1, e.X2, e.Y2)
+    return 104, int(e.d['form_number']), [real(v) for v in (e.A, e.B, e.C, e.D, e.E, e.F, e.ZT, x1, y1, x2, y2)]
+
+
+def parametric_spline_parameters(e, pointer):
+    values = [str(e.CTYPE), str(e.H), str(e.NDIM), str(e.N)]
+    values.extend(real(v) for v in e.T)
+    values.extend(real(v) for v in e.coefficients.reshape(-1))
+    values.extend(real(v) for v in e.terminal().reshape(-1))
+    return 112, 0, values
+
+
+def point_parameters(e, pointer):
+    return 116, 0, [real(e.x), real(e.y), real(e.z), '0']
+
+
+def transform_parameters(e, pointer):
+    R, T = e.R, e.T.reshape(3)
+    values = []
+    for i in range(3):
+        values.extend(real(v) for v in (R[i, 0], R[i, 1], R[i, 2], T[i]))
+    return 124, int(e.d['form_number']), values
+
+
+def spline_parameters(e, pointer):
+    values = [str(e.K), str(e.M), str(e.prop1), str(e.prop2), str(e.prop3), str(e.prop4)]
+    values.extend(real(v) for v in e.T)
+    values.extend(real(v) for v in e.W)
+    values.extend(real(v) for v in e.control_points.reshape(-1))
+    values.extend((real(e.V0), real(e.V1)))
+    if e.planar_curve:
+        values.extend(real(v) for v in (e.XNORM, e.YNORM, e.ZNORM))
+    return 126, int(e.d['form_number']), values
+
+
+def group_parameters(e, pointer):
+    members = [str(pointer(child)) for child in e.children]
+    if isinstance(e, AssociativityInstance):
+        return 402, 15, [str(len(members))] + members
+    return 102, 0, [str(len(members))] + members
+
+
+# Parameter writers by class: (entity, pointer function) -> (type, form, tokens)
+PARAMETER_WRITERS = [
+    (Line, line_parameters),
+    (CircArc, arc_parameters),
+    (ConicArc, conic_parameters),
+    (ParametricSplineCurve, parametric_spline_parameters),
+    (Point, point_parameters),
+    (TransformationMatrix, transform_parameters),
+    (RationalBSplineCurve, spline_parameters),
+    (CompCurve, group_parameters),
+    (AssociativityInstance, group_parameters),
+]
+
+
+def parameter_writer(entity):
+    """ Writer function for an entity, or None if it cannot be written """
+    for cls, fn in PARAMETER_WRITERS:
+        if isinstance(entity, cls):
+            if fn is group_parameters and getattr(entity, 'children', None) is None:
+                return None
+            return fn
+    return None
+
+
+def _negative_or(value):
+    """ DE fields that are values when >= 0 and pointers when < 0: drop the pointers """
+    return value if value >= 0 else 0
+
+
+class IGESWriter(object):
+    """
+    Write entities to an open text file `f`.
+    global_parameters: list as in IGES_Object.global_parameters; defaults
+                       to default_global(filename).
+    Use as a context manager, or call close() to finish the file.
+    """
+    def __init__(self, f, global_parameters=None, start='', filename=''):
+        self.f = f
+        self._p = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, mode='w+', encoding='latin-1', newline='')
+        self._d = []
+        self._written = weakref.WeakKeyDictionary()
+        self.n_d = 0
+        self.n_p = 0
+
+        start = start or 'IGES file written by the iges package {0}'.format(__version__)
+        s_lines = [start[k:k+72] for k in range(0, len(start), 72)] or ['']
+        for k, line in enumerate(s_lines):
+            f.write('{0:<72}S{1:>7}\n'.format(line, k + 1))
+        self.n_s = len(s_lines)
+
+        g_lines = wrap(global_tokens(list(global_parameters or default_global(filename))), 72)
+        for k, line in enumerate(g_lines):
+            f.write('{0:<72}G{1:>7}\n'.format(line, k + 1))
+        self.n_g = len(g_lines)
+
+    def add(self, entity):
+        """ Write an entity, after its transformation and members; returns its DE sequence number """
+        written = self._written.get(entity)
+        if written is not None:
+            return written
+        fn = parameter_writer(entity)
+        if fn is None:
+            raise TypeError('Cannot write {0} entity {1}'.format(type(entity).__name__, getattr(entity, 'sequence_number', '?')))
+
+        transform = self.add(entity.transformation) if entity.transformation is not None else 0
+        type_number, form, tokens = fn(entity, self.add)
+        seq = self.n_d + 1
+        self._written[entity] = seq
+        self.n_d += 2
+
+        lines = wrap([str(type_number)] + tokens, 64)
+        first = self.n_p + 1
+        self._p.write(''.join('{0:<64}{1:>8}P{2:>7}\n'.format(line, seq, first + k) for k, line in enumerate(lines)))
+        self.n_p += len(lines)
+
+        d = entity.d
+        self._d.append(DE_FORMAT.format(
+            type_number, first, 0, _negative_or(int(d['line_font_pattern'])), _negative_or(int(d['level'])),
+            0, transform, 0, '{0:08d}'.format(int(d['status_number'])), seq))
+        self._d.append(DE_FORMAT.format(
+            type_number, int(d['line_weight_number']), _negative_or(int(d['color_number'])), len(lines), form,
+            '', '', str(d['entity_label'])[:8], int(d['entity_subs_num']), seq + 1))
+        if len(self._d) >= FLUSH_LINES:
+            self.flush()
+        return seq
+
+    def flush(self):
+        """ Write out the buffered D lines """
+        self.f.write(''.join(self._d))
+        del self._d[:]
+
+    def close(self):
+        """ Append the P section and the terminate line """
+        if self._p is None:
+            return
+        self.flush()
+        self._p.seek(0)
+        shutil.copyfileobj(self._p, self.f, 1 << 20)
+        self._p.close()
+        self._p = None
+        self.f.write('{0:<72}T{1:>7}\n'.format('S{0:>7}G{1:>7}D{2:>7}P{3:>7}'.format(self.n_s, self.n_g, self.n_d, self.n_p), 1))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def write(f, entities, global_parameters=None, start='', filename=''):
+    """
+    Write entities (e.g. IGES_Object.toplevel_entities) and everything they
+    point to. Entities that cannot be written are skipped with a warning.
+    Returns the number of entities written.
+    """
+    skipped = 0
+    with IGESWriter(f, global_parameters, start, filename) as writer:
+        for e in entities:
+            if parameter_writer(e) is None:
+                skipped += 1
+                continue
+            writer.add(e)
+    if skipped:
+        warnings.warn('{0} entities of unsupported types were not written'.format(skipped))
+    return writer.n_d // 2
+
+
+def dumps(entities, global_parameters=None, start='', filename=''):
+    """ The IGES text of `entities`, as one string """
+    buf = io.StringIO()
+    write(buf, entities, global_parameters, start, filename)
+    return buf.getvalue()
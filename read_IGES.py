@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 import os
 from iges.read import IGES_Object
-from iges.curves_surfaces import CircArc, Line, CompCurve, AssociativityInstance
 
 import matplotlib
 import matplotlib.pyplot as plt
@@ -20,10 +19,9 @@ with open('chassis_007_simp.IGS', 'r') as f:
 # (entities can be accessed as part of CompCurves and AssociativityInstances, if they aren't barren)
 # The goal is to provide a uniform interface for all entities, though, so that it doesn't matter.
 # 
-# This will plot each topology in a unique (ish) color so you can see that entities have been grouped appropriately.
-for i, entity in enumerate(igs.toplevel_entities):
-    if type(entity) in [CircArc, Line, CompCurve, AssociativityInstance]:
-        lsp = entity.linspace(10, endpoint=True)
-        plt.plot(lsp[0,:], lsp[1,:], lsp[2,:], '-*')
-        
+# igs.preview() is the whole model as one decimated polyline, NaN between curves,
+# so it plots in a single call however many entities there are.
+pts = igs.preview()
+plt.plot(pts[0,:], pts[1,:], pts[2,:], '-')
+
 plt.show()
\ No newline at end of file
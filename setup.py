@@ -13,6 +13,10 @@ setuptools.setup(
 	long_description_content_type="text/markdown",
 	url="https://github.com/Thaddeus-Maximus/IGES-File-Reader",
 	packages=['iges'],
+	install_requires=['numpy'],
+	entry_points={
+		'console_scripts': ['iges-convert=iges.convert:main'],
+	},
 	classifiers=[
 		"Programming Language :: Python :: 3",
 		"License :: OSI Approved :: MIT License",
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Record what the original loader (the repository's first commit) makes of
+the sample files, as the reference the tests compare against:
+
+    git worktree add /tmp/baseline <first commit>
+    cd /tmp/baseline && PYTHONPATH=. python <this file> > <this directory>/baseline.json
+
+Per file: the global section, the top-level entities, and per entity (by
+DE sequence number) its class, DE fields and, as far as the original
+classes had them, parameters, model space endpoints, length and samples.
+"""
+import contextlib
+import io
+import json
+import sys
+import numpy as np
+from iges.read import IGES_Object
+
+SAMPLES = ['chassis_007_simp.IGS', 'tubes_splined.iges']
+ATTRIBUTES = ['p1', 'p2', 'x', 'y', 'z', 'x1', 'y1', 'x2', 'y2', 'R', 'T', 'W', 'control_points', 'V0', 'V1', 'K', 'M']
+
+
+def plain(value):
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    return np.asarray(value, dtype=float).tolist()
+
+
+def record(e):
+    # blank DE fields were None, they are 0 now
+    r = {'class': type(e).__name__, 'd': {k: v if k == 'entity_label' else v or 0 for k, v in e.d.items()}}
+    for name in ATTRIBUTES:
+        if name in vars(e):
+            r[name] = plain(getattr(e, name))
+    if hasattr(e, 'children'):
+        r['children'] = [c.sequence_number for c in e.children]
+    for name in ('e1', 'e2'):
+        if getattr(e, name, None) is not None:
+            r[name] = plain(np.reshape(getattr(e, name), 3))
+    if type(e).__name__ in ('Line', 'CircArc'):
+        r['length'] = float(e.length())
+        r['linspace'] = plain(e.linspace(5))
+    return r
+
+
+def main():
+    baseline = {}
+    for name in SAMPLES:
+        with open(name) as f, contextlib.redirect_stdout(io.StringIO()):
+            igs = IGES_Object(f)
+        baseline[name] = {
+            'global_string': igs.global_string,
+            'toplevel': [e.sequence_number for e in igs.toplevel_entities],
+            'entities': {str(e.sequence_number): record(e) for e in igs.entity_list},
+        }
+    json.dump(baseline, sys.stdout, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
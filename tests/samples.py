@@ -0,0 +1,79 @@
+"""
+Sample files shared by the tests, and what the original loader made of them
+(sample_files/baseline.json, see sample_files/record_baseline.py).
+
+Group members may be chained from either end, so the baseline comparisons
+accept a chain and its leaves in either direction.
+"""
+import json
+import os
+import numpy as np
+import pytest
+from iges.read import IGES_Object
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_FILES = os.path.join(TESTS, 'sample_files')
+CHASSIS = os.path.join(os.path.dirname(TESTS), 'chassis_007_simp.IGS')
+TUBES = os.path.join(os.path.dirname(TESTS), 'tubes_splined.iges')
+SAMPLES = [CHASSIS, TUBES]
+
+with open(os.path.join(SAMPLE_FILES, 'baseline.json')) as f:
+    BASELINE = json.load(f)
+
+
+def sample_file(name):
+    """ Path of a file in sample_files/ """
+    return os.path.join(SAMPLE_FILES, name)
+
+
+def load(path, **kwargs):
+    """ IGES_Object of a file """
+    with open(path) as f:
+        return IGES_Object(f, **kwargs)
+
+
+def baseline(path):
+    """ The original loader's record of a sample file """
+    return BASELINE[os.path.basename(path)]
+
+
+def either_way(a, b):
+    """ (3, n) samples, or (e1, e2) pairs, equal in either direction """
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    return a.shape == b.shape and (np.allclose(a, b) or np.allclose(a[..., ::-1], b))
+
+
+def directory_fields(d):
+    """ DE fields of a directory row (e.g. an entity's d) as the baseline records them """
+    return {name: str(d[name]) if name == 'entity_label' else int(d[name])
+            for name in d.dtype.names if name != 'sequence_number'}
+
+
+def assert_matches_baseline(igs, path):
+    """ Entities, DE fields, geometry, top level and chains of a model as the original loader had them """
+    expected = baseline(path)
+    assert [e.sequence_number for e in igs.toplevel_entities] == expected['toplevel']
+    assert sorted(e.sequence_number for e in igs.entity_list) == sorted(map(int, expected['entities']))
+    for e in igs.entity_list:
+        assert_entity_matches_baseline(e, path)
+
+
+def assert_entity_matches_baseline(e, path):
+    """ Class, DE fields and geometry of an entity, or the members of a group, as the original loader had them """
+    r = baseline(path)['entities'][str(e.sequence_number)]
+    assert type(e).__name__ == r['class']
+    assert directory_fields(e.d) == r['d']
+    if 'children' in r:
+        children = [c.sequence_number for c in e.children]
+        assert children in (r['children'], r['children'][::-1])
+        return
+    for a, b in (('p1', 'p2'), ('e1', 'e2')):
+        if a in r:
+            ends = np.stack((np.reshape(getattr(e, a), 3), np.reshape(getattr(e, b), 3)), axis=1)
+            assert either_way(ends, np.stack((r[a], r[b]), axis=1))
+    if 'linspace' in r:
+        assert either_way(e.linspace(5), r['linspace'])
+        assert e.length() == pytest.approx(r['length'], rel=1e-9)
+    for name in ('x', 'y', 'z', 'R', 'T', 'control_points', 'V0', 'V1', 'K', 'M'):
+        if name in r:
+            assert np.allclose(np.asarray(getattr(e, name), dtype=float), r[name])
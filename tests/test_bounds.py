@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from iges.curves_surfaces import AssociativityInstance, ConicArc, ParametricSplineCurve
+from samples import CHASSIS, SAMPLES, baseline, load, sample_file
+
+CURVES = load(sample_file('curves.igs'))
+
+
+@pytest.mark.parametrize('e', [e for e in CURVES.entity_list if isinstance(e, (ConicArc, ParametricSplineCurve))], ids=repr)
+def test_boxes_of_conics_and_parametric_splines_are_exact(e):
+    box = CURVES.bounds().boxes[CURVES.index(e)]
+    pts = e.linspace(20001).T
+    size = np.ptp(pts, axis=0).max()
+    assert np.all(box[:3] <= pts.min(axis=0) + 1e-12*size)
+    assert np.all(box[3:] >= pts.max(axis=0) - 1e-12*size)
+    assert np.allclose(box, np.r_[pts.min(axis=0), pts.max(axis=0)], atol=1e-6*size)
+
+
+def test_unlinked_groups_have_no_box():
+    igs = load(sample_file('chassis_form7.igs'))
+    bounds = igs.bounds()
+    unlinked = [igs.index(e) for e in igs.entity_list if isinstance(e, AssociativityInstance) and e.d['form_number'] == 7]
+    assert np.isnan(bounds.boxes[unlinked]).all()
+    assert np.allclose(bounds.extent, load(CHASSIS).bounds().extent)
+    preview = igs.preview()
+    preview = preview[:, ~np.isnan(preview).any(axis=0)]
+    # within the preview's chord tolerance, 1e-3 of the diagonal
+    diagonal = np.linalg.norm(bounds.extent[3:] - bounds.extent[:3])
+    assert np.allclose(np.r_[preview.min(axis=1), preview.max(axis=1)], bounds.extent, atol=1e-3*diagonal)
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_boxes_bound_the_original_curves(path):
+    igs = load(path)
+    bounds = igs.bounds()
+    expected = baseline(path)['entities']
+    everything = []
+    for i, e in enumerate(igs.entity_list):
+        r = expected[str(e.sequence_number)]
+        if 'e1' not in r:
+            continue
+        pts = np.array([r['e1'], r['e2']] + (np.transpose(r['linspace']).tolist() if 'linspace' in r else []))
+        everything.append(pts)
+        box = bounds.boxes[i]
+        assert (box[:3] <= pts.min(axis=0) + 1e-9).all() and (box[3:] >= pts.max(axis=0) - 1e-9).all()
+        if r['class'] == 'Line':
+            assert np.allclose(box, np.r_[pts.min(axis=0), pts.max(axis=0)])
+        elif r['class'] == 'CircArc':
+            # tight, too: as far as a dense sampling of the (baseline checked) arc reaches
+            dense = e.linspace(20001).T
+            assert np.allclose(box, np.r_[dense.min(axis=0), dense.max(axis=0)], atol=1e-6*np.ptp(dense, axis=0).max())
+    everything = np.vstack(everything)
+    assert (bounds.extent[:3] <= everything.min(axis=0) + 1e-9).all()
+    assert (bounds.extent[3:] >= everything.max(axis=0) - 1e-9).all()
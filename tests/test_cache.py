@@ -0,0 +1,52 @@
+import os
+import pytest
+from iges.cache import load_cached
+from iges.read import IGES_Object
+from samples import SAMPLES, assert_matches_baseline, load
+
+ids = lambda p: p.rsplit('/', 1)[-1]
+
+
+def entries(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith('.npz'))
+
+
+def no_parsing(monkeypatch):
+    """ Make any load that parses text fail """
+    def fail(self, *args, **kwargs):
+        raise AssertionError('parsed instead of read from the cache')
+    monkeypatch.setattr(IGES_Object, '__init__', fail)
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_miss_then_hit_match_baseline(path, tmp_path, monkeypatch):
+    cold = load_cached(path, cache_dir=str(tmp_path))
+    assert_matches_baseline(cold, path)
+    assert len(entries(tmp_path)) == 1
+    no_parsing(monkeypatch)
+    warm = load_cached(path, cache_dir=str(tmp_path))
+    assert_matches_baseline(warm, path)
+    assert [c.sequence_number for g in warm.entity_list for c in getattr(g, 'children', ())] == \
+           [c.sequence_number for g in cold.entity_list for c in getattr(g, 'children', ())]
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_reloadable_loads_get_record_keys(path, tmp_path, monkeypatch):
+    assert load_cached(path, cache_dir=str(tmp_path)).record_keys is None
+    # the entry has no keys, so a reloadable load parses again and saves them
+    keyed = load_cached(path, cache_dir=str(tmp_path), reloadable=True)
+    assert (keyed.record_keys == load(path, reloadable=True).record_keys).all()
+    no_parsing(monkeypatch)
+    warm = load_cached(path, cache_dir=str(tmp_path), reloadable=True)
+    assert (warm.record_keys == keyed.record_keys).all()
+    assert_matches_baseline(warm, path)
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_selections_are_cached_apart(path, tmp_path):
+    whole = load_cached(path, cache_dir=str(tmp_path))
+    lines = load_cached(path, cache_dir=str(tmp_path), types=[110])
+    assert len(entries(tmp_path)) == 2
+    expected = load(path, types=[110])
+    assert [e.sequence_number for e in lines.entity_list] == [e.sequence_number for e in expected.entity_list]
+    assert len(whole.entity_list) > len(lines.entity_list)
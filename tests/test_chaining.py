@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from iges.chaining import chain, close_pairs, merge_points
+from iges.curves_surfaces import CurveGroup
+from samples import SAMPLES, baseline, load
+
+ids = lambda p: p.rsplit('/', 1)[-1]
+
+
+def groups(path):
+    return [e for e in load(path).entity_list if isinstance(e, CurveGroup) and e.children]
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_groups_chain_as_in_baseline(path):
+    expected = baseline(path)['entities']
+    for g in groups(path):
+        order = [c.sequence_number for c in g.children]
+        assert order in (expected[str(g.sequence_number)]['children'], expected[str(g.sequence_number)]['children'][::-1])
+        for a, b in zip(g.children[:-1], g.children[1:]):
+            assert np.allclose(a.e2, b.e1, atol=1e-5)
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_chaining_does_not_depend_on_member_order(path):
+    rng = np.random.default_rng(0)
+    for g in groups(path):
+        e1 = np.array([np.reshape(c.e1, 3) for c in g.children])
+        e2 = np.array([np.reshape(c.e2, 3) for c in g.children])
+        shuffle = rng.permutation(len(e1))
+        flip = rng.random(len(e1)) < 0.5
+        a = np.where(flip[:, None], e2, e1)[shuffle]
+        b = np.where(flip[:, None], e1, e2)[shuffle]
+        result = chain(a, b)
+        assert len(result.chains) == 1 and not result.junctions
+        order = [int(shuffle[m]) for m, _ in result.order()]
+        expected = list(range(len(e1)))
+        if result.closed[0]:
+            # a loop may start anywhere
+            k = order.index(0)
+            order = order[k:] + order[:k]
+            expected = [expected, [0] + expected[:0:-1]]
+        else:
+            expected = [expected, expected[::-1]]
+        assert order in expected
+
+
+def test_close_pairs_match_brute_force():
+    rng = np.random.default_rng(1)
+    points = rng.uniform(0, 1, (300, 3))
+    points = np.vstack((points, points[:100] + rng.normal(0, 1e-3, (100, 3))))
+    tol = 2e-3
+    I, J = close_pairs(points, tol)
+    found = set(zip(I.tolist(), J.tolist()))
+    d = np.linalg.norm(points[:, None] - points[None], axis=2)
+    i, j = np.nonzero(np.triu(d <= tol, 1))
+    assert found == set(zip(i.tolist(), j.tolist()))
+    labels = merge_points(points, tol)
+    assert all(labels[a] == labels[b] for a, b in found)
+
+
+def test_junctions_are_reported():
+    # three members meeting at the origin, and a closed triangle apart
+    e1 = [[0, 0, 0], [0, 0, 0], [0, 0, 0], [5, 0, 0], [6, 0, 0], [5, 1, 0]]
+    e2 = [[1, 0, 0], [0, 1, 0], [0, 0, 1], [6, 0, 0], [5, 1, 0], [5, 0, 0]]
+    result = chain(e1, e2)
+    assert [members for _, members in result.junctions] == [[0, 1, 2]]
+    assert sorted(m for m, _ in result.order()) == list(range(6))
+    assert result.closed.count(True) == 1
@@ -0,0 +1,40 @@
+import math
+import numpy as np
+import pytest
+from iges.curves_surfaces import ConicArc
+from samples import load, sample_file
+
+# Parabolas x = y^2 and y = x^2 (both ways), a quarter of the ellipse
+# x^2/4 + y^2 = 1 and the right branch of the hyperbola x^2 - y^2 = 1, and
+# the same again under a 124
+CONICS = [e for e in load(sample_file('curves.igs')).entity_list if isinstance(e, ConicArc)]
+KINDS = {1: 'ellipse', 2: 'hyperbola', 3: 'parabola'}
+
+
+def definition_space(e, pts):
+    """ (3, n) model space points of e back in its definition space """
+    if e.transformation is None:
+        return pts
+    R, T = e.transformation.composed()
+    return R.T @ (pts - T[:, None])
+
+
+@pytest.mark.parametrize('e', CONICS, ids=repr)
+def test_samples_lie_on_the_conic(e):
+    assert e.kind() == KINDS[int(e.d['form_number'])]
+    x, y, z = definition_space(e, e.linspace(101))
+    assert np.allclose(e.A*x*x + e.B*x*y + e.C*y*y + e.D*x + e.E*y + e.F, 0, atol=1e-9)
+    assert np.allclose(z, e.ZT)
+    ends = definition_space(e, e.linspace(2))
+    assert np.allclose(ends[:, 0], [e.X1, e.Y1, e.ZT]) and np.allclose(ends[:, -1], [e.X2, e.Y2, e.ZT])
+    assert np.allclose(np.reshape(e.e1, 3), e.transform(np.array([e.X1, e.Y1, e.ZT])))
+    assert np.allclose(np.reshape(e.e2, 3), e.transform(np.array([e.X2, e.Y2, e.ZT])))
+
+
+@pytest.mark.parametrize('e', [e for e in CONICS if (e.A, e.C, e.D, e.Y1) == (0, 1, -1, 1)], ids=repr)
+def test_parabola_length(e):
+    # x = y^2 for y in [-1, 1]: 2 * integral of sqrt(1 + 4y^2) from 0 to 1
+    exact = math.sqrt(5) + math.asinh(2)/2
+    assert e.length() == pytest.approx(exact, rel=1e-9)
+    d, pts, _ = e.nearestPoints(e.transform(np.zeros(3)).reshape(1, 3))
+    assert d[0] == pytest.approx(0.0, abs=1e-9)
@@ -0,0 +1,42 @@
+import gzip
+import os
+import shutil
+from iges.convert import assign_outputs, convert, find_inputs
+from samples import CHASSIS
+
+OPTIONS = {'dx': 1.0, 'chord_tol': None, 'max_len': None, 'min_len': None, 'float32': False}
+
+
+def sample(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if path.endswith('.gz'):
+        with open(CHASSIS, 'rb') as src, gzip.open(path, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+    else:
+        shutil.copy(CHASSIS, path)
+
+
+def test_inputs_sharing_a_name_get_their_own_outputs(tmp_path):
+    for name in ('part.igs', 'part.iges', 'part.iges.gz', 'other.igs'):
+        sample(str(tmp_path / 'in' / name))
+    records = convert(find_inputs([str(tmp_path / 'in')]), OPTIONS, jobs=1)
+    assert all(r['status'] == 'converted' for r in records)
+    outputs = sorted(os.path.basename(r['output']) for r in records)
+    assert outputs == ['other.npz', 'part.iges.gz.npz', 'part.iges.npz', 'part.igs.npz']
+    assert all(os.path.exists(r['output']) for r in records)
+    assert not [n for n in os.listdir(str(tmp_path / 'in')) if n.endswith('.tmp')]
+
+
+def test_globbed_inputs_keep_their_directories(tmp_path):
+    for d in ('a', 'b'):
+        sample(str(tmp_path / 'in' / d / 'x.igs'))
+    out_dir = str(tmp_path / 'out')
+    records = convert(find_inputs([str(tmp_path / 'in' / '*' / 'x.igs')]), OPTIONS, out_dir=out_dir, jobs=1)
+    assert sorted(os.path.relpath(r['output'], out_dir) for r in records) == [os.path.join('a', 'x.npz'), os.path.join('b', 'x.npz')]
+    assert all(r['status'] == 'converted' for r in records)
+
+
+def test_inputs_still_colliding_are_refused():
+    assigned = assign_outputs([('d/part.igs', 'part.igs'), ('d/part.igs', 'part.igs')])
+    assert [out for _, out, _ in assigned] == [None, None]
+    assert all(error for _, _, error in assigned)
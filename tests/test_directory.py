@@ -0,0 +1,32 @@
+import pytest
+from iges.directory import parse_directory
+from iges.read import read_sections
+from samples import SAMPLES, baseline, directory_fields
+
+
+@pytest.mark.parametrize('path', SAMPLES)
+def test_fields_match_the_baseline(path):
+    with open(path) as f:
+        _, d_lines, _ = read_sections(f)
+    directory = parse_directory(d_lines)
+    expected = baseline(path)['entities']
+    assert sorted(directory['sequence_number'].tolist()) == sorted(map(int, expected))
+    for row in directory:
+        assert directory_fields(row) == expected[str(row['sequence_number'])]['d']
+
+
+def test_signed_and_blank_fields():
+    lines = ['{0:>8}{1:>8}{2:>8}{3:>8}{4:>8}{5:>8}{6:>8}{7:>8}{8:>8}D{9:>7}\n'.format(110, 1, '', -3, '', '', '', '', '00010000', 1),
+             '{0:>8}{1:>8}{2:>8}{3:>8}{4:>8}{5:>8}{6:>8}{7:>8}{8:>8}D{9:>7}\n'.format(110, '', -7, 1, 0, '', '', 'LABEL', 2, 2)]
+    row = parse_directory(lines)[0]
+    assert (row['line_font_pattern'], row['color_number'], row['structure']) == (-3, -7, 0)
+    assert row['status_number'] == 10000
+    assert row['entity_label'] == 'LABEL'
+    assert row['entity_subs_num'] == 2
+
+
+def test_odd_line_count_is_refused():
+    with open(SAMPLES[0]) as f:
+        _, d_lines, _ = read_sections(f)
+    with pytest.raises(ValueError):
+        parse_directory(d_lines[:-1])
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from iges.curves_surfaces import AssociativityInstance, ParametricCurve
+from samples import CHASSIS, SAMPLES, baseline, either_way, load, sample_file
+
+# The chassis with its first 402 turned from form 15 into form 7, which is not linked
+FORM7 = sample_file('chassis_form7.igs')
+BROKEN = [e for e in load(sample_file('curves.igs')).entity_list if isinstance(e, ParametricCurve) and len(e.breaks())]
+
+
+def test_unlinked_groups_are_left_empty():
+    igs = load(FORM7)
+    unlinked = [e for e in igs.toplevel_entities if isinstance(e, AssociativityInstance) and e.d['form_number'] == 7]
+    assert len(unlinked) == 1
+    d = igs.discretize(dx=1.0)
+    k = list(d.entity_ids).index(igs.index(unlinked[0]))
+    assert d[k].shape == (3, 0)
+    # its members are top-level curves of their own, so nothing else changes
+    assert d.points.shape == load(CHASSIS).discretize(dx=1.0).points.shape
+    assert not np.isnan(d.points).any()
+
+
+def leaf_samples(d):
+    """ (entity_list index, (3, n) points) of every leaf slot """
+    return [(i, d.points[:, a:b]) for i, a, b in zip(d.child_ids.tolist(), d.child_offsets[:-1].tolist(), d.child_offsets[1:].tolist())]
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_leaves_are_sampled_as_the_original_linspace(path):
+    igs = load(path)
+    expected = baseline(path)['entities']
+    seq = lambda i: str(igs.entity_list[i].sequence_number)
+    # without endpoints, 4 points per leaf are the first 4 of the original 5, from either end
+    d = igs.discretize(n_points=4, endpoint=False)
+    checked = 0
+    for i, pts in leaf_samples(d):
+        r = expected[seq(i)]
+        if 'linspace' in r:
+            line = np.asarray(r['linspace'])
+            assert np.allclose(pts, line[:, :4]) or np.allclose(pts, line[:, ::-1][:, :4])
+            checked += 1
+    assert checked
+    # with endpoints, a top-level line or arc gets all 5
+    d = igs.discretize(n_points=5)
+    for k, i in enumerate(d.entity_ids.tolist()):
+        if 'linspace' in expected[seq(i)]:
+            assert either_way(d[k], expected[seq(i)]['linspace'])
+    # every top-level curve of the original loader is there, in order
+    curves = [s for s in baseline(path)['toplevel'] if expected[str(s)]['class'] not in ('Entity', 'TransformationMatrix')]
+    assert [int(seq(i)) for i in d.entity_ids.tolist()] == curves
+
+
+def break_fractions(e):
+    """ Fractions of the length at which the breaks lie """
+    return e._length_to(e.breaks())[0]/e.length()
+
+
+@pytest.mark.parametrize('e', BROKEN, ids=repr)
+def test_chords_start_at_the_breaks(e):
+    assert np.allclose(e.chord_fractions(np.inf), np.r_[0., break_fractions(e), 1.])
+    max_len = e.length()/7
+    t = e.chord_fractions(np.inf, max_len=max_len)
+    assert np.all(np.diff(t)*e.length() <= max_len*(1 + 1e-9))
+    assert all(np.isclose(t, f).any() for f in break_fractions(e))
+
+
+@pytest.mark.parametrize('e', BROKEN, ids=repr)
+def test_chords_stay_within_chord_tol(e):
+    chord_tol = 1e-3*e.length()
+    t = e.chord_fractions(chord_tol)
+    assert all(np.isclose(t, f).any() for f in break_fractions(e))
+    pts = e.evaluate(t).T
+    for a, b, ta, tb in zip(pts[:-1], pts[1:], t[:-1], t[1:]):
+        inner = e.evaluate(np.linspace(ta, tb, 21)).T
+        d = b - a
+        s = np.clip((inner - a) @ d/max(d @ d, 1e-300), 0., 1.)
+        assert np.linalg.norm(inner - a - np.outer(s, d), axis=1).max() <= 2*chord_tol
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_chord_tol_bounds_the_sagitta_of_the_original_curves(path):
+    igs = load(path)
+    expected = baseline(path)['entities']
+    chord_tol = 1e-4
+    d = igs.discretize(chord_tol=chord_tol)
+    arcs = 0
+    for i, pts in leaf_samples(d):
+        r = expected[str(igs.entity_list[i].sequence_number)]
+        if r['class'] == 'Line':
+            ends = np.stack((r['e1'], r['e2']), axis=1)
+            # one chord: both ends, or the start alone where the next member takes over
+            assert either_way(pts, ends) or np.allclose(pts[:, 0], ends[:, 0]) or np.allclose(pts[:, 0], ends[:, 1])
+        elif r['class'] == 'CircArc':
+            t = expected[str(r['d']['transform'])] if r['d']['transform'] else {'R': np.eye(3), 'T': np.zeros((3, 1))}
+            R, T = np.asarray(t['R']), np.reshape(t['T'], 3)
+            center = R @ [r['x'], r['y'], r['z']] + T
+            radius = np.hypot(r['x1'] - r['x'], r['y1'] - r['y'])
+            assert np.allclose(np.linalg.norm(pts.T - center, axis=1), radius)
+            mid = (pts[:, 1:] + pts[:, :-1]).T/2
+            assert (radius - np.linalg.norm(mid - center, axis=1) <= chord_tol*(1 + 1e-6)).all()
+            arcs += 1
+    assert arcs
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from iges.curves_surfaces import CircArc, Line
+from iges.entity import Entity
+from samples import SAMPLES, assert_matches_baseline, directory_fields, load, sample_file
+
+ids = lambda p: p.rsplit('/', 1)[-1]
+
+
+@pytest.mark.parametrize('path', SAMPLES + [sample_file('curves.igs')], ids=ids)
+def test_entities_have_no_instance_dict(path):
+    for e in load(path).entity_list:
+        assert not hasattr(e, '__dict__'), type(e).__name__
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_fields_are_views_of_the_shared_tables(path):
+    igs = load(path)
+    assert_matches_baseline(igs, path)
+    for i, e in enumerate(igs.entity_list):
+        assert directory_fields(e.d) == directory_fields(igs.directory[i])
+        e.d['color_number'] = 42
+        assert igs.directory['color_number'][i] == 42
+    for table in (igs.lines, igs.arcs):
+        for i, e in enumerate(table.entities):
+            assert np.shares_memory(e._params, table.params) and np.shares_memory(e._ends, table.ends)
+    line = igs.lines.entities[0]
+    line.p1 = [1., 2., 3.]
+    assert igs.lines.start[0].tolist() == [1., 2., 3.]
+
+
+def test_detached_entities_keep_their_fields():
+    igs = load(SAMPLES[0])
+    e = igs.entity_list[3]
+    fields = directory_fields(e.d)
+    e.detach()
+    igs.directory['color_number'][3] = 99
+    assert directory_fields(e.d) == fields
+    assert not np.shares_memory(e.d, igs.directory)
+
+
+def test_fields_hold_eight_digits():
+    e = Entity()
+    e.add_section('99999999', 'parameter_pointer')
+    e.add_section('-9999999', 'color_number')
+    e.add_section('        ', 'level')
+    e.add_section(' LABEL  ', 'entity_label', type='string')
+    assert (e.d['parameter_pointer'], e.d['color_number'], e.d['level']) == (99999999, -9999999, 0)
+    assert e.d['entity_label'] == 'LABEL'
+
+
+def test_unattached_entities_own_their_arrays():
+    line, arc = Line(), CircArc()
+    line.add_parameters(np.r_[110, 0., 0., 0., 1., 2., 2.])
+    arc.add_parameters(np.r_[100, 0., 0., 0., 1., 0., 0., 1.])
+    assert line.length() == pytest.approx(3.)
+    assert arc.length() == pytest.approx(np.pi/2)
+    line.p2 = [0., 0., 4.]
+    assert line.p2.tolist() == [0., 0., 4.]
@@ -0,0 +1,26 @@
+import pytest
+from iges.lazy import LazyIGES_Object
+from samples import SAMPLES, assert_matches_baseline
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_lazy_model_matches_baseline(path):
+    with LazyIGES_Object(path) as igs:
+        assert_matches_baseline(igs, path)
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_only_touched_entities_are_parsed(path):
+    with LazyIGES_Object(path) as igs:
+        assert not igs._entities
+        i = len(igs.entity_list) - 1
+        e = igs.entity_list[-1]
+        assert e.sequence_number == int(igs.directory['sequence_number'][i])
+        parsed = {i}
+        if e.transformation is not None:
+            parsed.add(igs.pointer_dict[e.transformation.sequence_number])
+        for c in getattr(e, 'children', ()):
+            parsed.add(igs.pointer_dict[c.sequence_number])
+            if c.transformation is not None:
+                parsed.add(igs.pointer_dict[c.transformation.sequence_number])
+        assert set(igs._entities) == parsed
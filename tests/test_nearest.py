@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from iges.curves_surfaces import CircArc, Line, ParametricCurve
+from samples import SAMPLES, load, sample_file
+
+MODEL = load(sample_file('curves.igs'))
+CURVES = [e for e in MODEL.entity_list if isinstance(e, ParametricCurve)]
+DENSE = 20001
+
+
+def queries(e, n=400, seed=0):
+    """ Points around a curve, up to its size away from it """
+    pts = e.linspace(50).T
+    lo, hi = pts.min(axis=0), pts.max(axis=0)
+    pad = max((hi - lo).max(), 1.)
+    return np.random.default_rng(seed).uniform(lo - pad, hi + pad, (n, 3))
+
+
+@pytest.mark.parametrize('e', CURVES, ids=repr)
+def test_nearest_points_match_dense_sampling(e):
+    X = queries(e)
+    d, pts, _ = e.nearestPoints(X)
+    dense = e.linspace(DENSE).T
+    spacing = np.linalg.norm(np.diff(dense, axis=0), axis=1).max()
+    best = np.array([np.linalg.norm(dense - x, axis=1).min() for x in X])
+    assert np.all(d <= best + 1e-9)
+    assert np.all(d >= best - spacing)
+    assert np.allclose(np.linalg.norm(X - pts, axis=1), d)
+    # the fractions lead back to the same points
+    assert np.allclose(e.evaluate(e.fraction(X)).T, pts, atol=1e-6*max(e.length(), 1.))
+
+
+@pytest.mark.parametrize('e', CURVES, ids=repr)
+def test_points_on_the_curve_project_onto_themselves(e):
+    t = np.linspace(0., 1., 37)
+    on = e.evaluate(t).T
+    d, pts, _ = e.nearestPoints(on)
+    assert np.allclose(d, 0., atol=1e-9*max(e.length(), 1.))
+    assert np.allclose(e.fraction(on), t, atol=1e-7)
+
+
+@pytest.mark.parametrize('e', [e for e in MODEL.entity_list if isinstance(e, Line)], ids=repr)
+def test_line_nearest_point_is_in_model_space(e):
+    X = queries(e, n=50)
+    dense = e.linspace(DENSE).T
+    for x in X:
+        d, pt, _ = e.nearestPoint(x)
+        assert d == pytest.approx(np.linalg.norm(dense - x, axis=1).min(), abs=1e-3*e.length())
+        assert np.linalg.norm(x - pt) == pytest.approx(d)
+
+
+@pytest.mark.parametrize('path', SAMPLES + [sample_file('curves.igs')], ids=lambda p: p.rsplit('/', 1)[-1])
+def test_nearest_point_agrees_with_nearest_points(path):
+    for e in load(path).entity_list:
+        if not isinstance(e, (Line, CircArc, ParametricCurve)):
+            continue
+        X = queries(e, n=20)
+        d, pts, isnode = e.nearestPoints(X)
+        for i, x in enumerate(X):
+            one = e.nearestPoint(x)
+            assert one[0] == pytest.approx(d[i])
+            assert np.allclose(one[1], pts[i])
+            assert one[2] == (int(isnode[i]) or False)
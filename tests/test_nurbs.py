@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from iges.curves_surfaces import RationalBSplineCurve
+from samples import TUBES, baseline, load, sample_file
+
+SPLINES = [(TUBES, e) for e in load(TUBES).entity_list if isinstance(e, RationalBSplineCurve)] + \
+          [(None, e) for e in load(sample_file('curves.igs')).entity_list if isinstance(e, RationalBSplineCurve)]
+
+
+def cox_de_boor(T, degree, u):
+    """ B-spline basis values at u by the textbook recursion, one point at a time """
+    T = np.asarray(T, dtype=float)
+    last = np.flatnonzero(T < T[-1])[-1]
+    N = np.array([1. if T[i] <= u < T[i+1] or (u == T[-1] and i == last) else 0. for i in range(len(T) - 1)])
+    for p in range(1, degree + 1):
+        N = np.array([(0. if T[i+p] == T[i] else (u - T[i])/(T[i+p] - T[i])*N[i]) +
+                      (0. if T[i+p+1] == T[i+1] else (T[i+p+1] - u)/(T[i+p+1] - T[i+1])*N[i+1])
+                      for i in range(len(N) - 1)])
+    return N
+
+
+@pytest.mark.parametrize('path, e', SPLINES, ids=lambda x: repr(x) if isinstance(x, RationalBSplineCurve) else str(x).rsplit('/', 1)[-1])
+def test_points_match_the_recorded_control_polygon(path, e):
+    if path is None:
+        T, P, M, V0, V1 = e.T, np.reshape(e.control_points, (-1, 3)), e.M, e.V0, e.V1
+    else:
+        # knots and control points as the original loader read them
+        r = baseline(path)['entities'][str(e.sequence_number)]
+        T, P, M, V0, V1 = r['T'], np.array(r['control_points']), r['M'], r['V0'], r['V1']
+    W = np.asarray(e.W, dtype=float)
+    u = np.linspace(V0, V1, 41)
+    expected = []
+    for x in u:
+        N = cox_de_boor(T, M, x)*W
+        expected.append(N @ P/N.sum())
+    pts = e.points(u)
+    assert np.allclose(pts, expected)
+    # and the endpoints are those points, in model space
+    assert np.allclose(np.reshape(e.e1, 3), e.transform(pts[0])) and np.allclose(np.reshape(e.e2, 3), e.transform(pts[-1]))
+
+
+@pytest.mark.parametrize('e', [e for _, e in SPLINES], ids=repr)
+def test_derivatives_match_central_differences(e):
+    u = np.linspace(e.V0, e.V1, 23)[1:-1]
+    h = 1e-6*(e.V1 - e.V0)
+    _, dC = e.points(u, derivative=True)
+    assert np.allclose(dC, (e.points(u + h) - e.points(u - h))/(2*h), atol=1e-5*np.abs(dC).max())
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from iges.parameters import ParameterSection, record_values, tokenize
+from iges.read import separators
+from samples import SAMPLES, assert_matches_baseline, load
+
+
+def p_lines(path):
+    with open(path) as f:
+        return [line for line in f if line[72:73] == 'P']
+
+
+def original_records(path):
+    """ (DE pointer, tokens) of every P record, split the way the original loader did """
+    records = []
+    text = ''
+    for line in p_lines(path):
+        if not text:
+            pointer = int(line[64:72])
+        text += line[:64]
+        if text.strip()[-1] == ';':
+            records.append((pointer, text.strip()[:-1].split(',')))
+            text = ''
+    return records
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_records_match_the_original_split(path):
+    section = ParameterSection(p_lines(path), *separators(load(path).global_string))
+    expected = original_records(path)
+    assert section.pointers.tolist() == [pointer for pointer, _ in expected]
+    for k, (_, tokens) in enumerate(expected):
+        assert np.array_equal(section.record(k), [float(t) if t.strip() else 0. for t in tokens])
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_chunks_do_not_split_records(path):
+    lines = p_lines(path)
+    whole = ParameterSection(lines)
+    chunked = ParameterSection(lines, chunk_lines=3)
+    assert np.array_equal(chunked.pointers, whole.pointers)
+    assert np.array_equal(chunked.offsets, whole.offsets)
+    assert np.array_equal(chunked.values, whole.values)
+
+
+def test_hollerith_strings_may_hold_delimiters():
+    tokens, strings = tokenize('126,3Ha,b,11Hsemi;colon ,2.5;ignored')
+    assert tokens == ['126', '', '', '2.5']
+    assert strings == {1: 'a,b', 2: 'semi;colon '}
+    values, _ = record_values('126,3Ha,b,11Hsemi;colon ,2.5;ignored')
+    assert values[0] == 126 and values[3] == 2.5 and np.isnan(values[1:3]).all()
+
+
+def test_blanks_and_fortran_exponents():
+    values, strings = record_values('110,,1.5D2, -2.0d-1 ,3E1;')
+    assert not strings
+    assert values.tolist() == [110., 0., 150., -0.2, 30.]
+
+
+def test_other_delimiters():
+    values, strings = record_values('110/1.0/2Ha//3.0#4.0', param_sep='/', record_sep='#')
+    assert strings == {2: 'a/'}
+    assert values[[0, 1, 3]].tolist() == [110., 1., 3.] and np.isnan(values[2])
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_workers_give_the_serial_result(path):
+    serial = load(path).parameters
+    pooled = load(path, workers=2)
+    assert_matches_baseline(pooled, path)
+    assert np.array_equal(pooled.parameters.pointers, serial.pointers)
+    assert np.array_equal(pooled.parameters.offsets, serial.offsets)
+    assert np.array_equal(pooled.parameters.values, serial.values, equal_nan=True)
+    assert pooled.parameters.strings == serial.strings
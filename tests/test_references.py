@@ -0,0 +1,65 @@
+import io
+import warnings
+import numpy as np
+import pytest
+from iges.lazy import LazyIGES_Object
+from iges.read import IGES_Object
+from iges.references import MEMBER, TRANSFORM
+from iges.stream import iter_entities
+from samples import SAMPLES, baseline, load, sample_file
+
+ids = lambda p: p.rsplit('/', 1)[-1]
+# A 102 before its members, and a 124 after the arc it moves
+FORWARD = sample_file('forward.igs')
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_edges_match_baseline(path):
+    igs = load(path)
+    graph = igs.references
+    expected = baseline(path)
+    seq = np.array([e.sequence_number for e in igs.entity_list])
+    top = ~graph.referenced(MEMBER)
+    assert seq[top].tolist() == expected['toplevel']
+    for i, e in enumerate(igs.entity_list):
+        r = expected['entities'][str(e.sequence_number)]
+        members = seq[graph.children(i, MEMBER)].tolist()
+        assert sorted(members) == sorted(r.get('children', []))
+        transform = seq[graph.children(i, TRANSFORM)].tolist()
+        assert transform == ([r['d']['transform']] if r['d']['transform'] else [])
+        for j in graph.children(i).tolist():
+            assert i in graph.parents(j).tolist()
+    assert not len(graph.dangling[0])
+
+
+def test_forward_references_are_linked():
+    igs = load(FORWARD)
+    group, arc, line, transform = igs.entity_list
+    assert [c.sequence_number for c in group.children] == [5, 3]
+    assert arc.transformation is transform
+    assert np.allclose(np.reshape(arc.e1, 3), [3., 1., 0.]) and np.allclose(np.reshape(arc.e2, 3), [2., 2., 0.])
+    assert [e.sequence_number for e in igs.toplevel_entities] == [1, 7]
+    assert igs.references.parents(1, MEMBER).tolist() == [0]
+    assert igs.references.parents(3, TRANSFORM).tolist() == [1]
+
+
+@pytest.mark.parametrize('read', [LazyIGES_Object, lambda path: list(iter_entities(path))], ids=['lazy', 'stream'])
+def test_other_readers_follow_forward_references(read):
+    model = read(FORWARD)
+    top = model.toplevel_entities if hasattr(model, 'toplevel_entities') else model
+    assert [e.sequence_number for e in top] == [1, 7]
+    group = top[0]
+    assert [c.sequence_number for c in group.children] == [5, 3]
+    assert group.children[1].transformation.sequence_number == 7
+
+
+def test_dangling_pointers_are_reported():
+    with open(FORWARD) as f:
+        text = f.read().replace('102,2,5,3;', '102,2,5,9;')
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        igs = IGES_Object(io.StringIO(text))
+    assert caught
+    source, pointer, kind = igs.references.dangling
+    assert (source.tolist(), pointer.tolist(), kind.tolist()) == ([0], [9], [MEMBER])
+    assert [c.sequence_number for c in igs.entity_list[0].children] == [5]
@@ -0,0 +1,81 @@
+import io
+import numpy as np
+import pytest
+from iges.read import IGES_Object
+from samples import CHASSIS, SAMPLES, assert_matches_baseline
+
+with open(CHASSIS) as f:
+    TEXT = f.read()
+
+
+def recolored(text, seq, color):
+    """ The file with the color number of entity `seq` changed """
+    lines = text.splitlines(True)
+    k = next(k for k, line in enumerate(lines) if line[72:73] == 'D' and int(line[73:80]) == seq + 1)
+    lines[k] = lines[k][:16] + '{0:>8}'.format(color) + lines[k][24:]
+    return ''.join(lines)
+
+
+def assert_same_model(a, b):
+    """ Two models with the same entities, top level, chains and geometry """
+    assert [e.sequence_number for e in a.entity_list] == [e.sequence_number for e in b.entity_list]
+    assert [e.sequence_number for e in a.toplevel_entities] == [e.sequence_number for e in b.toplevel_entities]
+    for x, y in zip(a.entity_list, b.entity_list):
+        assert type(x) is type(y)
+        assert int(x.d['color_number']) == int(y.d['color_number'])
+        if hasattr(y, 'children'):
+            assert [c.sequence_number for c in x.children] == [c.sequence_number for c in y.children]
+        elif hasattr(y, 'linspace'):
+            assert np.allclose(x.linspace(5), y.linspace(5))
+
+
+def test_keys_are_only_kept_when_asked_for():
+    igs = IGES_Object(io.StringIO(TEXT), stats=True)
+    assert igs.record_keys is None
+    assert 'keys' not in igs.stats.phases
+    igs = IGES_Object(io.StringIO(TEXT), reloadable=True)
+    assert len(igs.record_keys) == len(igs.entity_list)
+
+
+def test_unchanged_file_reuses_everything():
+    igs = IGES_Object(io.StringIO(TEXT), reloadable=True)
+    before = list(igs.entity_list)
+    changes = igs.reload(io.StringIO(TEXT))
+    assert len(changes) == 0
+    assert changes.unchanged == len(before)
+    assert all(a is b for a, b in zip(igs.entity_list, before))
+
+
+def test_rechained_members_are_reported_modified():
+    igs = IGES_Object(io.StringIO(TEXT), reloadable=True)
+    edited = recolored(TEXT, 1, 3)
+    changes = igs.reload(io.StringIO(edited))
+    # line 1 changed, so its group 9 is chained again, re-reading lines 3, 5 and 7
+    assert sorted(e.sequence_number for e in changes.modified) == [1, 3, 5, 7, 9]
+    assert not changes.added and not changes.removed
+    assert changes.unchanged == len(igs.entity_list) - 5
+    assert_same_model(igs, IGES_Object(io.StringIO(edited)))
+
+
+def test_models_without_keys_reload_everything():
+    igs = IGES_Object(io.StringIO(TEXT))
+    edited = recolored(TEXT, 1, 3)
+    changes = igs.reload(io.StringIO(edited))
+    assert changes.unchanged == 0
+    assert len(changes.modified) == len(igs.entity_list)
+    assert_same_model(igs, IGES_Object(io.StringIO(edited)))
+    # the reload kept keys for the next one
+    assert len(igs.reload(io.StringIO(edited))) == 0
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_reverted_edits_give_back_the_original_model(path):
+    with open(path) as f:
+        text = f.read()
+    igs = IGES_Object(io.StringIO(text), reloadable=True)
+    edited = recolored(text, 3, 5)
+    there = igs.reload(io.StringIO(edited))
+    assert int(igs.entity_list[igs.pointer_dict[3]].d['color_number']) == 5
+    back = igs.reload(io.StringIO(text))
+    assert sorted(e.sequence_number for e in back.modified) == sorted(e.sequence_number for e in there.modified)
+    assert_matches_baseline(igs, path)
@@ -0,0 +1,47 @@
+import pytest
+from samples import SAMPLES, assert_entity_matches_baseline, baseline, load
+
+ids = lambda p: p.rsplit('/', 1)[-1]
+FIELDS = {'types': 'entity_type_number', 'levels': 'level', 'colors': 'color_number', 'forms': 'form_number'}
+SELECTIONS = [{'types': [110]}, {'types': [100]}, {'types': [102, 402]}, {'types': [126, 110]},
+              {'forms': [15]}, {'colors': [0]}, {'types': [110], 'levels': [0, 1]}]
+
+
+def expected_selection(path, criteria):
+    """ Sequence numbers the selection should load, from the original loader's record """
+    entities = baseline(path)['entities']
+    picked = [int(seq) for seq, r in entities.items()
+              if all(r['d'][FIELDS[name]] in values for name, values in criteria.items())]
+    keep = set()
+    todo = list(picked)
+    while todo:
+        seq = todo.pop()
+        if seq in keep:
+            continue
+        keep.add(seq)
+        r = entities[str(seq)]
+        if r['d']['transform']:
+            todo.append(r['d']['transform'])
+        todo.extend(r.get('children', []))
+    return keep
+
+
+@pytest.mark.parametrize('criteria', SELECTIONS, ids=lambda c: ';'.join('{0}={1}'.format(*kv) for kv in c.items()))
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_selection_is_the_filtered_baseline(path, criteria):
+    igs = load(path, **criteria)
+    keep = expected_selection(path, criteria)
+    assert sorted(e.sequence_number for e in igs.entity_list) == sorted(keep)
+    # only the records of kept entities are tokenized
+    assert sorted(igs.parameters.pointers.tolist()) == sorted(keep)
+    for e in igs.entity_list:
+        assert_entity_matches_baseline(e, path)
+    members = {c for seq in keep for c in baseline(path)['entities'][str(seq)].get('children', [])}
+    # what no kept group claims, in file order, as the original loader listed its top level
+    assert [e.sequence_number for e in igs.toplevel_entities] == sorted(keep - members)
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_where_predicates_filter_the_directory(path):
+    igs = load(path, where=lambda d: d['entity_type_number'] == 110)
+    assert sorted(e.sequence_number for e in igs.entity_list) == sorted(expected_selection(path, {'types': [110]}))
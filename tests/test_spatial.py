@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from iges.curves_surfaces import CurveGroup
+from samples import CHASSIS, SAMPLES, baseline, either_way, load, sample_file
+
+
+def brute_force(curves, points):
+    """ Distance from each point to the nearest curve, curve by curve """
+    return np.min([e.nearestPoints(points)[0] for e in curves], axis=0)
+
+
+def queries(igs, n=300, seed=1):
+    extent = igs.bounds().extent
+    pad = 0.2*(extent[3:] - extent[:3])
+    return np.random.default_rng(seed).uniform(extent[:3] - pad, extent[3:] + pad, (n, 3))
+
+
+@pytest.mark.parametrize('path', SAMPLES + [sample_file('chassis_form7.igs')])
+def test_nearest_matches_brute_force(path):
+    igs = load(path)
+    index = igs.curve_index()
+    points = queries(igs)
+    d, near, _, leaf = index.nearest(points)
+    assert np.allclose(d, brute_force(index.curves, points))
+    assert np.allclose(np.linalg.norm(points - near, axis=1), d)
+    assert (leaf >= 0).all()
+
+
+def test_unlinked_groups_are_not_indexed():
+    igs = load(sample_file('chassis_form7.igs'))
+    index = igs.curve_index()
+    assert sorted(index.ids.tolist()) == sorted(load(CHASSIS).curve_index().ids.tolist())
+    assert not any(isinstance(e, CurveGroup) for e in index.curves)
+
+
+def segment_distances(a, b, points):
+    """ (M, N) distances from points to the segments a[j]-b[j] """
+    d = b - a
+    t = np.clip(np.einsum('mjk,jk->mj', points[:, None] - a, d)/np.einsum('jk,jk->j', d, d), 0., 1.)
+    return np.linalg.norm(points[:, None] - (a + t[:, :, None]*d), axis=2)
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_index_holds_the_original_leaf_curves(path):
+    igs = load(path)
+    index = igs.curve_index()
+    expected = baseline(path)['entities']
+    leaves = sorted(int(s) for s, r in expected.items() if r['class'] not in ('Entity', 'TransformationMatrix') and 'children' not in r)
+    assert sorted(e.sequence_number for e in index.curves) == leaves
+    lines = []
+    for k, e in enumerate(index.curves):
+        r = expected[str(e.sequence_number)]
+        if 'e1' in r:
+            assert either_way(np.stack((index.e1[k], index.e2[k]), axis=1), np.stack((r['e1'], r['e2']), axis=1))
+        if r['class'] == 'Line':
+            lines.append((k, r['e1'], r['e2']))
+    # where the nearest curve is a line, the distance is the one to the original segment
+    points = queries(igs)
+    d, _, _, leaf = index.nearest(points)
+    k, a, b = zip(*lines)
+    to_lines = segment_distances(np.array(a, dtype=float), np.array(b, dtype=float), points)
+    assert (d <= to_lines.min(axis=1) + 1e-9).all()
+    on_line = np.isin(leaf, k)
+    column = {j: c for c, j in enumerate(k)}
+    assert np.allclose(d[on_line], to_lines[on_line, [column[j] for j in leaf[on_line].tolist()]])
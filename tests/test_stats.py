@@ -0,0 +1,44 @@
+import json
+from collections import Counter
+import pytest
+from iges.stats import LoadStats
+from samples import SAMPLES, assert_matches_baseline, baseline, load
+
+ids = lambda p: p.rsplit('/', 1)[-1]
+PHASES = ['read', 'directory', 'parameters', 'global', 'entities', 'transforms', 'add_parameters',
+          'references', 'chaining', 'tables']
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_stats_count_what_the_original_loader_saw(path):
+    igs = load(path, stats=True)
+    assert_matches_baseline(igs, path)
+    expected = baseline(path)['entities'].values()
+    stats = igs.stats
+    assert stats.entity_counts == Counter(r['d']['entity_type_number'] for r in expected)
+    assert stats.groups == sum(1 for r in expected if r.get('children'))
+    with open(path) as f:
+        assert stats.bytes_read == len(f.read())
+    assert [name for name in stats.phases if name in PHASES] == PHASES
+    assert all(calls == 1 and seconds >= 0 for seconds, calls in stats.phases.values())
+    assert stats.total == pytest.approx(sum(s for s, _ in stats.phases.values()))
+    assert json.loads(json.dumps(stats.as_dict()))['entity_counts'] == {str(t): n for t, n in sorted(stats.entity_counts.items())}
+    assert 'total' in str(stats)
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_hooks_see_every_measurement(path):
+    phases, groups = [], []
+    stats = LoadStats(on_phase=lambda name, s: phases.append(name), on_group=lambda e, s: groups.append(e), slowest=2)
+    igs = load(path, stats=stats)
+    assert igs.stats is stats
+    assert phases == list(stats.phases)
+    assert len(groups) == stats.groups
+    slowest = stats.slowest_groups
+    assert len(slowest) == min(2, stats.groups)
+    assert [s for s, *_ in slowest] == sorted((s for s, *_ in slowest), reverse=True)
+    assert {seq for _, seq, _, _ in slowest} <= {e.sequence_number for e in groups}
+
+
+def test_loads_without_stats_keep_none():
+    assert load(SAMPLES[0]).stats is None
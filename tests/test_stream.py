@@ -0,0 +1,42 @@
+import gzip
+import io
+import warnings
+import pytest
+from iges.stream import iter_entities
+from samples import CHASSIS, SAMPLES, assert_entity_matches_baseline, baseline
+
+
+def descendants(entities):
+    """ The entities and, recursively, their group members """
+    for e in entities:
+        yield e
+        for c in descendants(getattr(e, 'children', ())):
+            yield c
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=lambda p: p.rsplit('/', 1)[-1])
+def test_streamed_entities_match_baseline(path):
+    top = list(iter_entities(path))
+    assert sorted(e.sequence_number for e in top) == sorted(baseline(path)['toplevel'])
+    every = [e.sequence_number for e in descendants(top)]
+    assert sorted(every) == sorted(map(int, baseline(path)['entities']))
+    for e in descendants(top):
+        assert_entity_matches_baseline(e, path)
+
+
+def test_compressed_and_chunked_streams_give_the_same_entities():
+    with open(CHASSIS, 'rb') as f:
+        raw = f.read()
+    expected = [e.sequence_number for e in iter_entities(CHASSIS)]
+    assert [e.sequence_number for e in iter_entities(io.BytesIO(gzip.compress(raw)))] == expected
+    assert [e.sequence_number for e in iter_entities(io.BytesIO(raw), chunk_size=97)] == expected
+
+
+def test_a_small_window_gives_members_out_unlinked():
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        top = list(iter_entities(CHASSIS, window=1))
+    assert any('raise the window' in str(w.message) for w in caught)
+    # every entity still comes out exactly once
+    every = [e.sequence_number for e in descendants(top)]
+    assert sorted(every) == sorted(map(int, baseline(CHASSIS)['entities']))
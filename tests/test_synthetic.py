@@ -0,0 +1,71 @@
+import io
+import os
+import sys
+import numpy as np
+import pytest
+from iges.curves_surfaces import CurveGroup, TransformationMatrix
+from iges.lazy import LazyIGES_Object
+from iges.read import IGES_Object
+from iges.stream import iter_entities
+from samples import TESTS
+
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS), 'benchmarks'))
+import synthetic
+
+# The original loader cannot chain groups holding a 126 (its splines have no
+# endpoints), so the generator's own records are the reference here.
+N_ENTITIES, GROUP_SIZE, SEED = 60, 7, 3
+TEXT = synthetic.text(N_ENTITIES, GROUP_SIZE, SEED)
+
+
+def expected_records():
+    """ (type, form, parameters with DE pointers, transform DE or 0) per entity, in file order """
+    out = []
+    for g in range(synthetic.n_groups(N_ENTITIES, GROUP_SIZE)):
+        base = len(out)
+        for type_number, form, params, t in synthetic.group_records(g, GROUP_SIZE, SEED):
+            params = list(params)
+            for i in synthetic._pointer_slots(type_number, params):
+                params[i] = 2*(base + params[i]) + 1
+            out.append((type_number, form, params, 0 if t is None else 2*(base + t) + 1))
+    return out
+
+
+def test_text_is_deterministic():
+    assert synthetic.text(N_ENTITIES, GROUP_SIZE, SEED) == TEXT
+    assert synthetic.text(N_ENTITIES, GROUP_SIZE, SEED + 1) != TEXT
+    buf = io.StringIO()
+    assert synthetic.write(buf, N_ENTITIES, GROUP_SIZE, SEED) == len(expected_records())
+    assert buf.getvalue() == TEXT
+
+
+def test_model_loads_as_generated():
+    igs = IGES_Object(io.StringIO(TEXT))
+    expected = expected_records()
+    assert len(igs.entity_list) == len(expected) >= N_ENTITIES
+    for i, (e, (type_number, form, params, transform)) in enumerate(zip(igs.entity_list, expected)):
+        assert e.sequence_number == 2*i + 1
+        assert (int(e.d['entity_type_number']), int(e.d['form_number']), int(e.d['transform'])) == (type_number, form, transform)
+        assert np.allclose(igs.parameters.record(i), [type_number] + params)
+        if transform:
+            assert e.transformation is igs.entity_list[igs.pointer_dict[transform]]
+    groups = [e for e in igs.entity_list if isinstance(e, CurveGroup)]
+    assert len(groups) == synthetic.n_groups(N_ENTITIES, GROUP_SIZE)
+    # only the groups and their 124s are left at the top level
+    top = [e.sequence_number for e in igs.entity_list if isinstance(e, (CurveGroup, TransformationMatrix))]
+    assert [e.sequence_number for e in igs.toplevel_entities] == top
+    for g in groups:
+        # every loop closes
+        assert g.closed == [True] and len(g.children) == g.n_curves
+        for a, b in zip(g.children, g.children[1:] + g.children[:1]):
+            assert np.allclose(a.e2, b.e1, atol=1e-9)
+
+
+def test_readers_agree_on_the_synthetic_model(tmp_path):
+    path = tmp_path / 'synthetic.igs'
+    path.write_text(TEXT, encoding='latin-1')
+    full = IGES_Object(io.StringIO(TEXT))
+    chains = lambda entities: {e.sequence_number: [c.sequence_number for c in getattr(e, 'children', ())] for e in entities}
+    with LazyIGES_Object(str(path)) as lazy:
+        assert chains(lazy.toplevel_entities) == chains(full.toplevel_entities)
+    assert chains(iter_entities(str(path))) == chains(full.toplevel_entities)
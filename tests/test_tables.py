@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from samples import SAMPLES, baseline, either_way, load
+
+ids = lambda p: p.rsplit('/', 1)[-1]
+
+
+def tables(igs):
+    return [t for t in (igs.lines, igs.arcs) if len(t)]
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_tables_match_baseline(path):
+    expected = baseline(path)['entities']
+    for table in tables(load(path)):
+        pts = table.linspace(5)
+        e1, e2 = table.endpoints()
+        for i, (e, length) in enumerate(zip(table.entities, table.lengths())):
+            r = expected[str(e.sequence_number)]
+            assert either_way(pts[i], r['linspace'])
+            assert length == pytest.approx(r['length'], rel=1e-9)
+            assert either_way(np.stack((e1[i], e2[i]), axis=1), np.stack((r['e1'], r['e2']), axis=1))
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_tables_agree_with_their_entities(path):
+    for table in tables(load(path)):
+        e1, e2 = table.endpoints()
+        pts, offsets = table.arange(0.7)
+        t = np.linspace(0., 1., 9)
+        rows = np.repeat(np.arange(len(table)), len(t))
+        at = table.evaluate(rows, np.tile(t, len(table)))
+        for i, e in enumerate(table.entities):
+            assert np.allclose(e1[i], np.reshape(e.e1, 3)) and np.allclose(e2[i], np.reshape(e.e2, 3))
+            assert np.allclose(pts[:, offsets[i]:offsets[i+1]], e.arange(0.7))
+            assert np.allclose(at[:, i*len(t):(i+1)*len(t)], e.evaluate(t))
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_entities_write_through_to_their_table(path):
+    for table in tables(load(path)):
+        e = table.entities[0]
+        before = table.linspace(3)[0]
+        e.reverse()
+        assert np.allclose(table.linspace(3)[0], before[:, ::-1])
+        assert np.allclose(table.endpoints()[0][0], np.reshape(e.e1, 3))
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from samples import SAMPLES, baseline, load
+
+ids = lambda p: p.rsplit('/', 1)[-1]
+
+
+def baseline_leaves(path):
+    """ Baseline records of the curves that are not groups """
+    return [r for r in baseline(path)['entities'].values() if 'e1' in r and 'children' not in r]
+
+
+def chord_lengths(topo):
+    """ Length of every element """
+    return np.linalg.norm(topo.nodes[topo.elements[:, 1]] - topo.nodes[topo.elements[:, 0]], axis=1)
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_nodes_are_the_merged_baseline_endpoints(path):
+    topo = load(path).topology()
+    ends = np.array([r[k] for r in baseline_leaves(path) for k in ('e1', 'e2')], dtype=float).reshape(-1, 3)
+    # every baseline endpoint is a node, and nodes are distinct
+    d = np.linalg.norm(ends[:, None] - topo.nodes[None], axis=2)
+    assert (d.min(axis=1) <= 1e-5).all()
+    gaps = np.linalg.norm(topo.nodes[:, None] - topo.nodes[None], axis=2) + np.eye(len(topo.nodes))
+    assert gaps.min() > 1e-5
+    # every element joins two different nodes
+    assert topo.elements.max() < len(topo.nodes) and (topo.elements[:, 0] != topo.elements[:, 1]).all()
+    assert len(topo) >= len(baseline_leaves(path))
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_elements_follow_the_baseline_curves(path):
+    igs = load(path)
+    dx = 0.5
+    topo = igs.topology(dx=dx)
+    assert chord_lengths(topo).max() <= dx*(1 + 1e-9)
+    # within a fine chord tolerance, the chords of a curve add up to its length
+    topo = igs.topology(chord_tol=1e-5)
+    chords = chord_lengths(topo)
+    for leaf_id in np.unique(topo.element_ids).tolist():
+        r = baseline(path)['entities'][str(igs.entity_list[leaf_id].sequence_number)]
+        if 'length' in r:
+            assert chords[topo.element_ids == leaf_id].sum() == pytest.approx(r['length'], rel=1e-3)
@@ -0,0 +1,66 @@
+import io
+import math
+import numpy as np
+import pytest
+from iges.curves_surfaces import CircArc, Line, TransformationMatrix
+from iges.read import IGES_Object
+from iges.write import dumps
+from samples import SAMPLES, assert_matches_baseline, baseline, load
+
+ids = lambda p: p.rsplit('/', 1)[-1]
+
+
+def rotation(axis, angle):
+    c, s = math.cos(angle), math.sin(angle)
+    i, j = [k for k in range(3) if k != axis]
+    R = np.eye(3)
+    R[i, i], R[i, j], R[j, i], R[j, j] = c, -s, s, c
+    return R
+
+
+def matrix(R, T):
+    t = TransformationMatrix()
+    t.add_parameters(np.r_[124, np.column_stack((R, T)).ravel()])
+    return t
+
+
+@pytest.mark.parametrize('path', SAMPLES, ids=ids)
+def test_transforms_match_baseline(path):
+    igs = load(path)
+    assert_matches_baseline(igs, path)
+    for e in igs.entity_list:
+        if isinstance(e, TransformationMatrix):
+            r = baseline(path)['entities'][str(e.sequence_number)]
+            R, T = e.composed()
+            assert np.allclose(R, r['R']) and np.allclose(T, np.reshape(r['T'], 3))
+
+
+def test_chained_transforms_are_composed():
+    R1, T1 = rotation(2, 0.3), np.array([1., 2., 3.])
+    R2, T2 = rotation(0, 0.5), np.array([-1., 0., 2.])
+    inner, outer = matrix(R1, T1), matrix(R2, T2)
+    inner.transformation = outer
+    line = Line()
+    line.add_parameters(np.r_[110, 1., 0., 0., 0., 2., 1.])
+    line.transformation = inner
+    arc = CircArc()
+    arc.add_parameters(np.r_[100, 0.5, 1., 1., 2., 1., 1., 2.])
+    arc.transformation = inner
+    igs = IGES_Object(io.StringIO(dumps([line, arc])))
+
+    moved = lambda p: R2 @ (R1 @ p + T1) + T2
+    line, arc = [e for e in igs.entity_list if isinstance(e, (Line, CircArc))]
+    assert np.allclose(np.reshape(line.e1, 3), moved(np.array([1., 0., 0.])))
+    assert np.allclose(np.reshape(line.e2, 3), moved(np.array([0., 2., 1.])))
+    assert np.allclose(np.reshape(arc.e1, 3), moved(np.array([2., 1., 0.5])))
+    assert np.allclose(igs.lines.linspace(3)[0], np.reshape(line.linspace(3), (3, 3)))
+    assert np.allclose(igs.arcs.endpoints()[1][0], np.reshape(arc.e2, 3))
+    # orientation only: no translation
+    assert np.allclose(line.transform(np.array([1., 0., 0.]), orientation_only=True), R2 @ R1 @ [1., 0., 0.])
+
+
+def test_cyclic_transforms_are_refused():
+    a, b = matrix(np.eye(3), np.zeros(3)), matrix(np.eye(3), np.ones(3))
+    a.transformation, b.transformation = b, a
+    with pytest.raises(ValueError, match='Cyclic'):
+        a.composed()
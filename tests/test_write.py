@@ -0,0 +1,58 @@
+import gc
+import io
+import weakref
+import pytest
+from iges.curves_surfaces import CircArc, Line
+from iges.read import IGES_Object
+from iges.write import IGESWriter, dumps
+from samples import CHASSIS, either_way, load
+
+
+def sample_lines(n):
+    """ n lines of the chassis, loaded afresh as needed so nothing references them once written """
+    while n > 0:
+        lines = [e for e in load(CHASSIS).entity_list if isinstance(e, Line)][:n]
+        n -= len(lines)
+        while lines:
+            yield lines.pop()
+
+
+def test_unreferenced_entities_are_all_written():
+    buf = io.StringIO()
+    with IGESWriter(buf) as writer:
+        for e in sample_lines(1000):
+            writer.add(e)
+    text = buf.getvalue()
+    assert sum(line[72:73] == 'D' for line in text.splitlines()) == 2000
+    assert len(IGES_Object(io.StringIO(text)).entity_list) == 1000
+
+
+def test_written_entities_are_not_kept_alive():
+    buf = io.StringIO()
+    with IGESWriter(buf) as writer:
+        line = next(sample_lines(1))
+        writer.add(line)
+        gone = weakref.ref(line)
+        del line
+        gc.collect()
+        assert gone() is None
+
+
+def test_shared_entities_are_written_once():
+    line = next(sample_lines(1))
+    buf = io.StringIO()
+    with IGESWriter(buf) as writer:
+        assert writer.add(line) == writer.add(line)
+    assert writer.n_d == 2
+
+
+@pytest.mark.parametrize('reversals', [0, 1, 2, 3])
+def test_reversed_arcs_survive_a_round_trip(reversals):
+    arc = next(e for e in load(CHASSIS).entity_list if isinstance(e, CircArc) and e.transformation is not None)
+    original = arc.linspace(9)
+    for _ in range(reversals):
+        arc.reverse()
+    assert either_way(arc.linspace(9), original)
+    read = next(e for e in IGES_Object(io.StringIO(dumps([arc]))).entity_list if isinstance(e, CircArc))
+    assert read.length() == pytest.approx(arc.length())
+    assert either_way(read.linspace(9), original)